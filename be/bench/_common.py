@@ -0,0 +1,78 @@
+# be/bench/_common.py
+"""Utilidades compartidas por los benchmarks (ejecutar desde be/ con `python -m bench.<nombre>`)."""
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from gateway.config import settings
+from gateway.db import Base, async_session, crear_engine
+from gateway import models
+
+
+def sqlite_temporal() -> str:
+    """URL de una base SQLite nueva en un directorio temporal."""
+    path = os.path.join(tempfile.mkdtemp(prefix="mant-bench-"), "bench.db")
+    return f"sqlite+aiosqlite:///{path}"
+
+
+@asynccontextmanager
+async def base_de_datos(url: Optional[str] = None, **ajustes):
+    """
+    Crea un engine para el benchmark y redirige a él el sessionmaker de la app,
+    de modo que routers y dependencias usen la base temporal. `ajustes`
+    sobrescribe campos de gateway.config.Settings (p. ej. sqlite_wal=False).
+    """
+    cfg = settings.model_copy(update={"database_url": url or sqlite_temporal(), **ajustes})
+    engine = crear_engine(cfg)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async_session.configure(bind=engine)
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+
+
+async def crear_maquinas(n: int, tipo: str = "BENCH") -> List[str]:
+    """Inserta n máquinas y retorna sus ids."""
+    filas = [
+        {
+            "id": str(uuid.uuid4()),
+            "nombre": f"Bench {i}",
+            "tipo": tipo,
+            "numero_serie": f"BENCH-{uuid.uuid4().hex[:12]}",
+        }
+        for i in range(n)
+    ]
+    async with async_session() as session:
+        await session.execute(insert(models.Maquinaria), filas)
+        await session.commit()
+    return [f["id"] for f in filas]
+
+
+class Cronometro:
+    """Context manager que mide segundos transcurridos."""
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.segundos = time.perf_counter() - self.inicio
+
+
+def percentiles(muestras: List[float]) -> dict:
+    """p50/p95/p99 en milisegundos de una lista de segundos."""
+    ms = sorted(m * 1000 for m in muestras)
+    if not ms:
+        return {"p50": None, "p95": None, "p99": None}
+    def p(q):
+        return round(ms[min(len(ms) - 1, int(q * len(ms)))], 3)
+    return {"p50": p(0.50), "p95": p(0.95), "p99": p(0.99), "mean": round(statistics.fmean(ms), 3)}
@@ -0,0 +1,84 @@
+# be/bench/bench_batch.py
+"""
+Compara POST /lecturas/batch (inserción en bloque) contra el bucle anterior
+de una consulta + un objeto ORM por lectura.
+
+    python -m bench.bench_batch --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime
+
+from sqlalchemy import select
+
+from gateway.db import async_session
+from gateway import models, schemas
+from gateway.routers import lecturas
+from gateway.estado import ESTADOS, codigo_estado, motivo_bits
+from ._common import base_de_datos, crear_maquinas, Cronometro
+
+
+async def batch_por_fila(payload: schemas.LecturaBatchIn, db) -> int:
+    """Implementación previa: un SELECT Maquinaria y un db.add() por lectura."""
+    created = 0
+    for lectura_in in payload.lecturas:
+        result = await db.execute(
+            select(models.Maquinaria).where(models.Maquinaria.id == lectura_in.maquinaria_id)
+        )
+        maquina = result.scalar_one_or_none()
+        if not maquina:
+            continue
+        bits = motivo_bits(
+            temperatura=lectura_in.temperatura or 0,
+            vibracion=lectura_in.vibracion or 0,
+            presion_aceite=lectura_in.presion_aceite or 0
+        )
+        db.add(models.Lectura(
+            maquinaria_id=lectura_in.maquinaria_id,
+            temperatura=lectura_in.temperatura,
+            vibracion=lectura_in.vibracion,
+            presion_aceite=lectura_in.presion_aceite,
+            ts=lectura_in.ts or datetime.utcnow(),
+            estado=ESTADOS[codigo_estado(bits)],
+            motivo_bits=bits
+        ))
+        created += 1
+    await db.commit()
+    return created
+
+
+def generar_payload(ids, n) -> schemas.LecturaBatchIn:
+    return schemas.LecturaBatchIn(lecturas=[
+        schemas.LecturaIn(
+            maquinaria_id=random.choice(ids),
+            temperatura=round(random.uniform(70, 130), 1),
+            vibracion=round(random.uniform(0.5, 6.0), 1),
+            presion_aceite=round(random.uniform(1.0, 6.0), 1),
+        )
+        for _ in range(n)
+    ])
+
+
+async def main(sizes, maquinas, url):
+    async with base_de_datos(url):
+        ids = await crear_maquinas(maquinas)
+        print(f"{'filas':>8} {'por_fila (s)':>13} {'bloque (s)':>11} {'speedup':>8}")
+        for n in sizes:
+            payload = generar_payload(ids, n)
+            async with async_session() as db:
+                with Cronometro() as viejo:
+                    await batch_por_fila(payload, db)
+            async with async_session() as db:
+                with Cronometro() as nuevo:
+                    await lecturas.create_lecturas_batch(payload, db)
+            print(f"{n:>8} {viejo.segundos:>13.3f} {nuevo.segundos:>11.3f} {viejo.segundos / nuevo.segundos:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--maquinas", type=int, default=50)
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.maquinas, args.url))
@@ -0,0 +1,83 @@
+# be/bench/bench_cola.py
+"""
+POST /lecturas individuales: escritura síncrona vs cola write-behind.
+
+Varios clientes concurrentes envían una lectura por request contra la app
+(ASGI en proceso, sin red). En modo asíncrono se mide también el tiempo hasta
+que la cola queda escrita, el tamaño medio de lote y la latencia de commit.
+
+    python -m bench.bench_cola --clientes 50 --requests 5000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from gateway.config import settings
+from gateway.db import async_session
+from gateway.cola import cola_ingesta
+from gateway.main import app
+from gateway.ultimas import ultimas
+from gateway.catalogo import catalogo
+from ._common import base_de_datos, crear_maquinas, percentiles
+
+
+async def cliente(http, ids, n, tiempos, codigos):
+    for _ in range(n):
+        body = {
+            "maquinaria_id": random.choice(ids),
+            "temperatura": round(random.uniform(70, 110), 1),
+            "vibracion": round(random.uniform(1.0, 5.0), 1),
+            "presion_aceite": round(random.uniform(1.5, 6.0), 1),
+        }
+        t0 = time.perf_counter()
+        r = await http.post("/lecturas", json=body)
+        tiempos.append(time.perf_counter() - t0)
+        codigos[r.status_code] = codigos.get(r.status_code, 0) + 1
+
+
+async def correr(asincrona: bool, args):
+    settings.ingesta_asincrona = asincrona
+    async with base_de_datos(args.url):
+        ids = await crear_maquinas(args.maquinas)
+        async with async_session() as db:
+            await ultimas.cargar(db)
+            await catalogo.cargar(db)
+        tiempos, codigos = [], {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            t0 = time.perf_counter()
+            por_cliente = args.requests // args.clientes
+            await asyncio.gather(*(cliente(http, ids, por_cliente, tiempos, codigos) for _ in range(args.clientes)))
+            respondido = time.perf_counter() - t0
+            if asincrona:
+                await cola_ingesta.detener()
+            escrito = time.perf_counter() - t0
+    total = por_cliente * args.clientes
+    resultado = {
+        "modo": "asíncrona (202)" if asincrona else "síncrona",
+        "req_s": round(total / respondido),
+        "filas_s_escritas": round(total / escrito),
+        "codigos": codigos,
+        "latencia_ms": percentiles(tiempos),
+    }
+    if asincrona:
+        e = cola_ingesta.estado()
+        resultado.update(lote_promedio=e["lote_promedio"], commit_ms=e["commit_ms"], escritas=e["escritas"])
+    return resultado
+
+
+async def main(args):
+    for asincrona in (False, True):
+        print(await correr(asincrona, args))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, default=200)
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,146 @@
+# be/bench/bench_compacto.py
+"""
+Tamaño y tiempos de lectura de lecturas en el formato anterior (serie, estado
+y motivo como texto en cada fila) y en el compacto (código de estado y
+máscara de motivos), antes y después de gateway.migraciones.
+
+Siembra una tabla con el formato anterior, mide tamaño en disco (tabla +
+índices) y dos consultas: conteo por estado sobre toda la tabla y rango de
+una máquina. Luego migra (con VACUUM en SQLite) y vuelve a medir.
+
+    python -m bench.bench_compacto --maquinas 50 --days 30 --every-minutes 1
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import (
+    Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+    func, insert, select, text,
+)
+
+from gateway import models
+from gateway.estado import ESTADOS, evaluar_lote, motivos_lote
+from gateway.migraciones import migrar
+from ._common import base_de_datos, crear_maquinas, percentiles
+
+CHUNK = 20000
+
+
+def tabla_v1(md: MetaData) -> Table:
+    """Tabla lecturas como era antes de la migración"""
+    models.Maquinaria.__table__.to_metadata(md)
+    tabla = Table(
+        "lecturas", md,
+        Column("id", Integer, primary_key=True),
+        Column("maquinaria_id", String, ForeignKey("maquinaria.id", ondelete="CASCADE"), nullable=False),
+        Column("numero_serie", String, nullable=True),
+        Column("temperatura", Float, nullable=True),
+        Column("vibracion", Float, nullable=True),
+        Column("presion_aceite", Float, nullable=True),
+        Column("ts", DateTime),
+        Column("estado", String, nullable=True),
+        Column("motivo", Text, nullable=True),
+    )
+    Index("ix_lecturas_maquinaria_ts", tabla.c.maquinaria_id, tabla.c.ts.desc(), tabla.c.estado)
+    Index("ix_lecturas_ts", tabla.c.ts)
+    return tabla
+
+
+async def sembrar(engine, tabla: Table, ids, days: int, every_minutes: int) -> int:
+    rng = np.random.default_rng(1234)
+    fin = datetime.utcnow().replace(microsecond=0)
+    pasos = days * 24 * 60 // every_minutes
+    total = 0
+    for inicio in range(0, pasos, CHUNK // len(ids) or 1):
+        k = np.arange(inicio, min(pasos, inicio + (CHUNK // len(ids) or 1)))
+        n = len(k) * len(ids)
+        t = np.round(rng.normal(90, 15, n), 1)
+        v = np.round(rng.normal(2.0, 1.5, n).clip(0), 2)
+        p = np.round(rng.normal(3.5, 1.0, n), 2)
+        codigos, bits = evaluar_lote(t, v, p)
+        tl, vl, pl = t.tolist(), v.tolist(), p.tolist()
+        filas = [
+            {"maquinaria_id": ids[j % len(ids)], "numero_serie": f"SERIE-{j % len(ids):06d}",
+             "temperatura": tl[j], "vibracion": vl[j], "presion_aceite": pl[j],
+             "ts": fin - timedelta(minutes=every_minutes * int(k[j // len(ids)])),
+             "estado": ESTADOS[c], "motivo": m}
+            for j, (c, m) in enumerate(zip(codigos.tolist(), motivos_lote(bits, tl, vl, pl)))
+        ]
+        async with engine.begin() as conn:
+            await conn.execute(insert(tabla), filas)
+        total += n
+    return total
+
+
+async def tamano(conn) -> float:
+    """MB de lecturas y sus índices"""
+    if conn.dialect.name == "postgresql":
+        r = await conn.execute(text("SELECT pg_total_relation_size('lecturas')"))
+        return r.scalar() / 1e6
+    try:
+        r = await conn.execute(text(
+            "SELECT sum(pgsize) FROM dbstat WHERE name = 'lecturas' "
+            "OR name IN (SELECT name FROM sqlite_master WHERE tbl_name = 'lecturas')"))
+        return r.scalar() / 1e6
+    except Exception:
+        # Sin dbstat: tamaño de toda la base
+        paginas = (await conn.execute(text("PRAGMA page_count"))).scalar()
+        tam = (await conn.execute(text("PRAGMA page_size"))).scalar()
+        return paginas * tam / 1e6
+
+
+async def medir(engine, maquina: str, repeticiones: int) -> dict:
+    md = MetaData()
+    async with engine.connect() as conn:
+        tabla = await conn.run_sync(lambda c: Table("lecturas", md, autoload_with=c))
+        desde = (await conn.execute(select(func.max(tabla.c.ts)))).scalar() - timedelta(days=7)
+        por_estado = select(tabla.c.estado, func.count()).group_by(tabla.c.estado)
+        rango = select(*tabla.c).where(tabla.c.maquinaria_id == maquina, tabla.c.ts >= desde)
+        tiempos = {"por_estado": [], "rango_maquina": []}
+        for _ in range(repeticiones):
+            for nombre, stmt in (("por_estado", por_estado), ("rango_maquina", rango)):
+                t0 = time.perf_counter()
+                (await conn.execute(stmt)).all()
+                tiempos[nombre].append(time.perf_counter() - t0)
+        return {"mb": round(await tamano(conn), 1), **{k: percentiles(v) for k, v in tiempos.items()}}
+
+
+async def main(args):
+    async with base_de_datos(args.url) as engine:
+        ids = await crear_maquinas(args.maquinas)
+        md = MetaData()
+        v1 = tabla_v1(md)
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Lectura.__table__.drop)
+            await conn.run_sync(v1.create)
+        n = await sembrar(engine, v1, ids, args.days, args.every_minutes)
+        if engine.dialect.name == "sqlite":
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.exec_driver_sql("VACUUM")
+        print(f"lecturas: {n}")
+        print(f"anterior  {await medir(engine, ids[0], args.repeticiones)}")
+
+        t0 = time.perf_counter()
+        async with engine.begin() as conn:
+            await conn.run_sync(migrar)
+        segundos = time.perf_counter() - t0
+        if engine.dialect.name == "sqlite":
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.exec_driver_sql("VACUUM")
+        print(f"migración: {segundos:.2f} s ({n / segundos:,.0f} filas/s)")
+        print(f"compacto  {await medir(engine, ids[0], args.repeticiones)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, default=50)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--every-minutes", type=int, default=1)
+    parser.add_argument("--repeticiones", type=int, default=10)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+# be/bench/bench_concurrencia.py
+"""
+Carga concurrente lectura/escritura sobre SQLite con y sin WAL.
+
+Un escritor inserta un tick de lecturas (una por máquina) y confirma en bucle,
+como el simulador, mientras varios lectores consultan el histórico por máquina
+y la última lectura por máquina, como el dashboard.
+
+    python -m bench.bench_concurrencia --lectores 8 --segundos 10
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+
+from gateway.db import async_session
+from gateway.ingesta import insertar_lecturas
+from gateway.routers import seed
+from ._common import base_de_datos, crear_maquinas, percentiles
+from .bench_indices import consulta_por_maquina, consulta_ultimas
+
+
+async def escritor(ids, fin, stats):
+    while time.perf_counter() < fin:
+        filas = [
+            {
+                "maquinaria_id": i,
+                "temperatura": round(random.uniform(70, 110), 1),
+                "vibracion": round(random.uniform(1.0, 5.0), 1),
+                "presion_aceite": round(random.uniform(1.5, 6.0), 1),
+                "ts": datetime.utcnow(),
+                "estado": "OK",
+                "motivo_bits": 0,
+            }
+            for i in ids
+        ]
+        t0 = time.perf_counter()
+        try:
+            async with async_session() as db:
+                await insertar_lecturas(db, filas, retornar=False)
+                await db.commit()
+            stats["commits"] += 1
+            stats["filas"] += len(filas)
+            stats["lat_escritura"].append(time.perf_counter() - t0)
+        except OperationalError:
+            stats["errores_escritura"] += 1
+
+
+async def lector(ids, fin, stats):
+    while time.perf_counter() < fin:
+        stmt = consulta_ultimas() if random.random() < 0.2 else consulta_por_maquina(random.choice(ids), 100)
+        t0 = time.perf_counter()
+        try:
+            async with async_session() as db:
+                (await db.execute(stmt)).all()
+            stats["lecturas"] += 1
+            stats["lat_lectura"].append(time.perf_counter() - t0)
+        except OperationalError:
+            stats["errores_lectura"] += 1
+
+
+async def correr(wal: bool, args):
+    # Sin WAL se usan los valores por defecto previos de SQLite (synchronous=FULL)
+    async with base_de_datos(None, sqlite_wal=wal, sqlite_synchronous="NORMAL" if wal else "FULL"):
+        ids = await crear_maquinas(args.maquinas)
+        await seed.seed_historico(days=args.days, every_minutes=10, base_temp=90.0, base_vib=2.0,
+                                  base_pres=3.5, temp_noise=15.0, vib_noise=1.5, pres_noise=1.0)
+        stats = {"commits": 0, "filas": 0, "lecturas": 0, "errores_escritura": 0,
+                 "errores_lectura": 0, "lat_escritura": [], "lat_lectura": []}
+        fin = time.perf_counter() + args.segundos
+        await asyncio.gather(escritor(ids, fin, stats), *(lector(ids, fin, stats) for _ in range(args.lectores)))
+    return {
+        "modo": "WAL + synchronous=NORMAL" if wal else "rollback journal + synchronous=FULL",
+        "commits_s": round(stats["commits"] / args.segundos, 1),
+        "filas_s": round(stats["filas"] / args.segundos),
+        "lecturas_s": round(stats["lecturas"] / args.segundos, 1),
+        "errores": stats["errores_escritura"] + stats["errores_lectura"],
+        "escritura_ms": percentiles(stats["lat_escritura"]),
+        "lectura_ms": percentiles(stats["lat_lectura"]),
+    }
+
+
+async def main(args):
+    for wal in (False, True):
+        r = await correr(wal, args)
+        print(f"\n== {r.pop('modo')}")
+        for k, v in r.items():
+            print(f"  {k}: {v}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--maquinas", type=int, default=200)
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--lectores", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=10)
+    asyncio.run(main(parser.parse_args()))
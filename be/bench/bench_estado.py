@@ -0,0 +1,44 @@
+# be/bench/bench_estado.py
+"""
+Evaluación de estado por fila contra la API por lotes de gateway.estado.
+
+    python -m bench.bench_estado --n 1000000
+"""
+import argparse
+
+import numpy as np
+
+from gateway.estado import ESTADOS, evaluar_estado, evaluar_lote, motivos_lote
+from ._common import Cronometro
+
+
+def main(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    t = np.round(rng.uniform(60, 140, n), 1)
+    v = np.round(rng.uniform(0.2, 8.0, n), 1)
+    p = np.round(rng.uniform(0.5, 7.0, n), 1)
+    tl, vl, pl = t.tolist(), v.tolist(), p.tolist()
+
+    with Cronometro() as fila:
+        esperado = [evaluar_estado(a, b, c) for a, b, c in zip(tl, vl, pl)]
+    with Cronometro() as lote:
+        codigos, bits = evaluar_lote(t, v, p)
+    with Cronometro() as textos:
+        motivos = list(motivos_lote(bits, tl, vl, pl))
+
+    obtenido = [(ESTADOS[c], m) for c, m in zip(codigos.tolist(), motivos)]
+    assert obtenido == esperado, "la evaluación por lotes difiere de la escalar"
+
+    print(f"lecturas:                 {n}")
+    print(f"por fila (estado+motivo): {fila.segundos:8.3f} s  {n / fila.segundos:12,.0f} filas/s")
+    print(f"lote (códigos+bits):      {lote.segundos:8.3f} s  {n / lote.segundos:12,.0f} filas/s")
+    print(f"lote + textos de motivo:  {lote.segundos + textos.segundos:8.3f} s  "
+          f"({int((bits != 0).sum())} lecturas con motivo)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    main(args.n, args.seed)
@@ -0,0 +1,63 @@
+# be/bench/bench_export.py
+"""
+Exportación masiva: JSON por /lecturas/maquina/{id}?limit= vs /lecturas/export.
+
+Siembra el histórico y descarga todas las lecturas de una máquina por cada
+camino, midiendo filas/s y el pico de memoria Python (tracemalloc) durante
+la descarga. El cliente descarta los bytes a medida que llegan.
+
+    python -m bench.bench_export --maquinas 20 --days 60 --every-minutes 1
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+import httpx
+
+from gateway.main import app
+from gateway.routers import seed
+from ._common import base_de_datos, crear_maquinas
+
+
+async def descargar(http, url: str, params: dict) -> tuple:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    total = 0
+    async with http.stream("GET", url, params=params) as r:
+        r.raise_for_status()
+        async for parte in r.aiter_raw():
+            total += len(parte)
+    segundos = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, total, pico
+
+
+async def main(args):
+    async with base_de_datos(args.url):
+        ids = await crear_maquinas(args.maquinas)
+        await seed.seed_historico(days=args.days, every_minutes=args.every_minutes, base_temp=90.0,
+                                  base_vib=2.0, base_pres=3.5, temp_noise=15.0, vib_noise=1.5, pres_noise=1.0)
+        filas = args.days * 24 * 60 // args.every_minutes + 1
+        print(f"filas por máquina: ~{filas}")
+
+        casos = [("json /maquina/{id}", f"/lecturas/maquina/{ids[0]}", {"limit": filas})]
+        casos += [(f"export {f}", "/lecturas/export", {"maquinaria_id": ids[0], "formato": f})
+                  for f in args.formatos]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            for nombre, url, params in casos:
+                segundos, total, pico = await descargar(http, url, params)
+                print(f"{nombre:<22} {filas / segundos:>10.0f} filas/s  {total / 1e6:>8.1f} MB  "
+                      f"pico memoria {pico / 1e6:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, default=20)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--every-minutes", type=int, default=1)
+    parser.add_argument("--formatos", nargs="+", default=["csv", "arrow", "parquet"])
+    asyncio.run(main(parser.parse_args()))
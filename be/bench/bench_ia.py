@@ -0,0 +1,77 @@
+# be/bench/bench_ia.py
+"""
+Proxy /predict contra el stub del módulo de IA levantado en proceso.
+
+Compara un AsyncClient nuevo por llamada (implementación anterior) con el
+cliente compartido, mide aciertos de caché y el fallo rápido del circuit
+breaker con el módulo caído.
+
+    python -m bench.bench_ia --llamadas 500
+"""
+import argparse
+import asyncio
+
+import httpx
+import uvicorn
+
+from gateway.cliente_ia import ClienteIA, CircuitoAbierto
+from gateway.config import settings
+from . import stub_ia
+from ._common import Cronometro, percentiles
+
+
+async def medir(n, fn):
+    tiempos = []
+    for i in range(n):
+        with Cronometro() as c:
+            await fn(i)
+        tiempos.append(c.segundos)
+    return percentiles(tiempos)
+
+
+async def main(args):
+    url = f"http://127.0.0.1:{args.port}"
+    server = uvicorn.Server(uvicorn.Config(stub_ia.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    tarea = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    cliente = ClienteIA(settings.model_copy(update={
+        "ai_module_url": url, "ai_breaker_failures": 3, "ai_breaker_reset_seconds": 60,
+    }))
+
+    async def por_llamada(i):
+        async with httpx.AsyncClient() as client:
+            (await client.post(f"{url}/api/v1/predict", json={"x": i}, timeout=30.0)).json()
+
+    resultados = {
+        "cliente nuevo por llamada": await medir(args.llamadas, por_llamada),
+        "cliente compartido": await medir(args.llamadas, lambda i: cliente.predecir({"x": i})),
+        "caché (misma entrada)": await medir(args.llamadas, lambda i: cliente.predecir({"x": 0})),
+    }
+
+    stub_ia.app.state.fallar = True
+    cliente.cache.clear()
+
+    async def caido(i):
+        try:
+            await cliente.predecir({"x": i})
+        except CircuitoAbierto:
+            pass
+
+    resultados["módulo caído (circuito)"] = await medir(args.llamadas, caido)
+    resultados["estado del circuito"] = cliente.circuito.estado
+    resultados["llamadas recibidas por el stub"] = stub_ia.app.state.llamadas
+
+    await cliente.cerrar()
+    server.should_exit = True
+    await tarea
+    for k, v in resultados.items():
+        print(f"{k:32} {v}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llamadas", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8011)
+    asyncio.run(main(parser.parse_args()))
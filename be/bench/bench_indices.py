@@ -0,0 +1,112 @@
+# be/bench/bench_indices.py
+"""
+Latencia de lecturas por máquina con y sin el índice (maquinaria_id, ts DESC).
+
+Siembra histórico con el router de seed y mide:
+  - get_lecturas_by_maquina (ORDER BY ts DESC LIMIT n)
+  - última lectura por máquina (GROUP BY maquinaria_id, max(ts))
+
+    python -m bench.bench_indices --maquinas 20 --days 30
+    python -m bench.bench_indices --url postgresql+asyncpg://u:p@127.0.0.1:5432/bench
+
+La base indicada en --url se vacía (drop_all) antes de sembrar.
+"""
+import argparse
+import asyncio
+import random
+
+from sqlalchemy import select, desc, func, text
+
+from gateway.db import async_session
+from gateway import models
+from gateway.routers import seed
+from ._common import base_de_datos, crear_maquinas, Cronometro, percentiles
+
+INDICE = next(i for i in models.Lectura.__table__.indexes if i.name == "ix_lecturas_maquinaria_ts")
+
+
+def consulta_por_maquina(maquinaria_id, limit):
+    return (
+        select(models.Lectura)
+        .where(models.Lectura.maquinaria_id == maquinaria_id)
+        .order_by(desc(models.Lectura.ts))
+        .limit(limit)
+    )
+
+
+def consulta_ultimas():
+    subq = (
+        select(models.Lectura.maquinaria_id, func.max(models.Lectura.ts).label("max_ts"))
+        .group_by(models.Lectura.maquinaria_id)
+        .subquery()
+    )
+    return select(models.Lectura).join(
+        subq,
+        (models.Lectura.maquinaria_id == subq.c.maquinaria_id) &
+        (models.Lectura.ts == subq.c.max_ts)
+    )
+
+
+async def plan(db, stmt):
+    dialecto = db.bind.dialect
+    sql = str(stmt.compile(dialect=dialecto, compile_kwargs={"literal_binds": True}))
+    prefijo = "EXPLAIN QUERY PLAN " if dialecto.name == "sqlite" else "EXPLAIN "
+    filas = (await db.execute(text(prefijo + sql))).all()
+    return [" | ".join(str(c) for c in f) for f in filas]
+
+
+async def medir(ids, repeticiones, limit):
+    tiempos_maquina, tiempos_ultimas = [], []
+    async with async_session() as db:
+        for _ in range(repeticiones):
+            with Cronometro() as c:
+                (await db.execute(consulta_por_maquina(random.choice(ids), limit))).scalars().all()
+            tiempos_maquina.append(c.segundos)
+        for _ in range(max(1, repeticiones // 10)):
+            with Cronometro() as c:
+                (await db.execute(consulta_ultimas())).scalars().all()
+            tiempos_ultimas.append(c.segundos)
+        planes = {
+            "por_maquina": await plan(db, consulta_por_maquina(ids[0], limit)),
+            "ultimas": await plan(db, consulta_ultimas()),
+        }
+    return {"por_maquina_ms": percentiles(tiempos_maquina), "ultimas_ms": percentiles(tiempos_ultimas)}, planes
+
+
+async def main(args):
+    async with base_de_datos(args.url) as engine:
+        ids = await crear_maquinas(args.maquinas)
+        with Cronometro() as c:
+            r = await seed.seed_historico(days=args.days, every_minutes=args.every_minutes)
+        print(f"sembradas {r['inserted']} lecturas en {c.segundos:.1f}s ({engine.dialect.name})")
+
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sc: INDICE.drop(sc, checkfirst=True))
+            if engine.dialect.name == "sqlite":
+                await conn.execute(text("ANALYZE"))
+        antes, planes_antes = await medir(ids, args.repeticiones, args.limit)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sc: INDICE.create(sc, checkfirst=True))
+            await conn.execute(text("ANALYZE"))
+        despues, planes_despues = await medir(ids, args.repeticiones, args.limit)
+
+    for nombre, res, planes in (("sin índice", antes, planes_antes), ("con índice", despues, planes_despues)):
+        print(f"\n== {nombre}")
+        print(f"  por_maquina ms: {res['por_maquina_ms']}")
+        print(f"  ultimas ms:     {res['ultimas_ms']}")
+        for consulta, filas in planes.items():
+            print(f"  plan {consulta}:")
+            for f in filas:
+                print(f"    {f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, default=20)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--every-minutes", type=int, default=10)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+# be/bench/bench_ingesta_stream.py
+"""
+Ingesta masiva: POST /lecturas/batch/stream (NDJSON o MessagePack generado
+mientras se envía) vs POST /lecturas/batch con el documento JSON completo.
+
+Reporta lecturas/s y el crecimiento del pico de memoria residente del
+proceso (ru_maxrss) en cada carga. El streaming corre primero: como el pico
+solo crece, lo que sume el batch es lo que necesita de más.
+
+    python -m bench.bench_ingesta_stream --lecturas 1000000 --batch 100000
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import time
+
+import httpx
+
+from gateway.main import app
+from ._common import base_de_datos, crear_maquinas
+
+
+def rss_mb() -> float:
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KiB, macOS bytes
+    return maximo / 1e6 if sys.platform == "darwin" else maximo / 1e3
+
+
+def registros(ids, n: int):
+    rng = random.Random(1234)
+    for i in range(n):
+        yield {"maquinaria_id": ids[i % len(ids)], "temperatura": round(rng.uniform(70, 125), 1),
+               "vibracion": round(rng.uniform(0.5, 5.0), 2), "presion_aceite": round(rng.uniform(1.0, 6.0), 2)}
+
+
+async def cuerpo(ids, n: int, formato: str, por_parte: int = 1000):
+    """Cuerpo generado a medida que el servidor lo lee"""
+    if formato == "msgpack":
+        import msgpack
+        empaquetar = msgpack.Packer().pack
+    else:
+        def empaquetar(r):
+            return json.dumps(r).encode() + b"\n"
+    parte = []
+    for r in registros(ids, n):
+        parte.append(empaquetar(r))
+        if len(parte) == por_parte:
+            yield b"".join(parte)
+            parte = []
+    if parte:
+        yield b"".join(parte)
+
+
+async def main(args):
+    tipos = {"ndjson": "application/x-ndjson", "msgpack": "application/msgpack"}
+    async with base_de_datos(args.url):
+        ids = await crear_maquinas(args.maquinas)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            for formato in args.formatos:
+                base = rss_mb()
+                t0 = time.perf_counter()
+                r = await http.post("/lecturas/batch/stream", content=cuerpo(ids, args.lecturas, formato),
+                                    headers={"content-type": tipos[formato]})
+                segundos = time.perf_counter() - t0
+                d = r.json()
+                print(f"stream {formato:<8} {d['inserted']:>9} lecturas  {d['inserted'] / segundos:>9,.0f} /s  "
+                      f"+{rss_mb() - base:7.1f} MB rss  errores {d['rejected']}")
+
+            base = rss_mb()
+            t0 = time.perf_counter()
+            r = await http.post("/lecturas/batch", json={"lecturas": list(registros(ids, args.batch))})
+            segundos = time.perf_counter() - t0
+            print(f"batch  json     {r.json()['inserted']:>9} lecturas  {args.batch / segundos:>9,.0f} /s  "
+                  f"+{rss_mb() - base:7.1f} MB rss")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, default=100)
+    parser.add_argument("--lecturas", type=int, default=1_000_000, help="Lecturas por carga en streaming")
+    parser.add_argument("--batch", type=int, default=100_000, help="Lecturas del POST /lecturas/batch")
+    parser.add_argument("--formatos", nargs="+", default=["ndjson", "msgpack"], choices=["ndjson", "msgpack"])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+# be/bench/bench_multimaquina.py
+"""
+Vista de flota: una request /lecturas/maquina/{id}?limit= por máquina (como
+el dashboard) vs una sola /lecturas/maquinas?limit= con ROW_NUMBER.
+
+Mide el tiempo total de obtener las últimas --limit lecturas de todas las
+máquinas por cada camino, con y sin ventana de tiempo (from = últimas
+--ventana-horas horas).
+
+    python -m bench.bench_multimaquina --maquinas 500 --days 7 --limit 50
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from gateway.catalogo import catalogo
+from gateway.db import async_session
+from gateway.main import app
+from gateway.routers import seed
+from ._common import base_de_datos, crear_maquinas, percentiles
+
+
+async def por_maquina(http, ids, limit: int) -> int:
+    total = 0
+    for m in ids:
+        r = await http.get(f"/lecturas/maquina/{m}", params={"limit": limit})
+        total += len(r.json())
+    return total
+
+
+async def una_request(http, limit: int, desde=None) -> int:
+    params = {"limit": limit, **({"from": desde.isoformat()} if desde else {})}
+    r = await http.get("/lecturas/maquinas", params=params)
+    return sum(len(s["ts"]) for s in r.json()["maquinas"].values())
+
+
+async def main(args):
+    async with base_de_datos(args.url):
+        ids = await crear_maquinas(args.maquinas)
+        await seed.seed_historico(days=args.days, every_minutes=args.every_minutes, base_temp=90.0,
+                                  base_vib=2.0, base_pres=3.5, temp_noise=15.0, vib_noise=1.5, pres_noise=1.0)
+        async with async_session() as db:
+            await catalogo.cargar(db)
+        desde = datetime.utcnow() - timedelta(hours=args.ventana_horas)
+
+        casos = [
+            (f"{len(ids)} x /maquina/{{id}}", lambda http: por_maquina(http, ids, args.limit)),
+            ("/maquinas", lambda http: una_request(http, args.limit)),
+            (f"/maquinas from=-{args.ventana_horas}h", lambda http: una_request(http, args.limit, desde)),
+        ]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            for nombre, caso in casos:
+                await caso(http)
+                tiempos, filas = [], 0
+                for _ in range(args.repeticiones):
+                    t0 = time.perf_counter()
+                    filas = await caso(http)
+                    tiempos.append(time.perf_counter() - t0)
+                print(f"{nombre:<28} {filas:>7} lecturas  {percentiles(tiempos)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, default=500)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--every-minutes", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--ventana-horas", type=int, default=12)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
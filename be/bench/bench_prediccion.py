@@ -0,0 +1,89 @@
+# be/bench/bench_prediccion.py
+"""
+Costo del motor de predicción con miles de máquinas.
+
+Mide la reconstrucción desde la BD al arrancar, el costo por lectura de la
+actualización incremental y la latencia de un pronóstico, comparada con
+releer la ventana de la máquina y ajustar la tendencia en cada llamada.
+
+    python -m bench.bench_prediccion --maquinas 1000 5000 --days 1
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+from gateway.db import async_session
+from gateway import models
+from gateway.prediccion import MotorPrediccion
+from gateway.routers import seed
+from ._common import base_de_datos, crear_maquinas, Cronometro, percentiles
+
+
+async def pronostico_releyendo(db, maquinaria_id: str, metrica: str, ventana: int):
+    """Alternativa sin estado: últimas `ventana` lecturas y ajuste lineal por llamada"""
+    filas = (await db.execute(
+        select(models.Lectura.ts, getattr(models.Lectura, metrica))
+        .where(models.Lectura.maquinaria_id == maquinaria_id)
+        .order_by(models.Lectura.ts.desc())
+        .limit(ventana)
+    )).all()
+    t = np.array([(f[0] - filas[-1][0]).total_seconds() / 3600 for f in filas])
+    x = np.array([f[1] for f in filas], dtype=float)
+    return np.polyfit(t, x, 1)[0]
+
+
+async def main(args):
+    print(f"{'maquinas':>9} {'lecturas':>10} {'rebuild s':>10} {'update us':>10} "
+          f"{'predict p50 ms':>15} {'p99 ms':>8} {'releer p50 ms':>14}")
+    for n in args.maquinas:
+        async with base_de_datos(args.url):
+            ids = await crear_maquinas(n)
+            r = await seed.seed_historico(days=args.days, every_minutes=10, base_temp=90.0, base_vib=2.0,
+                                          base_pres=3.5, temp_noise=15.0, vib_noise=1.5, pres_noise=1.0)
+
+            motor = MotorPrediccion(ventana=args.ventana)
+            async with async_session() as db:
+                with Cronometro() as rebuild:
+                    await motor.reconstruir(db)
+
+            # Una ronda de lecturas nuevas para todas las máquinas
+            ts = datetime.utcnow() + timedelta(minutes=10)
+            filas = [
+                {"maquinaria_id": m, "ts": ts, "temperatura": random.uniform(75, 105),
+                 "vibracion": random.uniform(0.5, 3.5), "presion_aceite": random.uniform(2.5, 4.5)}
+                for m in ids
+            ]
+            with Cronometro() as update:
+                motor.actualizar(filas)
+
+            tiempos = []
+            for m in random.choices(ids, k=args.llamadas):
+                with Cronometro() as c:
+                    motor.pronostico(m, "temperatura")
+                tiempos.append(c.segundos)
+            predict = percentiles(tiempos)
+
+            tiempos = []
+            async with async_session() as db:
+                for m in random.choices(ids, k=max(1, args.llamadas // 20)):
+                    with Cronometro() as c:
+                        await pronostico_releyendo(db, m, "temperatura", args.ventana)
+                    tiempos.append(c.segundos)
+            releer = percentiles(tiempos)
+
+            print(f"{n:>9} {r['inserted']:>10} {rebuild.segundos:>10.2f} "
+                  f"{update.segundos / n * 1e6:>10.1f} {predict['p50']:>15} {predict['p99']:>8} {releer['p50']:>14}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--ventana", type=int, default=200)
+    parser.add_argument("--llamadas", type=int, default=10000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,94 @@
+# be/bench/bench_purga.py
+"""
+Baja de una máquina con historial grande: cascada del ORM (carga y borra cada
+lectura, como antes), ON DELETE CASCADE en la BD y purga por lotes.
+
+Para cada camino siembra --days de lecturas por minuto en una máquina nueva,
+la borra y reporta segundos, pico de memoria Python (tracemalloc) y la
+latencia de un escritor que inserta lecturas de otra máquina mientras tanto.
+
+    python -m bench.bench_purga --days 60
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from gateway import models
+from gateway.config import settings
+from gateway.db import async_session
+from gateway.ingesta import guardar_lecturas
+from gateway.purga import borrar_maquina, purgas
+from gateway.routers import seed
+from ._common import base_de_datos, crear_maquinas, percentiles
+
+
+async def borrar_orm(maquinaria_id: str):
+    """Como lo hacía delete_maquina: la cascada del ORM carga todas las lecturas"""
+    async with async_session() as db:
+        maquina = (await db.execute(
+            select(models.Maquinaria).options(selectinload(models.Maquinaria.lecturas))
+            .where(models.Maquinaria.id == maquinaria_id)
+        )).scalar_one()
+        for lectura in maquina.lecturas:
+            await db.delete(lectura)
+        await db.delete(maquina)
+        await db.commit()
+
+
+async def borrar_cascada(maquinaria_id: str):
+    async with async_session() as db:
+        await borrar_maquina(db, maquinaria_id)
+
+
+async def borrar_purga(maquinaria_id: str):
+    trabajo = purgas.iniciar(maquinaria_id)
+    while trabajo["estado"] == "en_curso":
+        await asyncio.sleep(0.01)
+
+
+async def escritor(maquinaria_id: str, detener: asyncio.Event, tiempos: list):
+    while not detener.is_set():
+        fila = {"maquinaria_id": maquinaria_id, "temperatura": 90.0, "vibracion": 1.0,
+                "presion_aceite": 3.5, "ts": datetime.utcnow(), "estado": "OK", "motivo_bits": 0}
+        t0 = time.perf_counter()
+        async with async_session() as db:
+            await guardar_lecturas(db, [fila])
+        tiempos.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.005)
+
+
+async def main(args):
+    settings.purga_lote = args.lote
+    caminos = {"orm": borrar_orm, "cascada": borrar_cascada, "purga": borrar_purga}
+    async with base_de_datos(args.url):
+        (otra,) = await crear_maquinas(1, tipo="OTRA")
+        for nombre, borrar in caminos.items():
+            (maquina,) = await crear_maquinas(1)
+            r = await seed.seed_historico_maquina(
+                maquinaria_id=maquina, days=args.days, every_minutes=1, base_temp=90.0, base_vib=2.0,
+                base_pres=3.5, temp_noise=15.0, vib_noise=1.5, pres_noise=1.0)
+            detener, tiempos = asyncio.Event(), []
+            tarea = asyncio.create_task(escritor(otra, detener, tiempos))
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            await borrar(maquina)
+            segundos = time.perf_counter() - t0
+            pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            detener.set()
+            await tarea
+            print(f"{nombre:<8} {r['inserted']:>9} lecturas  {segundos:7.2f} s  pico {pico / 1e6:8.1f} MB  "
+                  f"escritor {percentiles(tiempos)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--lote", type=int, default=5000, help="PURGA_LOTE")
+    asyncio.run(main(parser.parse_args()))
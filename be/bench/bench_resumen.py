@@ -0,0 +1,71 @@
+# be/bench/bench_resumen.py
+"""
+Latencia de /resumen a medida que crece el histórico.
+
+Compara calcular_resumen (una consulta, estado actual por índice) con el
+cálculo anterior (última lectura por GROUP BY + todas las máquinas a Python).
+
+    python -m bench.bench_resumen --maquinas 200 --days 1 7 30
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import select, func
+
+from gateway.db import async_session
+from gateway import models
+from gateway.routers import seed
+from gateway.routers.resumen import calcular_resumen
+from ._common import base_de_datos, crear_maquinas, Cronometro, percentiles
+
+
+async def resumen_en_python(db):
+    """Implementación anterior de /lecturas/resumen"""
+    subq = (
+        select(models.Lectura.maquinaria_id, func.max(models.Lectura.ts).label("max_ts"))
+        .group_by(models.Lectura.maquinaria_id)
+        .subquery()
+    )
+    lecturas = (await db.execute(
+        select(models.Lectura).join(
+            subq,
+            (models.Lectura.maquinaria_id == subq.c.maquinaria_id) &
+            (models.Lectura.ts == subq.c.max_ts)
+        )
+    )).scalars().all()
+    maquinas = (await db.execute(select(models.Maquinaria))).scalars().all()
+    por_tipo = {}
+    for m in maquinas:
+        por_tipo[m.tipo] = por_tipo.get(m.tipo, 0) + 1
+    return sum(1 for l in lecturas if l.estado == "OK"), por_tipo
+
+
+async def medir(fn, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        async with async_session() as db:
+            with Cronometro() as c:
+                await fn(db)
+        tiempos.append(c.segundos)
+    return percentiles(tiempos)
+
+
+async def main(args):
+    print(f"{'days':>5} {'lecturas':>10} {'sql p50 ms':>11} {'python p50 ms':>14}")
+    for days in args.days:
+        async with base_de_datos(args.url):
+            await crear_maquinas(args.maquinas)
+            r = await seed.seed_historico(days=days, every_minutes=10, base_temp=90.0, base_vib=2.0,
+                                          base_pres=3.5, temp_noise=15.0, vib_noise=1.5, pres_noise=1.0)
+            sql = await medir(calcular_resumen, args.repeticiones)
+            py = await medir(resumen_en_python, max(1, args.repeticiones // 5))
+            print(f"{days:>5} {r['inserted']:>10} {sql['p50']:>11} {py['p50']:>14}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, default=200)
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 7, 30])
+    parser.add_argument("--repeticiones", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
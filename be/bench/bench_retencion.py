@@ -0,0 +1,97 @@
+# be/bench/bench_retencion.py
+"""
+Archivado por lotes de lecturas vencidas.
+
+Siembra el histórico, archiva lo anterior a RETENCION_DIAS mientras un
+escritor inserta lotes en paralelo y reporta filas/s archivadas, latencia de
+la ingesta concurrente y que /lecturas/history devuelva lo mismo antes y
+después (lecturas vivas + tablas de archivo).
+
+    python -m bench.bench_retencion --maquinas 50 --days 60 --retencion 15
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+from gateway.config import settings
+from gateway.db import async_session
+from gateway import models
+from gateway.ingesta import guardar_lecturas
+from gateway.retencion import retencion
+from gateway.rollups import compactador
+from gateway.routers import seed, lecturas
+from ._common import base_de_datos, crear_maquinas, Cronometro, percentiles
+
+
+async def historia_completa(maquinaria_id: str, desde: datetime) -> list:
+    """Recorre todas las páginas crudas de una máquina"""
+    items, cursor = [], None
+    async with async_session() as db:
+        while True:
+            page = await lecturas.get_history(maquinaria_id=maquinaria_id, desde=desde, hasta=None,
+                                              cursor=cursor, limit=5000, bucket_minutes=None, db=db)
+            items += [i["id"] for i in page["items"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                return items
+
+
+async def escritor(maquinas, detener: asyncio.Event, tiempos: list):
+    while not detener.is_set():
+        filas = [
+            {"maquinaria_id": m, "temperatura": 90.0, "vibracion": 1.0,
+             "presion_aceite": 3.5, "ts": datetime.utcnow(), "estado": "OK", "motivo_bits": 0}
+            for m in random.sample(maquinas, min(50, len(maquinas)))
+        ]
+        async with async_session() as db:
+            with Cronometro() as c:
+                await guardar_lecturas(db, filas)
+        tiempos.append(c.segundos)
+        await asyncio.sleep(0.01)
+
+
+async def main(args):
+    async with base_de_datos(args.url):
+        maquinas = await crear_maquinas(args.maquinas)
+        r = await seed.seed_historico(days=args.days, every_minutes=10, base_temp=90.0, base_vib=2.0,
+                                      base_pres=3.5, temp_noise=15.0, vib_noise=1.5, pres_noise=1.0)
+        async with async_session() as db:
+            await compactador.ejecutar(db)
+            await retencion.cargar(db)
+
+        desde = datetime.utcnow() - timedelta(days=args.days + 1)
+        antes = await historia_completa(maquinas[0], desde)
+
+        settings.retencion_dias = args.retencion
+        settings.retencion_lote = args.lote
+        detener, tiempos = asyncio.Event(), []
+        tarea = asyncio.create_task(escritor(maquinas, detener, tiempos))
+        async with async_session() as db:
+            with Cronometro() as c:
+                archivadas = await retencion.archivar(db)
+        detener.set()
+        await tarea
+
+        despues = await historia_completa(maquinas[0], desde)
+        async with async_session() as db:
+            vivas = (await db.execute(select(func.count()).select_from(models.Lectura))).scalar()
+
+        print(f"lecturas sembradas:   {r['inserted']}")
+        print(f"archivadas:           {archivadas} en {c.segundos:.2f} s ({archivadas / c.segundos:.0f} filas/s)")
+        print(f"vivas:                {vivas}  tablas de archivo: {len(retencion.meses)}")
+        print(f"ingesta concurrente:  {percentiles(tiempos)} ms ({len(tiempos)} lotes)")
+        print(f"history máquina 0:    antes {len(antes)} filas, después {len(despues)}, "
+              f"iguales={antes == despues[:len(antes)]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, default=50)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--retencion", type=int, default=15)
+    parser.add_argument("--lote", type=int, default=settings.retencion_lote)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+# be/bench/bench_rollups.py
+"""
+Histórico de rango largo desde lecturas crudas vs agregados por hora/día.
+
+Siembra el histórico, mide el backfill de lecturas_hora/lecturas_dia y compara
+/lecturas/history con buckets de 1 hora y de 1 día leyendo cada fuente.
+
+    python -m bench.bench_rollups --maquinas 50 --days 30 60
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from gateway.config import settings
+from gateway.db import async_session
+from gateway.rollups import compactar
+from gateway.routers import seed, lecturas
+from ._common import base_de_datos, crear_maquinas, Cronometro, percentiles
+
+
+async def medir_history(maquinas, desde, bucket_minutes, repeticiones, rollups: bool):
+    settings.rollup_habilitado = rollups
+    tiempos = []
+    for i in range(repeticiones):
+        async with async_session() as db:
+            with Cronometro() as c:
+                page = await lecturas.get_history(
+                    maquinaria_id=maquinas[i % len(maquinas)], desde=desde, hasta=None, cursor=None,
+                    limit=10000, bucket_minutes=bucket_minutes, db=db,
+                )
+        tiempos.append(c.segundos)
+    return percentiles(tiempos), page.get("fuente", "lecturas")
+
+
+async def main(args):
+    settings.history_rollup_horas = 0
+    settings.history_rollup_dias = 0
+    print(f"{'days':>5} {'lecturas':>10} {'backfill s':>11} {'bucket':>7} {'crudas p50 ms':>14} {'agregados p50 ms':>17}")
+    for days in args.days:
+        async with base_de_datos(args.url):
+            maquinas = await crear_maquinas(args.maquinas)
+            r = await seed.seed_historico(days=days, every_minutes=10, base_temp=90.0, base_vib=2.0,
+                                          base_pres=3.5, temp_noise=15.0, vib_noise=1.5, pres_noise=1.0)
+            async with async_session() as db:
+                with Cronometro() as backfill:
+                    await compactar(db, datetime.utcnow() - timedelta(days=days + 1), datetime.utcnow())
+
+            desde = datetime.utcnow() - timedelta(days=days)
+            for bucket in (60, 1440):
+                crudas, _ = await medir_history(maquinas, desde, bucket, args.repeticiones, rollups=False)
+                agregados, fuente = await medir_history(maquinas, desde, bucket, args.repeticiones, rollups=True)
+                print(f"{days:>5} {r['inserted']:>10} {backfill.segundos:>11.2f} {bucket:>7} "
+                      f"{crudas['p50']:>14} {agregados['p50']:>17}  ({fuente})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, default=50)
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 60])
+    parser.add_argument("--repeticiones", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
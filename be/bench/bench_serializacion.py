@@ -0,0 +1,100 @@
+# be/bench/bench_serializacion.py
+"""
+Serialización de respuestas grandes: ORM + validación Pydantic + json vs
+tuplas de columnas + JSONRapida (orjson).
+
+Compara los handlers actuales de /lecturas/maquina/{id}, /lecturas/latest y
+/maquinaria con réplicas del comportamiento anterior montadas en una app
+aparte, con respuestas de `--filas` elementos. Reporta latencia y pico de
+memoria Python (tracemalloc) por request.
+
+    python -m bench.bench_serializacion --filas 10000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import select, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from gateway import models, schemas
+from gateway.catalogo import catalogo
+from gateway.db import async_session, get_db
+from gateway.main import app
+from gateway.routers import seed
+from gateway.ultimas import ultimas
+from ._common import base_de_datos, crear_maquinas, percentiles
+
+# Handlers como estaban antes: objetos ORM validados uno a uno contra response_model
+anterior = FastAPI()
+
+
+@anterior.get("/lecturas/maquina/{maquinaria_id}", response_model=list[schemas.LecturaDB])
+async def maquina_anterior(maquinaria_id: str, limit: int = 100, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(models.Lectura).where(models.Lectura.maquinaria_id == maquinaria_id)
+        .order_by(desc(models.Lectura.ts)).limit(limit)
+    )
+    return result.scalars().all()
+
+
+@anterior.get("/lecturas/latest", response_model=list[schemas.LecturaDB])
+async def latest_anterior():
+    return ultimas.latest()
+
+
+@anterior.get("/maquinaria", response_model=list[schemas.MaquinaOut])
+async def maquinaria_anterior(db: AsyncSession = Depends(get_db)):
+    return (await db.execute(select(models.Maquinaria))).scalars().all()
+
+
+async def medir(aplicacion, url: str, params: dict, repeticiones: int) -> dict:
+    transport = httpx.ASGITransport(app=aplicacion)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        await http.get(url, params=params)
+        tiempos, picos, tam, n = [], [], 0, 0
+        for _ in range(repeticiones):
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            r = await http.get(url, params=params)
+            tiempos.append(time.perf_counter() - t0)
+            picos.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            tam, n = len(r.content), len(r.json())
+    return {"elementos": n, "bytes": tam, "latencia_ms": percentiles(tiempos),
+            "pico_mb": round(max(picos) / 1e6, 1)}
+
+
+async def main(args):
+    async with base_de_datos(args.url):
+        ids = await crear_maquinas(args.filas)
+        # Una lectura por máquina para /latest y --filas lecturas para la primera
+        await seed.seed_historico(days=1, every_minutes=60, base_temp=90.0, base_vib=2.0,
+                                  base_pres=3.5, temp_noise=15.0, vib_noise=1.5, pres_noise=1.0)
+        await seed.seed_historico_maquina(maquinaria_id=ids[0], days=args.filas // 1440 + 1, every_minutes=1,
+                                          base_temp=90.0, base_vib=2.0, base_pres=3.5,
+                                          temp_noise=15.0, vib_noise=1.5, pres_noise=1.0)
+        async with async_session() as db:
+            await ultimas.cargar(db)
+            await catalogo.cargar(db)
+
+        casos = [
+            ("/lecturas/maquina/{id}", f"/lecturas/maquina/{ids[0]}", {"limit": args.filas}),
+            ("/lecturas/latest", "/lecturas/latest", {}),
+            ("/maquinaria", "/maquinaria", {}),
+        ]
+        for nombre, url, params in casos:
+            for etiqueta, aplicacion in (("anterior", anterior), ("actual", app)):
+                r = await medir(aplicacion, url, params, args.repeticiones)
+                print(f"{nombre:<24} {etiqueta:<9} {r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
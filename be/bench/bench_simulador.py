@@ -0,0 +1,54 @@
+# be/bench/bench_simulador.py
+"""
+Simulador con miles de máquinas virtuales a intervalos sub-segundo.
+
+Crea las máquinas, arranca el simulador con el perfil indicado y reporta cada
+pocos segundos lo mismo que /sim/status (filas/s, retraso de los slots,
+errores), más la distribución de estados generada.
+
+    python -m bench.bench_simulador --maquinas 10000 --interval 1 --segundos 20 --perfil fallas
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import select, func
+
+from gateway.db import async_session
+from gateway import models
+from gateway.routers.seed import seed_maquinaria
+from gateway.routers.simulador import Simulador
+from ._common import base_de_datos
+
+
+async def main(args):
+    async with base_de_datos(args.url):
+        await seed_maquinaria(cantidad=args.maquinas, tipo="SIM")
+        sim = Simulador()
+        sim.iniciar(args.interval, args.perfil, args.prob_falla)
+        objetivo = args.maquinas / args.interval
+        print(f"objetivo: {objetivo:.0f} filas/s")
+        for _ in range(int(args.segundos // args.cada)):
+            await asyncio.sleep(args.cada)
+            e = sim.estado()
+            print(f"filas/s {e['rows_per_sec']:>9}  lag {e['lag_ms']}  slots {e['slots']}  "
+                  f"saltados {e['slots_saltados']}  errores {e['errores']}")
+        await sim.detener()
+
+        async with async_session() as db:
+            conteo = (await db.execute(
+                select(models.Lectura.estado, func.count()).group_by(models.Lectura.estado)
+            )).all()
+        total = sum(n for _, n in conteo)
+        print(f"lecturas: {total}  " + "  ".join(f"{estado} {n / total:.1%}" for estado, n in conteo))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, default=10000)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--segundos", type=float, default=20.0)
+    parser.add_argument("--cada", type=float, default=5.0, help="Segundos entre reportes")
+    parser.add_argument("--perfil", default="aleatorio", choices=("aleatorio", "deriva", "fallas"))
+    parser.add_argument("--prob-falla", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+# be/bench/bench_stream.py
+"""
+Carga del pub/sub de /lecturas/stream con cientos de suscriptores.
+
+Un publicador simula ticks del simulador (una lectura por máquina) a través de
+ingesta.lecturas_confirmadas; cada suscriptor consume el generador SSE real.
+Una fracción de suscriptores es lenta para verificar que no frena a los demás.
+
+    python -m bench.bench_stream --suscriptores 500 --maquinas 200 --ticks 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+
+from gateway.eventos import broker, stream_sse
+from gateway.ingesta import lecturas_confirmadas
+from ._common import percentiles
+
+
+async def consumir(sub, lento, fin, publicados, stats):
+    async def desconectado():
+        return fin.is_set()
+
+    async for bloque in stream_sse(sub, desconectado, ping_segundos=0.5):
+        if bloque.startswith("event: perdidos"):
+            stats["perdidos"] += json.loads(bloque.split("data: ", 1)[1])["cantidad"]
+        elif bloque.startswith("event: "):
+            # Latencia del bloque según la primera lectura que contiene
+            primera = json.loads(bloque.split("data: ", 2)[1].split("\n", 1)[0])
+            stats["latencias"].append(time.perf_counter() - publicados[primera.get("id") or primera["lectura_id"]])
+            stats["entregados"] += bloque.count("event: ")
+        if lento:
+            await asyncio.sleep(0.05)
+
+
+async def main(args):
+    maquinas = [f"maq-{i}" for i in range(args.maquinas)]
+    fin = asyncio.Event()
+    publicados = {}
+    stats = {"latencias": [], "entregados": 0, "perdidos": 0}
+
+    consumidores = []
+    for i in range(args.suscriptores):
+        filtro = random.sample(maquinas, 3) if i % 10 == 0 else None
+        sub = broker.suscribir(filtro, maxsize=args.cola)
+        consumidores.append(asyncio.create_task(
+            consumir(sub, i < args.suscriptores * args.lentos, fin, publicados, stats)
+        ))
+    print(f"suscriptores activos: {broker.suscriptores}")
+
+    tiempos_publicacion = []
+    siguiente_id = 0
+    for _ in range(args.ticks):
+        ahora = datetime.utcnow()
+        filas = []
+        for m in maquinas:
+            siguiente_id += 1
+            filas.append({"id": siguiente_id, "maquinaria_id": m, "ts": ahora,
+                          "estado": random.choice(("OK", "OK", "ALERTA", "CRITICO")),
+                          "temperatura": 90.0, "vibracion": 2.0, "presion_aceite": 3.0, "motivo_bits": 0})
+        t0 = time.perf_counter()
+        for f in filas:
+            publicados[f["id"]] = t0
+        lecturas_confirmadas(filas)
+        tiempos_publicacion.append(time.perf_counter() - t0)
+        await asyncio.sleep(args.intervalo)
+
+    await asyncio.sleep(1)
+    fin.set()
+    await asyncio.gather(*consumidores)
+
+    print(f"lecturas publicadas:   {siguiente_id}")
+    print(f"publicación por tick:  {percentiles(tiempos_publicacion)} ms")
+    print(f"eventos entregados:    {stats['entregados']}")
+    print(f"descartados (lentos):  {stats['perdidos']}")
+    print(f"latencia por bloque:   {percentiles(stats['latencias'])} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--suscriptores", type=int, default=500)
+    parser.add_argument("--maquinas", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--intervalo", type=float, default=0.5, help="segundos entre ticks")
+    parser.add_argument("--lentos", type=float, default=0.1, help="fracción de suscriptores lentos")
+    parser.add_argument("--cola", type=int, default=100, help="bloques por suscriptor")
+    asyncio.run(main(parser.parse_args()))
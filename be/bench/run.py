@@ -0,0 +1,189 @@
+# be/bench/run.py
+"""
+Suite de carga reproducible de la API del gateway.
+
+Levanta la app en proceso (ASGI, sin red) sobre una SQLite temporal o la URL
+indicada (p. ej. un PostgreSQL local), siembra N máquinas × M días con la
+lógica de /seed y mide rendimiento y latencia p50/p95/p99 de cada endpoint
+con varios clientes concurrentes. El resultado es JSON para comparar entre
+commits:
+
+    python -m bench.run --maquinas 200 --days 7 --salida base.json
+    python -m bench.run --maquinas 200 --days 7 --base base.json
+
+Con --base se agrega la relación p95 actual/base por endpoint y el proceso
+termina con código 1 si alguno supera --tolerancia.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy.engine import make_url
+
+from gateway.db import async_session
+from gateway.main import app
+from gateway.prediccion import motor
+from gateway.retencion import retencion
+from gateway.rollups import compactador
+from gateway.routers import seed
+from gateway.ultimas import ultimas
+from gateway.catalogo import catalogo
+from ._common import base_de_datos, crear_maquinas, percentiles
+
+
+def _lectura(ids) -> dict:
+    return {
+        "maquinaria_id": random.choice(ids),
+        "temperatura": round(random.uniform(70, 110), 1),
+        "vibracion": round(random.uniform(1.0, 5.0), 1),
+        "presion_aceite": round(random.uniform(1.5, 6.0), 1),
+    }
+
+
+# nombre -> función (cliente, ids, args) que hace un request y retorna la respuesta
+ESCENARIOS = {
+    "POST /lecturas": lambda http, ids, args: http.post("/lecturas", json=_lectura(ids)),
+    "POST /lecturas/batch": lambda http, ids, args: http.post(
+        "/lecturas/batch", json={"lecturas": [_lectura(ids) for _ in range(args.batch)]}),
+    "GET /lecturas/latest": lambda http, ids, args: http.get("/lecturas/latest"),
+    "GET /lecturas/resumen": lambda http, ids, args: http.get("/lecturas/resumen"),
+    "GET /lecturas/maquina/{id}": lambda http, ids, args: http.get(
+        f"/lecturas/maquina/{random.choice(ids)}", params={"limit": 100}),
+    "GET /maquinaria": lambda http, ids, args: http.get("/maquinaria"),
+}
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+async def medir(http, nombre: str, ids, args) -> dict:
+    hacer = ESCENARIOS[nombre]
+    for _ in range(args.calentamiento):
+        await hacer(http, ids, args)
+
+    tiempos, codigos = [], {}
+    pendientes = iter(range(args.requests))
+
+    async def cliente():
+        for _ in pendientes:
+            t0 = time.perf_counter()
+            r = await hacer(http, ids, args)
+            tiempos.append(time.perf_counter() - t0)
+            codigos[r.status_code] = codigos.get(r.status_code, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(args.clientes)))
+    total = time.perf_counter() - t0
+    resultado = {
+        "requests": len(tiempos),
+        "req_s": round(len(tiempos) / total, 1),
+        "latencia_ms": percentiles(tiempos),
+        "codigos": {str(c): n for c, n in sorted(codigos.items())},
+    }
+    if nombre == "POST /lecturas/batch":
+        resultado["filas_s"] = round(len(tiempos) * args.batch / total)
+    return resultado
+
+
+async def correr(args) -> dict:
+    async with base_de_datos(args.url) as engine:
+        ids = await crear_maquinas(args.maquinas)
+        t_seed = time.perf_counter()
+        sembradas = (await seed.seed_historico(
+            days=args.days, every_minutes=args.every_minutes, base_temp=90.0, base_vib=2.0,
+            base_pres=3.5, temp_noise=15.0, vib_noise=1.5, pres_noise=1.0))["inserted"]
+        seed_s = time.perf_counter() - t_seed
+        # Lo mismo que el startup de la app, sobre la base del benchmark
+        async with async_session() as db:
+            await ultimas.cargar(db)
+            await catalogo.cargar(db)
+            await motor.reconstruir(db)
+            await retencion.cargar(db)
+            await compactador.ejecutar(db)
+
+        resultados = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            for nombre in args.endpoints:
+                resultados[nombre] = await medir(http, nombre, ids, args)
+                print(f"{nombre:<28} {resultados[nombre]['req_s']:>9} req/s  "
+                      f"{resultados[nombre]['latencia_ms']}", file=sys.stderr)
+
+    return {
+        "commit": _commit(),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "motor": make_url(engine.url).get_backend_name(),
+        "parametros": {
+            "maquinas": args.maquinas, "days": args.days, "every_minutes": args.every_minutes,
+            "lecturas_sembradas": sembradas, "seed_s": round(seed_s, 2), "clientes": args.clientes,
+            "requests": args.requests, "batch": args.batch,
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(actual: dict, base: dict, tolerancia: float) -> bool:
+    """Agrega p95 actual/base a cada endpoint; retorna True si alguno empeoró más que la tolerancia"""
+    regresion = False
+    for nombre, r in actual["resultados"].items():
+        previo = base.get("resultados", {}).get(nombre)
+        if not previo or not previo["latencia_ms"]["p95"] or not r["latencia_ms"]["p95"]:
+            continue
+        relacion = round(r["latencia_ms"]["p95"] / previo["latencia_ms"]["p95"], 3)
+        r["p95_vs_base"] = relacion
+        if relacion > tolerancia:
+            regresion = True
+            print(f"REGRESIÓN {nombre}: p95 {previo['latencia_ms']['p95']} -> "
+                  f"{r['latencia_ms']['p95']} ms (x{relacion})", file=sys.stderr)
+    actual["base"] = base.get("commit")
+    return regresion
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy async (por defecto SQLite temporal)")
+    parser.add_argument("--maquinas", type=int, default=100)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--every-minutes", type=int, default=10)
+    parser.add_argument("--clientes", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests por endpoint")
+    parser.add_argument("--calentamiento", type=int, default=20, help="Requests previos no medidos")
+    parser.add_argument("--batch", type=int, default=100, help="Lecturas por POST /lecturas/batch")
+    parser.add_argument("--endpoints", nargs="+", default=list(ESCENARIOS), choices=list(ESCENARIOS))
+    parser.add_argument("--seed", type=int, default=1234, help="Semilla de random")
+    parser.add_argument("--salida", default=None, help="Archivo JSON (por defecto stdout)")
+    parser.add_argument("--base", default=None, help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=1.2, help="p95 actual/base máximo")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    resultado = asyncio.run(correr(args))
+    regresion = False
+    if args.base:
+        with open(args.base, encoding="utf-8") as f:
+            regresion = comparar(resultado, json.load(f), args.tolerancia)
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    sys.exit(1 if regresion else 0)
+
+
+if __name__ == "__main__":
+    main()
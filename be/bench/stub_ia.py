@@ -0,0 +1,52 @@
+# be/bench/stub_ia.py
+"""
+Servidor mínimo que imita al módulo de IA (localhost:8001) para pruebas locales.
+
+    python -m bench.stub_ia --port 8001 --latencia-ms 20
+
+POST /control?fallar=true hace que /health y /api/v1/predict respondan 500.
+"""
+import argparse
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Stub módulo IA")
+app.state.latencia = 0.0
+app.state.fallar = False
+app.state.llamadas = 0
+
+
+@app.get("/health")
+async def health():
+    if app.state.fallar:
+        return JSONResponse({"ok": False}, status_code=500)
+    return {"ok": True}
+
+
+@app.post("/api/v1/predict")
+async def predict(data: dict):
+    app.state.llamadas += 1
+    await asyncio.sleep(app.state.latencia)
+    if app.state.fallar:
+        return JSONResponse({"detail": "fallo simulado"}, status_code=500)
+    return {"entrada": data, "riesgo": 0.42, "llamada": app.state.llamadas}
+
+
+@app.post("/control")
+async def control(fallar: bool = False, latencia_ms: float = None):
+    app.state.fallar = fallar
+    if latencia_ms is not None:
+        app.state.latencia = latencia_ms / 1000
+    return {"fallar": app.state.fallar, "latencia_ms": app.state.latencia * 1000}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    app.state.latencia = args.latencia_ms / 1000
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
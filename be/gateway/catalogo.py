@@ -0,0 +1,178 @@
+# be/gateway/catalogo.py
+"""
+Catálogo de máquinas en memoria del proceso.
+
+Sirve GET /maquinaria (paginado por cursor, filtro por tipo, ETag) y resuelve
+maquinaria_id -> numero_serie en la ingesta sin consultar la BD. Las rutas de
+alta, edición y baja lo actualizan después de su commit; con
+CATALOGO_TTL_SEGUNDOS se recarga periódicamente para ver cambios hechos por
+otros procesos.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import time
+from bisect import bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import settings
+from .respuestas import dumps
+
+CAMPOS = ("id", "nombre", "tipo", "descripcion", "numero_serie", "motor")
+# Respuestas serializadas guardadas por versión del catálogo
+MAX_RESPUESTAS = 256
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def _clave(maquina: dict) -> Tuple[str, str]:
+    return (maquina["nombre"], maquina["id"])
+
+
+def _encode_cursor(clave: Tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(clave)).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        nombre, maquinaria_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (str(nombre), str(maquinaria_id))
+    except Exception:
+        raise CursorInvalido("cursor inválido")
+
+
+class CatalogoMaquinas:
+    """Máquinas por id y ordenadas por (nombre, id) para paginar por cursor"""
+
+    def __init__(self):
+        self._por_id: Dict[str, dict] = {}
+        self._orden: List[Tuple[str, str]] = []
+        # Cambia con cada alta/edición/baja; invalida las respuestas guardadas
+        self.version = 0
+        self._respuestas: Dict[tuple, Tuple[bytes, str, Optional[str]]] = {}
+        self._lock = asyncio.Lock()
+        self.cargado_en: Optional[float] = None
+        # Máquinas en purga: siguen en la BD pero no se cargan
+        self._ocultas: set = set()
+
+    async def cargar(self, db: AsyncSession):
+        result = await db.execute(select(*(getattr(models.Maquinaria, c) for c in CAMPOS)))
+        maquinas = [dict(r) for r in result.mappings() if r["id"] not in self._ocultas]
+        self._por_id = {m["id"]: m for m in maquinas}
+        self._orden = sorted(_clave(m) for m in maquinas)
+        self._invalidar()
+        self.cargado_en = time.monotonic()
+
+    async def asegurar(self, db: AsyncSession):
+        """Carga perezosa y recarga cuando vence CATALOGO_TTL_SEGUNDOS"""
+        if not self._vencido():
+            return
+        async with self._lock:
+            if self._vencido():
+                await self.cargar(db)
+
+    def _vencido(self) -> bool:
+        if self.cargado_en is None:
+            return True
+        ttl = settings.catalogo_ttl_segundos
+        return bool(ttl) and time.monotonic() - self.cargado_en > ttl
+
+    def _invalidar(self):
+        self.version += 1
+        self._respuestas.clear()
+
+    def alta(self, maquina):
+        """Registra una máquina creada o editada (ORM o dict)"""
+        datos = {c: (maquina[c] if isinstance(maquina, dict) else getattr(maquina, c)) for c in CAMPOS}
+        previa = self._por_id.get(datos["id"])
+        if previa is not None:
+            self._orden.remove(_clave(previa))
+        self._por_id[datos["id"]] = datos
+        insort(self._orden, _clave(datos))
+        self._invalidar()
+
+    def baja(self, maquinaria_id: str):
+        previa = self._por_id.pop(maquinaria_id, None)
+        if previa is not None:
+            self._orden.remove(_clave(previa))
+            self._invalidar()
+
+    def ocultar(self, maquinaria_id: str):
+        """Baja que sobrevive a las recargas hasta mostrar()"""
+        self._ocultas.add(maquinaria_id)
+        self.baja(maquinaria_id)
+
+    def mostrar(self, maquinaria_id: str):
+        """Deja de ocultar la máquina; vuelve en la próxima recarga si sigue en la BD"""
+        self._ocultas.discard(maquinaria_id)
+
+    def obtener(self, maquinaria_id: str) -> Optional[dict]:
+        return self._por_id.get(maquinaria_id)
+
+    def series(self, ids: Iterable[str]) -> Dict[str, str]:
+        """{maquinaria_id: numero_serie} de las máquinas existentes"""
+        por_id = self._por_id
+        return {m: por_id[m]["numero_serie"] for m in set(ids) if m in por_id}
+
+    def tipos(self) -> Dict[str, str]:
+        """{maquinaria_id: tipo} de todas las máquinas"""
+        return {m: datos["tipo"] for m, datos in self._por_id.items()}
+
+    def ids_de_tipo(self, tipo: Optional[str]) -> set:
+        """Ids de las máquinas del tipo (todas con tipo None)"""
+        if tipo is None:
+            return set(self._por_id)
+        return {m for m, datos in self._por_id.items() if datos["tipo"] == tipo}
+
+    def pagina(self, tipo: Optional[str], cursor: Optional[str], limit: Optional[int]) -> Tuple[bytes, str, Optional[str]]:
+        """
+        Página serializada en JSON, su ETag fuerte y el cursor siguiente.
+        Sin limit se retorna todo desde el cursor (comportamiento original).
+        """
+        key = (tipo, cursor, limit)
+        guardada = self._respuestas.get(key)
+        if guardada is not None:
+            return guardada
+
+        inicio = bisect_right(self._orden, _decode_cursor(cursor)) if cursor else 0
+        items: List[dict] = []
+        siguiente = None
+        for i in range(inicio, len(self._orden)):
+            m = self._por_id[self._orden[i][1]]
+            if tipo is not None and m["tipo"] != tipo:
+                continue
+            if limit is not None and len(items) == limit:
+                siguiente = _encode_cursor(_clave(items[-1]))
+                break
+            items.append(m)
+
+        cuerpo = dumps(items)
+        etag = etag_de(cuerpo)
+        if len(self._respuestas) >= MAX_RESPUESTAS:
+            self._respuestas.clear()
+        self._respuestas[key] = (cuerpo, etag, siguiente)
+        return cuerpo, etag, siguiente
+
+
+def etag_de(cuerpo: bytes) -> str:
+    """ETag fuerte: hash del cuerpo exacto de la respuesta"""
+    return '"' + hashlib.blake2b(cuerpo, digest_size=16).hexdigest() + '"'
+
+
+def coincide_etag(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110), admite lista y *"""
+    if not if_none_match:
+        return False
+    valores = [v.strip() for v in if_none_match.split(",")]
+    return "*" in valores or any(v.removeprefix("W/") == etag for v in valores)
+
+
+# Instancia única del proceso
+catalogo = CatalogoMaquinas()
@@ -0,0 +1,158 @@
+# be/gateway/cliente_ia.py
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from .config import settings, Settings
+
+
+class CircuitoAbierto(Exception):
+    """El módulo de IA falló repetidamente y se rechaza sin intentar la llamada"""
+
+
+class CacheTTL:
+    """LRU acotado con expiración por entrada"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._datos: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, clave: str):
+        item = self._datos.get(clave)
+        if item is None:
+            return None
+        expira, valor = item
+        if expira < time.monotonic():
+            del self._datos[clave]
+            return None
+        self._datos.move_to_end(clave)
+        return valor
+
+    def set(self, clave: str, valor: Any):
+        self._datos[clave] = (time.monotonic() + self.ttl, valor)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_entries:
+            self._datos.popitem(last=False)
+
+    def clear(self):
+        self._datos.clear()
+
+
+class Circuito:
+    """
+    Circuit breaker: tras `fallos_max` fallos seguidos se abre durante
+    `reset_segundos`; luego deja pasar una sola llamada de prueba.
+    """
+
+    def __init__(self, fallos_max: int, reset_segundos: float):
+        self.fallos_max = fallos_max
+        self.reset_segundos = reset_segundos
+        self.fallos = 0
+        self.abierto_hasta = 0.0
+        self._probando = False
+
+    @property
+    def estado(self) -> str:
+        if self.fallos < self.fallos_max:
+            return "cerrado"
+        return "abierto" if time.monotonic() < self.abierto_hasta else "semiabierto"
+
+    def permitir(self):
+        estado = self.estado
+        if estado == "abierto" or (estado == "semiabierto" and self._probando):
+            raise CircuitoAbierto()
+        if estado == "semiabierto":
+            self._probando = True
+
+    def exito(self):
+        self.fallos = 0
+        self._probando = False
+
+    def fallo(self):
+        self.fallos += 1
+        self._probando = False
+        if self.fallos >= self.fallos_max:
+            self.abierto_hasta = time.monotonic() + self.reset_segundos
+
+
+class ClienteIA:
+    """
+    Cliente compartido hacia el módulo de IA: un httpx.AsyncClient con pool
+    y keep-alive durante toda la vida de la app, caché de predicciones,
+    circuit breaker y estado de salud cacheado unos segundos.
+    """
+
+    def __init__(self, cfg: Settings = settings):
+        self.cfg = cfg
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache = CacheTTL(cfg.ai_cache_ttl_seconds, cfg.ai_cache_max_entries)
+        self.circuito = Circuito(cfg.ai_breaker_failures, cfg.ai_breaker_reset_seconds)
+        self._estado: Optional[Tuple[float, str]] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Se crea al primer uso si la app no pasó por el startup
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.cfg.ai_module_url,
+                timeout=self.cfg.ai_timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.cfg.ai_max_connections,
+                    max_keepalive_connections=self.cfg.ai_max_keepalive,
+                ),
+            )
+        return self._client
+
+    async def cerrar(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def predecir(self, data: Dict[str, Any]) -> Any:
+        """POST /api/v1/predict; respuestas exitosas idénticas se sirven de la caché"""
+        clave = json.dumps(data, sort_keys=True, default=str)
+        cacheada = self.cache.get(clave)
+        if cacheada is not None:
+            return cacheada
+
+        self.circuito.permitir()
+        try:
+            response = await self.client.post("/api/v1/predict", json=data)
+        except BaseException:
+            # También cancelación (cliente desconectado): la llamada de prueba
+            # del estado semiabierto siempre se libera
+            self.circuito.fallo()
+            raise
+        if response.status_code >= 500:
+            self.circuito.fallo()
+        else:
+            self.circuito.exito()
+
+        resultado = response.json()
+        if response.is_success:
+            self.cache.set(clave, resultado)
+        return resultado
+
+    async def estado(self) -> str:
+        """'online'/'offline' del módulo de IA, cacheado ai_status_ttl_seconds"""
+        ahora = time.monotonic()
+        if self._estado is not None and self._estado[0] > ahora:
+            return self._estado[1]
+        if self.circuito.estado == "abierto":
+            valor = "offline"
+        else:
+            try:
+                response = await self.client.get("/health", timeout=5.0)
+                valor = "online" if response.status_code == 200 else "offline"
+            except httpx.HTTPError:
+                valor = "offline"
+        self._estado = (ahora + self.cfg.ai_status_ttl_seconds, valor)
+        return valor
+
+
+# Instancia única del proceso
+cliente_ia = ClienteIA()
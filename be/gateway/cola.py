@@ -0,0 +1,168 @@
+# be/gateway/cola.py
+"""
+Ingesta asíncrona (write-behind) para POST /lecturas.
+
+Con INGESTA_ASINCRONA=true la ruta valida la lectura, la encola y responde
+202. Un escritor en segundo plano vacía la cola en lotes (hasta
+INGESTA_LOTE_MAX lecturas o INGESTA_VENTANA_MS desde la primera) con un solo
+INSERT multi-fila y un commit por lote. Si la cola está llena la ruta
+responde 429.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from .config import settings
+from .ingesta import resolver_maquinas, preparar_filas, confirmar_lecturas, lecturas_confirmadas
+from .metricas import LECTURAS_RECHAZADAS
+
+logger = logging.getLogger(__name__)
+
+# Reintentos de un lote antes de descartarlo
+REINTENTOS = 3
+
+
+class ColaLlena(Exception):
+    """La cola de ingesta alcanzó INGESTA_COLA_MAX"""
+
+
+class ColaIngesta:
+    def __init__(self):
+        self.cola: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.encoladas = 0
+        self.escritas = 0
+        self.rechazadas = 0
+        self.descartadas = 0
+        self.lotes = 0
+        self.errores = 0
+        self._commits: deque = deque(maxlen=1000)
+
+    @property
+    def activa(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def iniciar(self):
+        if self.cola is None:
+            self.cola = asyncio.Queue(settings.ingesta_cola_max)
+        if not self.activa:
+            self._task = asyncio.create_task(self._escritor())
+
+    def encolar(self, lectura):
+        """lectura: schemas.LecturaIn ya validada; ts se fija al recibirla"""
+        self.iniciar()
+        if lectura.ts is None:
+            lectura.ts = datetime.utcnow()
+        try:
+            self.cola.put_nowait(lectura)
+        except asyncio.QueueFull:
+            self.rechazadas += 1
+            raise ColaLlena()
+        self.encoladas += 1
+
+    async def _siguiente_lote(self) -> list:
+        """Espera la primera lectura y junta las que lleguen dentro de la ventana"""
+        loop = asyncio.get_running_loop()
+        lote = [await self.cola.get()]
+        fin = loop.time() + settings.ingesta_ventana_ms / 1000
+        while len(lote) < settings.ingesta_lote_max:
+            try:
+                lote.append(self.cola.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            resto = fin - loop.time()
+            if resto <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self.cola.get(), resto))
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _escribir(self, lote: list):
+        from .db import async_session
+        # Solo se reintenta hasta el commit: después el lote ya está en la BD
+        for intento in range(1, REINTENTOS + 1):
+            try:
+                async with async_session() as session:
+                    t0 = time.perf_counter()
+                    series = await resolver_maquinas(session, (l.maquinaria_id for l in lote))
+                    validas = [l for l in lote if l.maquinaria_id in series]
+                    insertadas = await confirmar_lecturas(session, preparar_filas(validas))
+                    self._commits.append(time.perf_counter() - t0)
+                break
+            except Exception:
+                self.errores += 1
+                logger.exception("Error escribiendo lote de %d lecturas (intento %d)", len(lote), intento)
+                await asyncio.sleep(0.5 * intento)
+        else:
+            self.descartadas += len(lote)
+            LECTURAS_RECHAZADAS.inc("error_escritura", n=len(lote))
+            return
+
+        self.escritas += len(validas)
+        # Máquinas eliminadas mientras la lectura esperaba en la cola
+        if len(validas) < len(lote):
+            self.descartadas += len(lote) - len(validas)
+            LECTURAS_RECHAZADAS.inc("maquina_no_encontrada", n=len(lote) - len(validas))
+        self.lotes += 1
+        try:
+            lecturas_confirmadas(insertadas)
+        except Exception:
+            # Ya confirmadas: no se vuelven a escribir
+            self.errores += 1
+            logger.exception("Error notificando lote de %d lecturas confirmadas", len(insertadas))
+
+    async def _escritor(self):
+        while True:
+            lote = await self._siguiente_lote()
+            try:
+                await self._escribir(lote)
+            finally:
+                for _ in lote:
+                    self.cola.task_done()
+
+    async def detener(self, timeout: float = 30.0):
+        """Escribe lo pendiente y detiene el escritor"""
+        if self.activa and self.cola is not None:
+            try:
+                await asyncio.wait_for(self.cola.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Se detiene la ingesta con %d lecturas sin escribir", self.cola.qsize())
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.cola = None
+
+    def estado(self) -> dict:
+        commits = sorted(self._commits)
+        return {
+            "asincrona": settings.ingesta_asincrona,
+            "activa": self.activa,
+            "pendientes": self.cola.qsize() if self.cola is not None else 0,
+            "capacidad": settings.ingesta_cola_max,
+            "encoladas": self.encoladas,
+            "escritas": self.escritas,
+            "rechazadas": self.rechazadas,
+            "descartadas": self.descartadas,
+            "errores": self.errores,
+            "lotes": self.lotes,
+            "lote_promedio": round(self.escritas / self.lotes, 1) if self.lotes else None,
+            "commit_ms": {
+                "p50": round(commits[len(commits) // 2] * 1000, 2) if commits else None,
+                "p95": round(commits[int(len(commits) * 0.95)] * 1000, 2) if commits else None,
+                "max": round(commits[-1] * 1000, 2) if commits else None,
+            },
+        }
+
+
+# Instancia única del proceso
+cola_ingesta = ColaIngesta()
@@ -0,0 +1,88 @@
+# be/gateway/config.py
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Configuración leída de variables de entorno o de .env"""
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    database_url: str = "sqlite+aiosqlite:///./mantenimiento.db"
+    db_echo: bool = False
+
+    # Pool de conexiones (PostgreSQL)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Caché de sentencias preparadas por conexión de asyncpg
+    db_statement_cache_size: int = 500
+
+    # SQLite: WAL permite lectores concurrentes con un escritor
+    sqlite_wal: bool = True
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+
+    # Módulo de IA (proxy de /predict)
+    ai_module_url: str = "http://localhost:8001"
+    ai_timeout_seconds: float = 30.0
+    ai_max_connections: int = 20
+    ai_max_keepalive: int = 10
+    ai_cache_ttl_seconds: float = 60.0
+    ai_cache_max_entries: int = 1024
+    ai_breaker_failures: int = 5
+    ai_breaker_reset_seconds: float = 30.0
+    ai_status_ttl_seconds: float = 5.0
+
+    # Motor local de predicción (/lecturas/predict)
+    prediccion_alpha: float = 0.05
+    prediccion_ventana: int = 200
+
+    # Agregados por hora/día (lecturas_hora, lecturas_dia)
+    rollup_habilitado: bool = True
+    rollup_intervalo_segundos: float = 300.0
+    # Una lectura cuenta como estado vigente hasta la siguiente, como máximo esto
+    rollup_max_gap_minutos: float = 60.0
+    # /lecturas/history con buckets lee los agregados si el rango supera esto
+    history_rollup_horas: float = 72.0
+    history_rollup_dias: float = 90.0
+
+    # Retención: lecturas más antiguas se mueven a lecturas_archivo_YYYYMM (0 = sin límite)
+    retencion_dias: int = 0
+    retencion_lote: int = 2000
+    retencion_pausa_segundos: float = 0.05
+    retencion_intervalo_segundos: float = 3600.0
+
+    # Purga asíncrona de DELETE /maquinaria/{id}?asincrono=true: lecturas por lote
+    purga_lote: int = 5000
+    purga_pausa_segundos: float = 0.01
+
+    # Ingesta asíncrona de POST /lecturas: 202 + escritura en lotes
+    ingesta_asincrona: bool = False
+    ingesta_cola_max: int = 10000
+    ingesta_lote_max: int = 500
+    ingesta_ventana_ms: float = 20.0
+
+    # Catálogo de máquinas en memoria: recarga desde la BD cada tanto (0 = nunca)
+    catalogo_ttl_segundos: float = 60.0
+
+    # Tareas de fondo (simulador, agregados, retención) en un solo worker: lease en la tabla tareas
+    coordinacion_latido_segundos: float = 5.0
+    coordinacion_lease_segundos: float = 15.0
+    # Con varios workers cada uno aplica cada tanto las lecturas escritas por los demás
+    # (última lectura, predicción y SSE); `python -m gateway.main --workers N` lo activa
+    sincronizar_workers: bool = False
+    sincronizacion_segundos: float = 1.0
+    # create_all en el startup de la app; `python -m gateway.main` lo hace
+    # una vez antes de crear los workers y lo apaga en ellos
+    esquema_al_arrancar: bool = True
+    # Migrar al formato compacto al arrancar (reemplaza las tablas; por defecto
+    # se corre a mano con `python -m gateway.migraciones`)
+    migrar_al_arrancar: bool = False
+
+    # Métricas en /metrics y log de consultas lentas (0 = desactivado)
+    metricas_habilitadas: bool = True
+    db_slow_query_ms: float = 0
+
+
+settings = Settings()
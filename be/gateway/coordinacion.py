@@ -0,0 +1,255 @@
+# be/gateway/coordinacion.py
+"""
+Tareas de fondo con varios workers (uvicorn --workers N o varias réplicas).
+
+Un solo worker, el líder, corre el simulador, los agregados y la retención.
+El liderazgo es un lease en la tabla tareas: el líder lo renueva cada
+COORDINACION_LATIDO_SEGUNDOS y, si deja de hacerlo (caída, bloqueo), otro
+worker lo toma al vencer COORDINACION_LEASE_SEGUNDOS y retoma las tareas.
+
+Cada tarea tiene su fila: la API de cualquier worker escribe ahí lo pedido
+(deseado) y el líder lo aplica; el líder publica el estado de cada tarea y
+los demás workers lo leen para responder y para seguirlo (observar). Las
+marcas de recálculo de los agregados que reciben los otros workers también
+pasan por la fila.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from . import models
+from .config import settings
+from .respuestas import dumps
+
+logger = logging.getLogger(__name__)
+
+LIDER = "lider"
+
+
+class Trabajo:
+    """Tarea de fondo coordinada; una instancia por worker. Por defecto nada"""
+
+    nombre = ""
+
+    async def aplicar(self, deseado: Optional[dict]):
+        """Solo en el líder, en cada latido y al pedir: arrancar, ajustar o parar"""
+
+    async def detener(self):
+        """El worker dejó de ser líder o se apaga"""
+
+    def estado(self) -> dict:
+        """Estado que publica el líder"""
+        return {}
+
+    def observar(self, estado: dict):
+        """En los demás workers: último estado publicado por el líder"""
+
+    def tomar_marca(self) -> Optional[datetime]:
+        """En los demás workers: marca local para el líder (y la olvida)"""
+        return None
+
+    def marcar(self, ts: datetime):
+        """En el líder: marca dejada por otro worker"""
+
+
+def _json(texto: Optional[str]) -> Optional[dict]:
+    return json.loads(texto) if texto else None
+
+
+class Coordinador:
+    def __init__(self):
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.trabajos: Dict[str, Trabajo] = {}
+        self.lider = False
+        # Vencimiento del lease propio según la última renovación confirmada
+        self._vence: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def registrar(self, trabajo: Trabajo):
+        self.trabajos[trabajo.nombre] = trabajo
+
+    async def _asegurar_filas(self, db):
+        T = models.Tarea
+        existentes = set((await db.execute(select(T.nombre))).scalars())
+        for nombre in sorted({LIDER, *self.trabajos} - existentes):
+            db.add(T(nombre=nombre))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Otro worker la creó al mismo tiempo
+                await db.rollback()
+
+    async def _tomar_lease(self, db) -> bool:
+        """Renueva el lease propio o toma uno libre o vencido, en una sola sentencia"""
+        T = models.Tarea
+        ahora = datetime.utcnow()
+        vence = ahora + timedelta(seconds=settings.coordinacion_lease_segundos)
+        result = await db.execute(
+            update(T.__table__)
+            .where(T.nombre == LIDER, or_(T.dueno == self.worker, T.dueno.is_(None), T.vence < ahora))
+            .values(dueno=self.worker, vence=vence, actualizado=ahora)
+        )
+        await db.commit()
+        tomado = result.rowcount == 1
+        self._vence = vence if tomado else None
+        return tomado
+
+    async def _lease_fallido(self):
+        """
+        No se pudo renovar (BD bloqueada, conexión caída): el líder sigue
+        mientras su lease no pueda vencer antes del próximo latido; después
+        otro worker puede tomarlo, así que deja de correr las tareas antes.
+        """
+        if not self.lider:
+            return
+        limite = datetime.utcnow() + timedelta(seconds=settings.coordinacion_latido_segundos)
+        if self._vence is None or limite >= self._vence:
+            self.lider = False
+            self._vence = None
+            logger.warning("Worker %s: no pudo renovar el lease; deja las tareas de fondo", self.worker)
+            await self._detener_trabajos()
+
+    async def ciclo(self):
+        """Un latido: lease, y luego aplicar y publicar (líder) u observar (resto)"""
+        from .db import async_session
+        T = models.Tarea
+        async with self._lock:
+            async with async_session() as db:
+                try:
+                    tomado = await self._tomar_lease(db)
+                except Exception:
+                    await self._lease_fallido()
+                    raise
+                era_lider, self.lider = self.lider, tomado
+                if self.lider and not era_lider:
+                    logger.info("Worker %s: líder de las tareas de fondo", self.worker)
+                elif era_lider and not self.lider:
+                    logger.warning("Worker %s: perdió el lease de las tareas de fondo", self.worker)
+                    await self._detener_trabajos()
+
+                filas = {f.nombre: f for f in await db.execute(
+                    select(T.nombre, T.deseado, T.estado, T.marca).where(T.nombre.in_(list(self.trabajos)))
+                )}
+                for nombre, trabajo in self.trabajos.items():
+                    fila = filas.get(nombre)
+                    if fila is None:
+                        continue
+                    try:
+                        if self.lider:
+                            await self._liderar(db, trabajo, fila)
+                        else:
+                            await self._seguir(db, trabajo, fila)
+                    except Exception:
+                        logger.exception("Error coordinando la tarea %s", nombre)
+                await db.commit()
+
+    async def _liderar(self, db, trabajo: Trabajo, fila):
+        T = models.Tarea
+        if fila.marca is not None:
+            trabajo.marcar(fila.marca)
+            await db.execute(update(T.__table__).where(T.nombre == fila.nombre, T.marca == fila.marca)
+                             .values(marca=None))
+        await trabajo.aplicar(_json(fila.deseado))
+        await db.execute(update(T.__table__).where(T.nombre == fila.nombre).values(
+            estado=dumps(trabajo.estado()).decode(), actualizado=datetime.utcnow()))
+
+    async def _seguir(self, db, trabajo: Trabajo, fila):
+        T = models.Tarea
+        marca = trabajo.tomar_marca()
+        if marca is not None:
+            # Se queda con la más antigua sin leer la fila (otros workers escriben a la vez)
+            await db.execute(update(T.__table__)
+                             .where(T.nombre == fila.nombre, or_(T.marca.is_(None), T.marca > marca))
+                             .values(marca=marca))
+        if fila.estado:
+            trabajo.observar(json.loads(fila.estado))
+
+    async def deseado(self, nombre: str) -> Optional[dict]:
+        from .db import async_session
+        async with async_session() as db:
+            T = models.Tarea
+            return _json((await db.execute(select(T.deseado).where(T.nombre == nombre))).scalar())
+
+    async def pedir(self, nombre: str, deseado: dict):
+        """Guarda lo pedido para la tarea; el líder lo aplica enseguida si es este worker"""
+        from .db import async_session
+        T = models.Tarea
+        async with async_session() as db:
+            await db.execute(update(T.__table__).where(T.nombre == nombre).values(deseado=dumps(deseado).decode()))
+            await db.commit()
+        async with self._lock:
+            if self.lider:
+                await self.trabajos[nombre].aplicar(deseado)
+
+    async def estado(self, nombre: str) -> dict:
+        """Estado de la tarea: en vivo en el líder, el último publicado en los demás"""
+        if self.lider:
+            return {**self.trabajos[nombre].estado(), "worker": self.worker}
+        from .db import async_session
+        T = models.Tarea
+        async with async_session() as db:
+            publicado = (await db.execute(select(T.estado).where(T.nombre == nombre))).scalar()
+            dueno, vence = (await db.execute(select(T.dueno, T.vence).where(T.nombre == LIDER))).one()
+        vigente = dueno is not None and vence is not None and vence >= datetime.utcnow()
+        return {**(_json(publicado) or {}), "worker": dueno if vigente else None}
+
+    async def _detener_trabajos(self):
+        for trabajo in self.trabajos.values():
+            try:
+                await trabajo.detener()
+            except Exception:
+                logger.exception("Error deteniendo la tarea %s", trabajo.nombre)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(settings.coordinacion_latido_segundos)
+            try:
+                await self.ciclo()
+            except Exception:
+                logger.exception("Error en el latido de coordinación")
+
+    async def iniciar(self):
+        """Crea las filas que falten y hace el primer latido antes de volver"""
+        from .db import async_session
+        async with async_session() as db:
+            await self._asegurar_filas(db)
+        await self.ciclo()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def detener(self):
+        """Detiene las tareas propias y libera el lease para que otro worker lo tome ya"""
+        from .db import async_session
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        async with self._lock:
+            await self._detener_trabajos()
+            if self.lider:
+                T = models.Tarea
+                try:
+                    async with async_session() as db:
+                        await db.execute(update(T.__table__).where(T.nombre == LIDER, T.dueno == self.worker)
+                                         .values(dueno=None, vence=None))
+                        await db.commit()
+                except SQLAlchemyError:
+                    # Sin liberar, otro worker lo toma cuando vence
+                    logger.warning("Worker %s: no se pudo liberar el lease; vence en %.0f s", self.worker,
+                                   settings.coordinacion_lease_segundos, exc_info=True)
+                self.lider = False
+
+
+# Instancia única del proceso
+coordinador = Coordinador()
@@ -1,12 +1,60 @@
 # be/gateway/db.py
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker, AsyncEngine
 from sqlalchemy.orm import declarative_base
 
-# URL de la base de datos (sqlite asíncrono)
-DATABASE_URL = "sqlite+aiosqlite:///./mantenimiento.db"
+from .config import settings, Settings
+from .metricas import instrumentar_engine, PoolMedido
+
+# URL de la base de datos (DATABASE_URL en el entorno o .env)
+DATABASE_URL = settings.database_url
+
+
+def crear_engine(cfg: Settings = settings) -> AsyncEngine:
+    """Engine asíncrono con ajustes según el motor (pool en PostgreSQL, PRAGMAs en SQLite)"""
+    # El pool medido registra la espera por conexión (SQLite en memoria usa StaticPool)
+    medir_pool = cfg.metricas_habilitadas and make_url(cfg.database_url).database not in (None, "", ":memory:")
+    pool = {"poolclass": PoolMedido} if medir_pool else {}
+    if cfg.database_url.startswith("sqlite"):
+        engine = create_async_engine(cfg.database_url, echo=cfg.db_echo, **pool)
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _pragmas_sqlite(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            if cfg.sqlite_wal:
+                cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA synchronous={cfg.sqlite_synchronous}")
+            cursor.execute(f"PRAGMA busy_timeout={int(cfg.sqlite_busy_timeout_ms)}")
+            # Sin esto SQLite ignora ON DELETE CASCADE
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+    else:
+        connect_args = {}
+        if "+asyncpg" in cfg.database_url:
+            connect_args = {
+                "statement_cache_size": cfg.db_statement_cache_size,
+                "prepared_statement_cache_size": cfg.db_statement_cache_size,
+            }
+        engine = create_async_engine(
+            cfg.database_url,
+            echo=cfg.db_echo,
+            pool_size=cfg.db_pool_size,
+            max_overflow=cfg.db_max_overflow,
+            pool_timeout=cfg.db_pool_timeout,
+            pool_recycle=cfg.db_pool_recycle,
+            pool_pre_ping=cfg.db_pool_pre_ping,
+            connect_args=connect_args,
+            **pool,
+        )
+
+    if cfg.metricas_habilitadas:
+        instrumentar_engine(engine)
+    return engine
+
 
 # Engine y sessionmaker asíncrono
-engine = create_async_engine(DATABASE_URL, echo=False)
+engine = crear_engine()
 async_session = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
 # Base para modelos
@@ -16,4 +64,4 @@ Base = declarative_base()
 # Dependency de FastAPI para obtener sesión
 async def get_db():
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
@@ -1,55 +1,149 @@
-from typing import Literal, Tuple, List
+# be/gateway/estado.py
+"""
+Evaluación de estado de la maquinaria a partir de sus métricas.
+
+Único juego de umbrales del backend. Expone una API escalar (una lectura) y una
+API por lotes con NumPy que devuelve códigos de estado y máscaras de motivos;
+los textos de motivo se construyen solo cuando se piden.
+"""
+from typing import Iterator, Literal, Optional, Tuple
+
+import numpy as np
+
 Estado = Literal["OK", "ALERTA", "CRITICO"]
-VIBRATION_THRESHOLDS = {"OK_MAX": 4.5, "ALERTA_MAX": 7.1}
-TEMPERATURE_THRESHOLDS = {"OK_MAX": 90, "ALERTA_MAX": 115}
-PRESSURE_THRESHOLDS = {
-"OK_MIN": 120,
-"OK_MAX": 300,
-"ALERTA_RANGES": [
-[100, 120],
-[300, 350],
-],
-"CRITICO_LOW": 100,
-"CRITICO_HIGH": 350,
+
+# Código numérico de cada estado (índice en ESTADOS)
+OK, ALERTA, CRITICO = 0, 1, 2
+ESTADOS: Tuple[Estado, ...] = ("OK", "ALERTA", "CRITICO")
+
+UMBRALES = {
+    # mm/s RMS
+    "vibracion": {"alerta_alto": 2.5, "critico_alto": 4.5},
+    # °C
+    "temperatura": {"alerta_bajo": 80, "alerta_alto": 100, "critico_alto": 120},
+    # bar
+    "presion_aceite": {"critico_bajo": 1.5, "alerta_bajo": 2.5, "alerta_alto": 5.5},
 }
-def eval_vibracion(v: float) -> Estado:
-if v > VIBRATION_THRESHOLDS["ALERTA_MAX"]:
-return "CRITICO"
-if v >= VIBRATION_THRESHOLDS["OK_MAX"]:
-return "ALERTA"
-return "OK"
-def eval_temperatura(t: float) -> Estado:
-if t > TEMPERATURE_THRESHOLDS["ALERTA_MAX"]:
-return "CRITICO"
-if t >= TEMPERATURE_THRESHOLDS["OK_MAX"]:
-return "ALERTA"
-return "OK"
-def eval_presion(p: float) -> Estado:
-if p < PRESSURE_THRESHOLDS["CRITICO_LOW"] or p >
-PRESSURE_THRESHOLDS["CRITICO_HIGH"]:
-return "CRITICO"
-for mn, mx in PRESSURE_THRESHOLDS["ALERTA_RANGES"]:
-if p >= mn and p <= mx:
-return "ALERTA"
-if p >= PRESSURE_THRESHOLDS["OK_MIN"] and p <=
-PRESSURE_THRESHOLDS["OK_MAX"]:
-return "OK"
-return "ALERTA"
-def estado_from_lectura(vibracion: float, temperatura: float, presion: float) -> Tuple[Estado,
-List[str]]:
-motivos: List[str] = []
-ev = eval_vibracion(vibracion)
-et = eval_temperatura(temperatura)
-ep = eval_presion(presion)
-if ev == "CRITICO": motivos.append(f"Vibración CRÍTICO ({vibracion})")
-elif
-ev == "ALERTA": motivos.append(f"Vibración ALERTA ({vibracion})")
-if et == "CRITICO": motivos.append(f"Temperatura CRÍTICO ({temperatura}°C)")
-elif et == "ALERTA": motivos.append(f"Temperatura ALERTA ({temperatura}°C)")
-if ep == "CRITICO": motivos.append(f"Presión CRÍTICO ({presion} bar)")
-elif ep == "ALERTA": motivos.append(f"Presión ALERTA ({presion} bar)")
-if "CRÍTICO" in ";".join(motivos):
-return "CRITICO", motivos or ["Métrica crítica"]
-if "ALERTA" in ";".join(motivos):
-return "ALERTA", motivos or ["Métrica en rango de alerta"]
-return "OK", ["Todas las métricas en rango OK"]
\ No newline at end of file
+
+# Bits de motivo: (bit, nivel, métrica, plantilla) en el orden en que se reportan
+VIB_CRITICA = 1 << 0
+VIB_ELEVADA = 1 << 1
+TEMP_CRITICA = 1 << 2
+TEMP_ELEVADA = 1 << 3
+TEMP_BAJA = 1 << 4
+PRES_CRITICA = 1 << 5
+PRES_BAJA = 1 << 6
+PRES_ALTA = 1 << 7
+
+MOTIVOS = (
+    (VIB_CRITICA, CRITICO, "vibracion", "Vibración crítica ({} mm/s)"),
+    (VIB_ELEVADA, ALERTA, "vibracion", "Vibración elevada ({} mm/s)"),
+    (TEMP_CRITICA, CRITICO, "temperatura", "Temperatura crítica ({}°C)"),
+    (TEMP_ELEVADA, ALERTA, "temperatura", "Temperatura elevada ({}°C)"),
+    (TEMP_BAJA, ALERTA, "temperatura", "Temperatura baja ({}°C)"),
+    (PRES_CRITICA, CRITICO, "presion_aceite", "Presión de aceite crítica ({} bar)"),
+    (PRES_BAJA, ALERTA, "presion_aceite", "Presión de aceite baja ({} bar)"),
+    (PRES_ALTA, ALERTA, "presion_aceite", "Presión de aceite alta ({} bar)"),
+)
+
+MASCARA_CRITICO = VIB_CRITICA | TEMP_CRITICA | PRES_CRITICA
+
+
+def motivo_bits(temperatura: float, vibracion: float, presion_aceite: float) -> int:
+    """Máscara de motivos de una lectura"""
+    u = UMBRALES
+    bits = 0
+    if vibracion > u["vibracion"]["critico_alto"]:
+        bits |= VIB_CRITICA
+    elif vibracion > u["vibracion"]["alerta_alto"]:
+        bits |= VIB_ELEVADA
+
+    if temperatura > u["temperatura"]["critico_alto"]:
+        bits |= TEMP_CRITICA
+    elif temperatura > u["temperatura"]["alerta_alto"]:
+        bits |= TEMP_ELEVADA
+    elif temperatura < u["temperatura"]["alerta_bajo"]:
+        bits |= TEMP_BAJA
+
+    if presion_aceite < u["presion_aceite"]["critico_bajo"]:
+        bits |= PRES_CRITICA
+    elif presion_aceite < u["presion_aceite"]["alerta_bajo"]:
+        bits |= PRES_BAJA
+    elif presion_aceite > u["presion_aceite"]["alerta_alto"]:
+        bits |= PRES_ALTA
+    return bits
+
+
+def codigo_estado(bits: int) -> int:
+    if bits & MASCARA_CRITICO:
+        return CRITICO
+    return ALERTA if bits else OK
+
+
+def texto_motivo(bits: int, temperatura: float, vibracion: float, presion_aceite: float) -> Optional[str]:
+    """
+    Texto de motivo a partir de la máscara. Si hay métricas críticas solo
+    se listan esas; una lectura OK no tiene motivo.
+    """
+    if not bits:
+        return None
+    valores = {"temperatura": temperatura, "vibracion": vibracion, "presion_aceite": presion_aceite}
+    nivel = codigo_estado(int(bits))
+    return "; ".join(
+        plantilla.format(float(valores[metrica]))
+        for bit, nivel_bit, metrica, plantilla in MOTIVOS
+        if bits & bit and nivel_bit == nivel
+    )
+
+
+def evaluar_estado(temperatura: float, vibracion: float, presion_aceite: float) -> Tuple[Estado, Optional[str]]:
+    """
+    Evalúa una lectura.
+
+    Retorna: (estado, motivo)
+    - estado: 'OK', 'ALERTA', 'CRITICO'
+    - motivo: descripción del problema o None si está OK
+    """
+    bits = motivo_bits(temperatura, vibracion, presion_aceite)
+    return ESTADOS[codigo_estado(bits)], texto_motivo(bits, temperatura, vibracion, presion_aceite)
+
+
+def evaluar_lote(temperatura, vibracion, presion_aceite) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Evalúa arreglos de lecturas de una sola vez.
+
+    Retorna: (codigos, bits)
+    - codigos: uint8 con el índice en ESTADOS de cada lectura
+    - bits: uint16 con la máscara de motivos (ver MOTIVOS)
+    """
+    t = np.asarray(temperatura, dtype=np.float64)
+    v = np.asarray(vibracion, dtype=np.float64)
+    p = np.asarray(presion_aceite, dtype=np.float64)
+    u = UMBRALES
+
+    vib_crit = v > u["vibracion"]["critico_alto"]
+    temp_crit = t > u["temperatura"]["critico_alto"]
+    temp_alta = ~temp_crit & (t > u["temperatura"]["alerta_alto"])
+    pres_crit = p < u["presion_aceite"]["critico_bajo"]
+    pres_baja = ~pres_crit & (p < u["presion_aceite"]["alerta_bajo"])
+
+    bits = np.zeros(t.shape, dtype=np.uint16)
+    bits |= vib_crit * np.uint16(VIB_CRITICA)
+    bits |= (~vib_crit & (v > u["vibracion"]["alerta_alto"])) * np.uint16(VIB_ELEVADA)
+    bits |= temp_crit * np.uint16(TEMP_CRITICA)
+    bits |= temp_alta * np.uint16(TEMP_ELEVADA)
+    bits |= (~temp_crit & ~temp_alta & (t < u["temperatura"]["alerta_bajo"])) * np.uint16(TEMP_BAJA)
+    bits |= pres_crit * np.uint16(PRES_CRITICA)
+    bits |= pres_baja * np.uint16(PRES_BAJA)
+    bits |= (~pres_crit & ~pres_baja & (p > u["presion_aceite"]["alerta_alto"])) * np.uint16(PRES_ALTA)
+
+    codigos = np.where(
+        (bits & MASCARA_CRITICO) != 0, CRITICO, np.where(bits != 0, ALERTA, OK)
+    ).astype(np.uint8)
+    return codigos, bits
+
+
+def motivos_lote(bits, temperatura, vibracion, presion_aceite) -> Iterator[Optional[str]]:
+    """Textos de motivo de un lote, generados bajo demanda (None para lecturas OK)"""
+    for b, t, v, p in zip(bits.tolist(), temperatura, vibracion, presion_aceite):
+        yield texto_motivo(b, t, v, p) if b else None
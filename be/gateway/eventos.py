@@ -0,0 +1,138 @@
+# be/gateway/eventos.py
+import asyncio
+import json
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Bloques pendientes por suscriptor antes de descartar los más antiguos
+COLA_MAXIMA = 1000
+
+
+def _json_default(o):
+    if isinstance(o, datetime):
+        return o.isoformat()
+    raise TypeError(f"{type(o).__name__} no serializable")
+
+
+def frame_sse(evento: str, datos: dict) -> str:
+    return f"event: {evento}\ndata: {json.dumps(datos, default=_json_default)}\n\n"
+
+
+class Suscripcion:
+    """
+    Cola acotada de un cliente. Cada elemento es un bloque de frames SSE de
+    una misma escritura. Si el cliente no consume a tiempo se descartan los
+    bloques más antiguos y se cuentan los eventos perdidos, de modo que un
+    cliente lento nunca frena a los escritores.
+    """
+
+    def __init__(self, maquinas: Optional[Set[str]] = None, maxsize: int = COLA_MAXIMA):
+        self.maquinas = maquinas or None
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize)
+        self.perdidos = 0
+
+    def entregar(self, bloque: Tuple[int, str]):
+        try:
+            self.cola.put_nowait(bloque)
+        except asyncio.QueueFull:
+            n, _ = self.cola.get_nowait()
+            self.perdidos += n
+            self.cola.put_nowait(bloque)
+
+
+class Broker:
+    """Pub/sub en proceso: las rutas de escritura publican y los streams se suscriben"""
+
+    def __init__(self):
+        self._todas: Set[Suscripcion] = set()
+        self._por_maquina: Dict[str, Set[Suscripcion]] = {}
+
+    @property
+    def suscriptores(self) -> int:
+        return len(self._todas | {s for subs in self._por_maquina.values() for s in subs})
+
+    def suscribir(self, maquinas: Optional[Iterable[str]] = None, maxsize: int = COLA_MAXIMA) -> Suscripcion:
+        sub = Suscripcion(set(maquinas) if maquinas else None, maxsize)
+        if sub.maquinas is None:
+            self._todas.add(sub)
+        else:
+            for m in sub.maquinas:
+                self._por_maquina.setdefault(m, set()).add(sub)
+        return sub
+
+    def cancelar(self, sub: Suscripcion):
+        if sub.maquinas is None:
+            self._todas.discard(sub)
+            return
+        for m in sub.maquinas:
+            subs = self._por_maquina.get(m)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._por_maquina[m]
+
+    def publicar(self, eventos: List[Tuple[str, dict]]):
+        """
+        Publica los eventos de una escritura. Cada evento se serializa una
+        sola vez y cada suscriptor recibe un único bloque con los suyos.
+        """
+        if not self._todas and not self._por_maquina:
+            return
+        if not self._todas:
+            eventos = [e for e in eventos if e[1]["maquinaria_id"] in self._por_maquina]
+        frames = [(datos["maquinaria_id"], frame_sse(evento, datos)) for evento, datos in eventos]
+        if not frames:
+            return
+
+        if self._todas:
+            bloque = (len(frames), "".join(f for _, f in frames))
+            for sub in self._todas:
+                sub.entregar(bloque)
+        if self._por_maquina:
+            por_sub: Dict[Suscripcion, List[str]] = {}
+            for maquinaria_id, frame in frames:
+                for sub in self._por_maquina.get(maquinaria_id, ()):
+                    por_sub.setdefault(sub, []).append(frame)
+            for sub, fs in por_sub.items():
+                sub.entregar((len(fs), "".join(fs)))
+
+    def publicar_lecturas(self, cambios: Iterable[tuple]):
+        """
+        cambios: (previa, nueva) de cada lectura que pasó a ser la última de
+        su máquina. Publica la lectura y, si cambió el estado, la transición.
+        """
+        eventos = []
+        for previa, nueva in cambios:
+            eventos.append(("lectura", nueva))
+            estado_previo = previa["estado"] if previa else None
+            if estado_previo != nueva["estado"]:
+                eventos.append(("transicion", {
+                    "maquinaria_id": nueva["maquinaria_id"],
+                    "de": estado_previo,
+                    "a": nueva["estado"],
+                    "ts": nueva["ts"],
+                    "lectura_id": nueva["id"],
+                }))
+        if eventos:
+            self.publicar(eventos)
+
+
+async def stream_sse(sub: Suscripcion, desconectado, ping_segundos: float = 15.0):
+    """Genera frames SSE de una suscripción hasta que el cliente se desconecta"""
+    try:
+        while not await desconectado():
+            try:
+                _, frames = await asyncio.wait_for(sub.cola.get(), timeout=ping_segundos)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if sub.perdidos:
+                yield frame_sse("perdidos", {"cantidad": sub.perdidos})
+                sub.perdidos = 0
+            yield frames
+    finally:
+        broker.cancelar(sub)
+
+
+# Instancia única del proceso
+broker = Broker()
@@ -0,0 +1,30 @@
+# be/gateway/expresiones.py
+"""Expresiones SQL portables entre SQLite y PostgreSQL."""
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class epoch(FunctionElement):
+    """Segundos enteros desde 1970-01-01 de una columna DateTime (sin zona, UTC)."""
+    type = BigInteger()
+    inherit_cache = True
+    name = "epoch"
+
+
+@compiles(epoch)
+def _epoch_default(element, compiler, **kw):
+    # FLOOR: el CAST redondea y strftime('%s') de SQLite trunca
+    return "CAST(FLOOR(EXTRACT(EPOCH FROM %s)) AS BIGINT)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(epoch, "sqlite")
+def _epoch_sqlite(element, compiler, **kw):
+    return "CAST(strftime('%%s', %s) AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+
+def desde_epoch(segundos: int) -> datetime:
+    """Inverso de epoch: datetime UTC sin zona, como se guarda ts"""
+    return datetime.fromtimestamp(segundos, timezone.utc).replace(tzinfo=None)
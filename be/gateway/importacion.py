@@ -0,0 +1,215 @@
+# be/gateway/importacion.py
+"""
+Ingesta en streaming para colectores: POST /lecturas/batch/stream.
+
+El cuerpo se lee a medida que llega, en NDJSON (un LecturaIn por línea) o en
+MessagePack (mapas concatenados; requiere msgpack, opcional). Cada registro
+se valida por separado y los válidos se evalúan e insertan en bloques de
+LOTE: mientras se escribe un bloque se va leyendo el siguiente. La memoria
+no depende del tamaño de la carga; la respuesta informa los errores por
+línea (los primeros MAX_ERRORES) y los bloques ya escritos quedan
+confirmados aunque falle uno posterior.
+
+Un MessagePack corrupto o truncado no permite seguir leyendo: se guardan los
+registros válidos anteriores y la respuesta lo informa como CuerpoInvalido.
+"""
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import schemas
+from .exportacion import FormatoNoDisponible
+from .ingesta import guardar_lecturas, preparar_filas, resolver_maquinas
+from .metricas import LECTURAS_RECHAZADAS
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/x-jsonlines": "ndjson",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+}
+# Registros válidos por bloque insertado
+LOTE = 5000
+# Líneas más largas se rechazan sin acumularlas
+MAX_LINEA = 64 * 1024
+# Errores informados uno a uno; del resto solo se cuentan
+MAX_ERRORES = 1000
+
+Registro = Tuple[int, Optional[schemas.LecturaIn], Optional[str]]
+
+
+class CuerpoInvalido(ValueError):
+    """El cuerpo no se puede seguir decodificando a partir del registro `numero`"""
+
+    def __init__(self, numero: int, mensaje: str):
+        super().__init__(mensaje)
+        self.numero = numero
+
+
+def formato_de(content_type: Optional[str]) -> Optional[str]:
+    """Formato según Content-Type; sin Content-Type se asume NDJSON"""
+    if not content_type:
+        return "ndjson"
+    return FORMATOS.get(content_type.split(";")[0].strip().lower())
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise FormatoNoDisponible("El formato msgpack requiere msgpack (pip install msgpack)")
+    return msgpack
+
+
+def verificar_formato(formato: str):
+    """Falla antes de leer el cuerpo si falta la dependencia del formato"""
+    if formato == "msgpack":
+        _msgpack()
+
+
+def _error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, d['loc']))}: {d['msg']}" if d["loc"] else d["msg"] for d in e.errors()
+    )
+
+
+def _validar_json(numero: int, linea: bytes) -> Registro:
+    try:
+        return numero, schemas.LecturaIn.model_validate_json(linea), None
+    except ValidationError as e:
+        return numero, None, _error(e)
+
+
+async def _ndjson(partes: AsyncIterator[bytes]) -> AsyncIterator[Registro]:
+    numero, resto, descartando = 0, b"", False
+    async for parte in partes:
+        lineas = (resto + parte).split(b"\n")
+        resto = lineas.pop()
+        for linea in lineas:
+            numero += 1
+            if descartando:
+                # Final de una línea demasiado larga, ya informada
+                descartando = False
+            elif len(linea) > MAX_LINEA:
+                yield numero, None, f"Línea de más de {MAX_LINEA} bytes"
+            elif linea.strip():
+                yield _validar_json(numero, linea)
+        if len(resto) > MAX_LINEA:
+            if not descartando:
+                yield numero + 1, None, f"Línea de más de {MAX_LINEA} bytes"
+            resto, descartando = b"", True
+    if resto.strip() and not descartando:
+        yield _validar_json(numero + 1, resto)
+
+
+async def _msgpack_registros(partes: AsyncIterator[bytes]) -> AsyncIterator[Registro]:
+    msgpack = _msgpack()
+    # timestamp=3: el tipo Timestamp de MessagePack llega como datetime UTC
+    unpacker = msgpack.Unpacker(raw=False, timestamp=3, max_buffer_size=MAX_LINEA * 16)
+    numero = recibidos = 0
+    async for parte in partes:
+        # De a MAX_LINEA: lo pendiente en el buffer es a lo sumo un registro incompleto
+        for i in range(0, len(parte), MAX_LINEA):
+            trozo = parte[i:i + MAX_LINEA]
+            objetos, error = [], None
+            try:
+                unpacker.feed(trozo)
+                for obj in unpacker:
+                    objetos.append(obj)
+            except msgpack.BufferFull:
+                error = f"Registro de más de {MAX_LINEA * 16} bytes"
+            except (msgpack.UnpackException, ValueError) as e:
+                error = f"MessagePack inválido: {e}"
+            recibidos += len(trozo)
+            for obj in objetos:
+                numero += 1
+                try:
+                    yield numero, schemas.LecturaIn.model_validate(obj), None
+                except ValidationError as e:
+                    yield numero, None, _error(e)
+            if error is not None:
+                raise CuerpoInvalido(numero + 1, error)
+    if unpacker.tell() < recibidos:
+        raise CuerpoInvalido(numero + 1, "MessagePack truncado: el cuerpo termina dentro de un registro")
+
+
+async def _guardar_lote(db: AsyncSession, lote: List[Tuple[int, schemas.LecturaIn]],
+                        rechazar: Callable[[int, str], None]) -> int:
+    series = await resolver_maquinas(db, (l.maquinaria_id for _, l in lote))
+    validas = []
+    for numero, lectura in lote:
+        if lectura.maquinaria_id in series:
+            validas.append(lectura)
+        else:
+            rechazar(numero, "Maquinaria no encontrada")
+    if len(validas) < len(lote):
+        LECTURAS_RECHAZADAS.inc("maquina_no_encontrada", n=len(lote) - len(validas))
+    return await guardar_lecturas(db, preparar_filas(validas))
+
+
+async def importar(db: AsyncSession, partes: AsyncIterator[bytes], formato: str) -> dict:
+    """Lee, valida e inserta por bloques; retorna conteos y errores por línea"""
+    t0 = time.perf_counter()
+    resultado = {"ok": True, "lines": 0, "inserted": 0, "rejected": 0, "errors": [], "errors_truncated": 0}
+
+    def rechazar(numero: int, mensaje: str):
+        resultado["rejected"] += 1
+        if len(resultado["errors"]) < MAX_ERRORES:
+            resultado["errors"].append({"line": numero, "error": mensaje})
+        else:
+            resultado["errors_truncated"] += 1
+
+    registros = _ndjson(partes) if formato == "ndjson" else _msgpack_registros(partes)
+    lote: List[Tuple[int, schemas.LecturaIn]] = []
+    # Bloque escribiéndose en la BD mientras se lee el siguiente
+    escribiendo: Optional[asyncio.Task] = None
+    try:
+        try:
+            async for numero, lectura, error in registros:
+                resultado["lines"] = numero
+                if error is not None:
+                    LECTURAS_RECHAZADAS.inc("invalida")
+                    rechazar(numero, error)
+                    continue
+                lote.append((numero, lectura))
+                if len(lote) >= LOTE:
+                    if escribiendo is not None:
+                        resultado["inserted"] += await escribiendo
+                    escribiendo = asyncio.create_task(_guardar_lote(db, lote, rechazar))
+                    lote = []
+        except CuerpoInvalido as e:
+            # Lo anterior al error se guarda igual; lo que sigue no se puede leer
+            LECTURAS_RECHAZADAS.inc("invalida")
+            rechazar(e.numero, str(e))
+            resultado.update(lines=e.numero, ok=False, cuerpo_invalido=True, error=str(e))
+        if escribiendo is not None:
+            resultado["inserted"] += await escribiendo
+            escribiendo = None
+        if lote:
+            resultado["inserted"] += await _guardar_lote(db, lote, rechazar)
+    except SQLAlchemyError as e:
+        # Los bloques anteriores quedan confirmados; se informa hasta dónde se llegó
+        logger.exception("Error escribiendo la ingesta en streaming")
+        await db.rollback()
+        resultado.pop("cuerpo_invalido", None)
+        resultado["ok"] = False
+        resultado["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if escribiendo is not None and not escribiendo.done():
+            escribiendo.cancel()
+
+    # Las máquinas inexistentes se detectan al escribir cada bloque
+    resultado["errors"].sort(key=lambda e: e["line"])
+    segundos = time.perf_counter() - t0
+    resultado["seconds"] = round(segundos, 3)
+    resultado["rows_per_sec"] = round(resultado["inserted"] / segundos) if segundos else 0
+    return resultado
@@ -0,0 +1,110 @@
+# be/gateway/ingesta.py
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .estado import ESTADOS, evaluar_lote
+from .ultimas import ultimas
+from .eventos import broker
+from .prediccion import motor
+from .rollups import compactador
+from .metricas import contar_aceptadas
+from .catalogo import catalogo
+from .sincronizacion import sincronizador
+
+# Filas por INSERT multi-fila (acota memoria y parámetros por sentencia)
+CHUNK_SIZE = 1000
+
+
+async def resolver_maquinas(db: AsyncSession, ids: Iterable[str]) -> Dict[str, str]:
+    """
+    Resuelve un conjunto de maquinaria_id desde el catálogo en memoria.
+
+    Retorna: {maquinaria_id: numero_serie} solo para las máquinas existentes.
+    """
+    await catalogo.asegurar(db)
+    return catalogo.series(ids)
+
+
+def preparar_filas(lecturas: Sequence, ahora: Optional[datetime] = None) -> List[dict]:
+    """
+    Evalúa el estado de todo el bloque de una vez y arma las filas a insertar
+    (estado y máscara de motivos; el texto se arma al responder).
+
+    lecturas: schemas.LecturaIn de máquinas existentes.
+    """
+    temperatura = [l.temperatura or 0 for l in lecturas]
+    vibracion = [l.vibracion or 0 for l in lecturas]
+    presion_aceite = [l.presion_aceite or 0 for l in lecturas]
+    codigos, bits = evaluar_lote(temperatura, vibracion, presion_aceite)
+
+    ahora = ahora or datetime.utcnow()
+    return [
+        {
+            "maquinaria_id": l.maquinaria_id,
+            "temperatura": l.temperatura,
+            "vibracion": l.vibracion,
+            "presion_aceite": l.presion_aceite,
+            "ts": l.ts or ahora,
+            "estado": ESTADOS[codigo],
+            "motivo_bits": b,
+        }
+        for l, codigo, b in zip(lecturas, codigos.tolist(), bits.tolist())
+    ]
+
+
+async def insertar_lecturas(
+    db: AsyncSession,
+    filas: Sequence[dict],
+    chunk_size: int = CHUNK_SIZE,
+    retornar: bool = True,
+) -> List[dict]:
+    """
+    Inserta lecturas ya evaluadas con un INSERT multi-fila por bloque.
+
+    Retorna las filas insertadas tal como quedaron en la BD (con id). El orden
+    de RETURNING no está garantizado en todos los motores, por eso se devuelven
+    las filas completas en lugar de emparejar ids. Con retornar=False no se
+    pide RETURNING y se retorna una lista vacía. No hace commit.
+    """
+    stmt = insert(models.Lectura.__table__)
+    if retornar:
+        stmt = stmt.returning(*models.lectura_columnas())
+    insertadas: List[dict] = []
+    for i in range(0, len(filas), chunk_size):
+        result = await db.execute(stmt, filas[i:i + chunk_size])
+        if retornar:
+            insertadas.extend(dict(r) for r in result.mappings())
+    return insertadas
+
+
+def lecturas_confirmadas(filas: Iterable[dict]):
+    """Notifica lecturas ya confirmadas en la BD a los estados en memoria y a los streams"""
+    filas = list(filas)
+    if filas:
+        compactador.marcar(min(f["ts"] for f in filas))
+    motor.actualizar(filas)
+    contar_aceptadas(filas)
+    cambios = ultimas.registrar(filas)
+    # Con varios workers los eventos los emite la sincronización, en el mismo orden en todos
+    if not sincronizador.activo:
+        broker.publicar_lecturas(cambios)
+
+
+async def confirmar_lecturas(db: AsyncSession, filas: Sequence[dict], chunk_size: int = CHUNK_SIZE) -> List[dict]:
+    """Inserta en bloque y confirma, sin notificar; retorna las filas insertadas"""
+    insertadas = await insertar_lecturas(db, filas, chunk_size)
+    # Antes del commit: la sincronización de otros workers no debe aplicarlas de nuevo
+    sincronizador.propias(insertadas)
+    await db.commit()
+    return insertadas
+
+
+async def guardar_lecturas(db: AsyncSession, filas: Sequence[dict], chunk_size: int = CHUNK_SIZE) -> int:
+    """Inserta en bloque, confirma y notifica las lecturas"""
+    insertadas = await confirmar_lecturas(db, filas, chunk_size)
+    lecturas_confirmadas(insertadas)
+    return len(insertadas)
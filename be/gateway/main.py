@@ -1,17 +1,69 @@
 # be/gateway/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import maquinaria, lecturas, seed, simulador
-from .db import engine, Base
+from fastapi.responses import PlainTextResponse
+from .routers import maquinaria, lecturas, resumen, seed, simulador, services
+from .db import engine, Base, async_session
+from .ultimas import ultimas
+from .catalogo import catalogo
+from .prediccion import motor
+from .retencion import retencion
+from .purga import purgas
+from .config import settings
+from .models import crear_indices
+from .migraciones import migrar, pendientes
+from .cliente_ia import cliente_ia
+from .cola import cola_ingesta
+from .eventos import broker
+from .coordinacion import coordinador
+from .sincronizacion import sincronizador
+from .metricas import MetricasMiddleware, Medidor, registro, exponer
 
 # Crear la app FastAPI
 app = FastAPI(title="Mantenimiento Predictivo API", version="1.0.0")
 
-# Crear tablas al arrancar si no existen
-@app.on_event("startup")
-async def on_startup():
+async def preparar_esquema():
+    """Tablas e índices que falten; la migración al formato compacto solo con MIGRAR_AL_ARRANCAR"""
     async with engine.begin() as conn:
+        tablas = await conn.run_sync(pendientes)
+        if tablas and not settings.migrar_al_arrancar:
+            raise RuntimeError(
+                f"Tablas en el formato anterior: {', '.join(tablas)}. "
+                "Migrar con `python -m gateway.migraciones` (reemplaza las tablas; respaldar antes)"
+            )
+        await conn.run_sync(migrar)
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(crear_indices)
+
+# Crear tablas al arrancar si no existen (con varios workers lo hace el lanzador)
+@app.on_event("startup")
+async def on_startup():
+    if settings.esquema_al_arrancar:
+        await preparar_esquema()
+    # Cargar última lectura por máquina una sola vez
+    async with async_session() as session:
+        if settings.sincronizar_workers:
+            # Lo que se escriba desde aquí llega por la sincronización
+            await sincronizador.preparar(session)
+        await ultimas.cargar(session)
+        await catalogo.cargar(session)
+        await motor.reconstruir(session)
+        await retencion.cargar(session)
+    # Simulador, agregados y retención corren solo en el worker líder
+    await coordinador.iniciar()
+    if settings.sincronizar_workers:
+        sincronizador.iniciar()
+    if settings.ingesta_asincrona:
+        cola_ingesta.iniciar()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Primero se escribe lo que quedó en la cola de ingesta
+    await cola_ingesta.detener()
+    await sincronizador.detener()
+    await coordinador.detener()
+    await purgas.detener()
+    await cliente_ia.cerrar()
 
 # CORS
 app.add_middleware(
@@ -20,14 +72,74 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
+# Latencia por ruta (se agrega después de CORS para quedar por fuera y medir todo)
+if settings.metricas_habilitadas:
+    app.add_middleware(MetricasMiddleware)
+
 # Routers
 app.include_router(maquinaria.router)
 app.include_router(lecturas.router)
+app.include_router(resumen.router)
 app.include_router(seed.router)
 app.include_router(simulador.router)
+app.include_router(services.router)
 
 @app.get("/")
 def root():
-    return {"message": "Mantenimiento Predictivo"}
\ No newline at end of file
+    return {"message": "Mantenimiento Predictivo"}
+
+# Medidores calculados al exponer /metrics
+registro.registrar(Medidor(
+    "ingesta_cola_pendientes", "Lecturas en la cola de ingesta asíncrona",
+    lambda: cola_ingesta.estado()["pendientes"]))
+registro.registrar(Medidor(
+    "sse_suscriptores", "Clientes conectados a /lecturas/stream", lambda: broker.suscriptores))
+registro.registrar(Medidor(
+    "db_pool_conexiones_en_uso", "Conexiones del pool prestadas",
+    lambda: getattr(engine.sync_engine.pool, "checkedout", lambda: 0)()))
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return PlainTextResponse(exponer(), media_type="text/plain; version=0.0.4")
+
+
+def lanzar():
+    """
+    Prepara el esquema una sola vez y después arranca uvicorn con los
+    workers pedidos, que ya no lo hacen en su startup. Con más de uno
+    activa SINCRONIZAR_WORKERS (salvo que se haya fijado):
+
+        python -m gateway.main --workers 4 --port 8001
+    """
+    import argparse
+    import asyncio
+    import os
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--reload", action="store_true")
+    args = parser.parse_args()
+
+    async def preparar():
+        await preparar_esquema()
+        await engine.dispose()
+
+    asyncio.run(preparar())
+    # Los workers leen la configuración del entorno; con uno solo se reusa este proceso
+    os.environ["ESQUEMA_AL_ARRANCAR"] = "false"
+    settings.esquema_al_arrancar = False
+    if args.workers > 1:
+        os.environ.setdefault("SINCRONIZAR_WORKERS", "true")
+    uvicorn.run("gateway.main:app", host=args.host, port=args.port, workers=args.workers, reload=args.reload)
+
+
+if __name__ == "__main__":
+    lanzar()
@@ -0,0 +1,208 @@
+# be/gateway/metricas.py
+"""
+Métricas en proceso expuestas en formato de texto de Prometheus (/metrics).
+
+- Latencia por ruta (middleware ASGI)
+- Tiempo, cantidad y filas por tipo de sentencia SQL (eventos del engine)
+- Espera al obtener una conexión del pool
+- Lecturas aceptadas por estado y rechazadas por motivo
+- Log opcional de consultas lentas (DB_SLOW_QUERY_MS)
+"""
+import logging
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de los buckets en segundos
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(nombres: Tuple[str, ...], valores: tuple, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, etiquetas
+        self.valores: Dict[tuple, float] = defaultdict(float)
+
+    def inc(self, *valores, n: float = 1):
+        self.valores[valores] += n
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        for valores, v in sorted(self.valores.items()):
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {v:g}")
+        return lineas
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (), buckets=BUCKETS):
+        self.nombre, self.ayuda, self.etiquetas, self.buckets = nombre, ayuda, etiquetas, buckets
+        # etiquetas -> [conteo por bucket (+Inf al final), suma]
+        self.series: Dict[tuple, list] = {}
+
+    def observar(self, segundos: float, *valores):
+        serie = self.series.get(valores)
+        if serie is None:
+            serie = self.series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+        serie[0][bisect_left(self.buckets, segundos)] += 1
+        serie[1] += segundos
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        for valores, (conteos, suma) in sorted(self.series.items()):
+            acumulado = 0
+            for limite, c in zip((*self.buckets, "+Inf"), conteos):
+                acumulado += c
+                le = f'le="{limite}"'
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {suma:.6f}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {acumulado}")
+        return lineas
+
+
+class Medidor:
+    """Gauge calculado al exponer: fn retorna un número o {valores_etiquetas: número}"""
+
+    def __init__(self, nombre: str, ayuda: str, fn: Callable, etiquetas: Tuple[str, ...] = ()):
+        self.nombre, self.ayuda, self.fn, self.etiquetas = nombre, ayuda, fn, etiquetas
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} gauge"]
+        valor = self.fn()
+        items = valor.items() if isinstance(valor, dict) else [((), valor)]
+        for valores, v in items:
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {v:g}")
+        return lineas
+
+
+class Registro:
+    def __init__(self):
+        self.metricas: list = []
+
+    def registrar(self, metrica):
+        self.metricas.append(metrica)
+        return metrica
+
+    def exponer(self) -> str:
+        lineas: List[str] = []
+        for m in self.metricas:
+            try:
+                lineas += m.exponer()
+            except Exception:
+                logger.exception("Error exponiendo %s", m.nombre)
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+
+HTTP_LATENCIA = registro.registrar(Histograma(
+    "http_request_duration_seconds", "Latencia de requests HTTP por ruta", ("method", "route", "status")))
+DB_SENTENCIAS = registro.registrar(Histograma(
+    "db_statement_duration_seconds", "Duración de sentencias SQL por operación", ("operation",)))
+DB_FILAS = registro.registrar(Contador(
+    "db_rows_total", "Filas afectadas por sentencias SQL (rowcount informado por el driver)", ("operation",)))
+DB_LENTAS = registro.registrar(Contador(
+    "db_slow_statements_total", "Sentencias que superaron DB_SLOW_QUERY_MS", ("operation",)))
+DB_POOL_ESPERA = registro.registrar(Histograma(
+    "db_pool_checkout_wait_seconds", "Espera para obtener una conexión del pool"))
+LECTURAS_ACEPTADAS = registro.registrar(Contador(
+    "lecturas_aceptadas_total", "Lecturas confirmadas en la BD por estado", ("estado",)))
+LECTURAS_RECHAZADAS = registro.registrar(Contador(
+    "lecturas_rechazadas_total", "Lecturas no aceptadas por motivo", ("motivo",)))
+
+
+def contar_aceptadas(filas: Iterable[dict]):
+    for f in filas:
+        LECTURAS_ACEPTADAS.inc(f.get("estado"))
+
+
+def _operacion(statement: str) -> str:
+    partes = statement.lstrip().split(None, 1)
+    return partes[0].upper() if partes else ""
+
+
+def instrumentar_engine(engine):
+    """Eventos de tiempo y filas por sentencia sobre el engine (sync_engine si es async)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metricas_t0", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        segundos = time.perf_counter() - conn.info["_metricas_t0"].pop()
+        operacion = _operacion(statement)
+        DB_SENTENCIAS.observar(segundos, operacion)
+        filas = getattr(cursor, "rowcount", -1)
+        if filas is not None and filas >= 0:
+            DB_FILAS.inc(operacion, n=filas)
+        if settings.db_slow_query_ms and segundos * 1000 >= settings.db_slow_query_ms:
+            DB_LENTAS.inc(operacion)
+            logger.warning("Consulta lenta (%.1f ms, executemany=%s): %s",
+                           segundos * 1000, executemany, " ".join(statement.split())[:2000])
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(contexto):
+        # Sin after_cursor_execute: descartar el inicio para no atribuirlo a la siguiente
+        conn = contexto.connection
+        if conn is not None and contexto.execution_context is not None and conn.info.get("_metricas_t0"):
+            conn.info["_metricas_t0"].pop()
+
+
+class PoolMedido(AsyncAdaptedQueuePool):
+    """Pool que registra cuánto se espera por una conexión (incluye abrirla si hace falta)"""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_ESPERA.observar(time.perf_counter() - t0)
+
+
+class MetricasMiddleware:
+    """Middleware ASGI: latencia por plantilla de ruta, método y status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        status = [500]
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = scope.get("route")
+            # Sin ruta resuelta (404) se agrupa para no crear una serie por URL
+            ruta = getattr(route, "path", None) or "sin_ruta"
+            HTTP_LATENCIA.observar(time.perf_counter() - t0, scope["method"], ruta, status[0])
+
+
+def exponer() -> str:
+    return registro.exponer()
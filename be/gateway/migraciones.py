@@ -0,0 +1,163 @@
+# be/gateway/migraciones.py
+"""
+Migración de lecturas (y tablas de archivo) al formato compacto.
+
+Formato anterior: numero_serie copiado en cada fila, estado como texto y
+motivo como texto. Formato actual: estado como código (models.CodigoEstado)
+y motivo_bits, la máscara de estado.MOTIVOS. El estado guardado se conserva
+y la máscara se lee del texto de motivo guardado (una plantilla de MOTIVOS
+por bit), así las respuestas muestran el mismo estado y los mismos motivos
+aunque con los valores redondeados de la fila los umbrales vigentes den
+otro resultado. Solo las filas sin estado, o con un motivo que no sigue las
+plantillas, se evalúan con los valores.
+
+Cada tabla se copia a una nueva por rangos de id y la nueva reemplaza a la
+anterior (la tabla anterior se borra); las tablas que ya tienen motivo_bits
+se dejan como están. No corre sola: la app no arranca con tablas pendientes
+salvo con MIGRAR_AL_ARRANCAR=true.
+
+    python -m gateway.migraciones [--vacuum]
+"""
+import argparse
+import asyncio
+import logging
+from typing import List
+
+from sqlalchemy import MetaData, Table, case, func, insert, inspect, select
+
+from . import models
+from .estado import (
+    ALERTA, CRITICO, MASCARA_CRITICO, MOTIVOS, OK, PRES_ALTA, PRES_BAJA, PRES_CRITICA, TEMP_BAJA, TEMP_CRITICA,
+    TEMP_ELEVADA, UMBRALES, VIB_CRITICA, VIB_ELEVADA,
+)
+from .retencion import PREFIJO, tabla_archivo
+
+logger = logging.getLogger(__name__)
+
+# Filas copiadas por INSERT ... SELECT
+LOTE = 50000
+
+
+def _bits_sql(temperatura, vibracion, presion_aceite):
+    """Misma máscara que estado.motivo_bits, como expresión SQL"""
+    u = UMBRALES
+    t = func.coalesce(temperatura, 0)
+    v = func.coalesce(vibracion, 0)
+    p = func.coalesce(presion_aceite, 0)
+    return (
+        case((v > u["vibracion"]["critico_alto"], VIB_CRITICA),
+             (v > u["vibracion"]["alerta_alto"], VIB_ELEVADA), else_=0)
+        + case((t > u["temperatura"]["critico_alto"], TEMP_CRITICA),
+               (t > u["temperatura"]["alerta_alto"], TEMP_ELEVADA),
+               (t < u["temperatura"]["alerta_bajo"], TEMP_BAJA), else_=0)
+        + case((p < u["presion_aceite"]["critico_bajo"], PRES_CRITICA),
+               (p < u["presion_aceite"]["alerta_bajo"], PRES_BAJA),
+               (p > u["presion_aceite"]["alerta_alto"], PRES_ALTA), else_=0)
+    )
+
+
+def _codigo_sql(bits):
+    """Misma regla que estado.codigo_estado, como expresión SQL"""
+    return case((bits.op("&")(MASCARA_CRITICO) != 0, CRITICO), (bits != 0, ALERTA), else_=OK)
+
+
+def _bits_motivo_sql(motivo):
+    """Máscara leída del texto de motivo guardado: un bit por plantilla de MOTIVOS presente"""
+    bits = 0
+    for bit, _, _, plantilla in MOTIVOS:
+        bits = bits + case((motivo.contains(plantilla.split("{")[0], autoescape=True), bit), else_=0)
+    return bits
+
+
+def _pendiente(conn, nombre: str) -> bool:
+    insp = inspect(conn)
+    return insp.has_table(nombre) and "motivo_bits" not in {c["name"] for c in insp.get_columns(nombre)}
+
+
+def _migrar_tabla(conn, destino: Table) -> int:
+    """Copia `destino` del formato anterior al compacto; retorna las filas copiadas"""
+    nombre = destino.name
+    if not _pendiente(conn, nombre):
+        return 0
+    insp = inspect(conn)
+
+    # Los índices conservan su nombre: se quitan antes de crear la tabla nueva
+    for indice in insp.get_indexes(nombre):
+        conn.exec_driver_sql(f'DROP INDEX "{indice["name"]}"')
+
+    md = MetaData()
+    models.Maquinaria.__table__.to_metadata(md)
+    nueva = destino.to_metadata(md, name=f"{nombre}_v2")
+    nueva.create(conn)
+
+    anterior = Table(nombre, MetaData(), autoload_with=conn)
+    a = anterior.c
+    estado = case(models.CODIGOS_ESTADO, value=a.estado)
+    calculados = _bits_sql(a.temperatura, a.vibracion, a.presion_aceite)
+    guardados = _bits_motivo_sql(a.motivo)
+    bits = case((estado == OK, 0), (guardados != 0, guardados), else_=calculados)
+    columnas = [a.id, a.maquinaria_id, a.temperatura, a.vibracion, a.presion_aceite, a.ts,
+                func.coalesce(estado, _codigo_sql(calculados)), bits]
+    filtro = []
+    if nueva.foreign_keys:
+        # Sin foreign_keys en SQLite pudieron quedar lecturas de máquinas borradas
+        filtro.append(a.maquinaria_id.in_(select(models.Maquinaria.id)))
+    minimo, maximo = conn.execute(select(func.min(a.id), func.max(a.id))).one()
+    copiadas = 0
+    if minimo is not None:
+        for desde in range(minimo, maximo + 1, LOTE):
+            r = conn.execute(insert(nueva).from_select(
+                models.LECTURA_COLUMNAS,
+                select(*columnas).where(a.id >= desde, a.id < desde + LOTE, *filtro),
+            ))
+            copiadas += r.rowcount
+
+    anterior.drop(conn)
+    conn.exec_driver_sql(f'ALTER TABLE "{nueva.name}" RENAME TO "{nombre}"')
+    if conn.dialect.name == "postgresql" and minimo is not None:
+        # Los ids se copiaron explícitos: la secuencia sigue desde el máximo
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{nombre}', 'id'), {maximo})"
+        )
+    logger.info("Tabla %s migrada al formato compacto (%d filas)", nombre, copiadas)
+    return copiadas
+
+
+def _tablas(conn) -> List[Table]:
+    tablas = [models.Lectura.__table__]
+    tablas += [
+        tabla_archivo(n[len(PREFIJO):])
+        for n in sorted(inspect(conn).get_table_names()) if n.startswith(PREFIJO)
+    ]
+    return tablas
+
+
+def pendientes(conn) -> List[str]:
+    """Tablas que siguen en el formato anterior (conexión síncrona)"""
+    return [t.name for t in _tablas(conn) if _pendiente(conn, t.name)]
+
+
+def migrar(conn) -> int:
+    """Migra lecturas y las tablas de archivo pendientes (conexión síncrona)"""
+    return sum(_migrar_tabla(conn, t) for t in _tablas(conn))
+
+
+async def main(vacuum: bool):
+    from .db import engine
+
+    async with engine.begin() as conn:
+        filas = await conn.run_sync(migrar)
+    print(f"filas migradas: {filas}")
+    if vacuum and engine.dialect.name == "sqlite":
+        # Devuelve al sistema las páginas que liberaron las tablas anteriores
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.exec_driver_sql("VACUUM")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM después de migrar (solo SQLite)")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parser.parse_args().vacuum))
@@ -1,8 +1,10 @@
-from sqlalchemy import Column, String, Float, DateTime, Integer, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Float, DateTime, Integer, SmallInteger, ForeignKey, Text, Index
+from sqlalchemy.orm import relationship, declared_attr
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime, timezone
 import uuid
 from .db import Base
+from .estado import ESTADOS
 
 def gen_uuid():
     return str(uuid.uuid4())
@@ -17,19 +19,127 @@ class Maquinaria(Base):
     numero_serie = Column(String, unique=True, nullable=False)
     motor = Column(String, nullable=True)
     
-    lecturas = relationship("Lectura", back_populates="maquina", cascade="all, delete-orphan")
+    # La BD borra las lecturas (ON DELETE CASCADE); el ORM no las carga para borrarlas
+    lecturas = relationship("Lectura", back_populates="maquina", cascade="all, delete-orphan", passive_deletes=True)
+
+CODIGOS_ESTADO = {e: i for i, e in enumerate(ESTADOS)}
+
+class CodigoEstado(TypeDecorator):
+    """Estado guardado como índice en ESTADOS; en Python y en las consultas se usa el texto"""
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        return CODIGOS_ESTADO[value]
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else ESTADOS[value]
 
 class Lectura(Base):
+    """
+    Fila compacta: el estado es un código, el motivo una máscara de bits
+    (estado.MOTIVOS) sobre los valores de la propia fila y el número de serie
+    se toma de la máquina. Los textos se arman al responder (presentacion.py).
+    """
     __tablename__ = "lecturas"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     maquinaria_id = Column(String, ForeignKey("maquinaria.id", ondelete="CASCADE"), nullable=False)
-    numero_serie = Column(String, nullable=True)
     temperatura = Column(Float, nullable=True)
     vibracion = Column(Float, nullable=True)
     presion_aceite = Column(Float, nullable=True)
     ts = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    estado = Column(String, nullable=True)
-    motivo = Column(Text, nullable=True)
+    estado = Column(CodigoEstado, nullable=True)
+    motivo_bits = Column(SmallInteger, nullable=False, default=0)
     
-    maquina = relationship("Maquinaria", back_populates="lecturas")
\ No newline at end of file
+    maquina = relationship("Maquinaria", back_populates="lecturas")
+
+# Lecturas por máquina en orden temporal inverso (ORDER BY ts DESC LIMIT n y
+# última lectura por máquina). Incluye estado para resolver el estado actual
+# sin visitar la tabla.
+Index(
+    "ix_lecturas_maquinaria_ts",
+    Lectura.maquinaria_id,
+    Lectura.ts.desc(),
+    Lectura.estado,
+)
+
+# Rangos de tiempo de todas las máquinas (agregados y retención)
+Index("ix_lecturas_ts", Lectura.ts)
+
+class _Rollup:
+    """
+    Agregado por máquina y bucket (inicio de la hora o del día, UTC). Guarda
+    conteo, mínimo, suma y máximo por métrica para poder volver a agregar, y
+    minutos en cada estado (cada lectura cuenta hasta la siguiente, acotado).
+    """
+
+    @declared_attr
+    def maquinaria_id(cls):
+        return Column(String, ForeignKey("maquinaria.id", ondelete="CASCADE"), primary_key=True)
+
+    ts = Column(DateTime, primary_key=True)
+    n = Column(Integer, nullable=False)
+    temperatura_n = Column(Integer, nullable=False)
+    temperatura_min = Column(Float, nullable=True)
+    temperatura_sum = Column(Float, nullable=True)
+    temperatura_max = Column(Float, nullable=True)
+    vibracion_n = Column(Integer, nullable=False)
+    vibracion_min = Column(Float, nullable=True)
+    vibracion_sum = Column(Float, nullable=True)
+    vibracion_max = Column(Float, nullable=True)
+    presion_aceite_n = Column(Integer, nullable=False)
+    presion_aceite_min = Column(Float, nullable=True)
+    presion_aceite_sum = Column(Float, nullable=True)
+    presion_aceite_max = Column(Float, nullable=True)
+    minutos_ok = Column(Float, nullable=False, default=0)
+    minutos_alerta = Column(Float, nullable=False, default=0)
+    minutos_critico = Column(Float, nullable=False, default=0)
+
+class LecturaHora(_Rollup, Base):
+    __tablename__ = "lecturas_hora"
+
+class LecturaDia(_Rollup, Base):
+    __tablename__ = "lecturas_dia"
+
+class Tarea(Base):
+    """
+    Coordinación de tareas de fondo entre workers (coordinacion.py). La fila
+    LIDER es el lease: dueno y vence. Las demás son una por tarea: lo pedido
+    por la API (deseado), el estado publicado por el líder y la marca de
+    recálculo que dejan los otros workers; JSON en texto.
+    """
+    __tablename__ = "tareas"
+
+    nombre = Column(String, primary_key=True)
+    dueno = Column(String, nullable=True)
+    vence = Column(DateTime, nullable=True)
+    deseado = Column(Text, nullable=True)
+    estado = Column(Text, nullable=True)
+    marca = Column(DateTime, nullable=True)
+    actualizado = Column(DateTime, nullable=True)
+
+def crear_indices(conn):
+    """create_all no agrega índices nuevos a tablas que ya existen"""
+    for tabla in Base.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            indice.create(conn, checkfirst=True)
+
+# Campos expuestos por schemas.LecturaDB
+LECTURA_CAMPOS = (
+    "id", "maquinaria_id", "numero_serie", "temperatura", "vibracion",
+    "presion_aceite", "ts", "estado", "motivo",
+)
+# Columnas guardadas en lecturas (y en las tablas de archivo)
+LECTURA_COLUMNAS = (
+    "id", "maquinaria_id", "temperatura", "vibracion",
+    "presion_aceite", "ts", "estado", "motivo_bits",
+)
+
+def lectura_columnas():
+    return [getattr(Lectura, c) for c in LECTURA_COLUMNAS]
+
+def lectura_a_dict(lectura) -> dict:
+    return {c: getattr(lectura, c) for c in LECTURA_COLUMNAS}
@@ -0,0 +1,198 @@
+# be/gateway/prediccion.py
+"""
+Motor local de mantenimiento predictivo.
+
+Mantiene por máquina y métrica estadísticas móviles (EWMA, varianza y una
+regresión lineal con pesos exponenciales) que se actualizan en O(1) con cada
+lectura nueva, y estima cuánto falta para cruzar los umbrales de estado sin
+volver a leer el histórico.
+"""
+import asyncio
+import math
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import settings
+from .estado import UMBRALES
+
+METRICAS = ("temperatura", "vibracion", "presion_aceite")
+# Sin al menos estas lecturas y este desvío ponderado de sus tiempos (minutos)
+# no hay pendiente: dos lecturas casi simultáneas darían cualquier valor
+MIN_LECTURAS_PENDIENTE = 3
+MIN_DISPERSION_MINUTOS = 1.5
+
+
+def _ts_naive(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=None) if ts.tzinfo is not None else ts
+
+
+class Serie:
+    """Estadísticas móviles de una métrica de una máquina"""
+
+    __slots__ = ("alpha", "origen", "ultimo_ts", "ultimo", "n", "media", "varianza", "zscore",
+                 "sw", "st", "sx", "stt", "stx")
+
+    def __init__(self, alpha: float, origen: datetime):
+        self.alpha = alpha
+        self.origen = origen
+        self.ultimo_ts: Optional[datetime] = None
+        self.ultimo: Optional[float] = None
+        self.n = 0
+        self.media = 0.0
+        self.varianza = 0.0
+        self.zscore = 0.0
+        # Sumas ponderadas para la regresión x = a + b·t (t en horas desde origen)
+        self.sw = self.st = self.sx = self.stt = self.stx = 0.0
+
+    def actualizar(self, ts: datetime, x: float):
+        t = (ts - self.origen).total_seconds() / 3600
+        a = self.alpha
+        if self.n == 0:
+            self.media = x
+        else:
+            desv = math.sqrt(self.varianza)
+            self.zscore = (x - self.media) / desv if desv > 0 else 0.0
+            delta = x - self.media
+            self.media += a * delta
+            self.varianza = (1 - a) * (self.varianza + a * delta * delta)
+
+        decae = 1 - a
+        self.sw = self.sw * decae + 1
+        self.st = self.st * decae + t
+        self.sx = self.sx * decae + x
+        self.stt = self.stt * decae + t * t
+        self.stx = self.stx * decae + t * x
+
+        self.n += 1
+        self.ultimo_ts = ts
+        self.ultimo = x
+
+    @property
+    def pendiente(self) -> float:
+        """Unidades de la métrica por hora"""
+        den = self.sw * self.stt - self.st * self.st
+        # den / sw² es la varianza ponderada de t (horas²)
+        if self.n < MIN_LECTURAS_PENDIENTE or den < (MIN_DISPERSION_MINUTOS / 60) ** 2 * self.sw * self.sw:
+            return 0.0
+        return (self.sw * self.stx - self.st * self.sx) / den
+
+    def nivel(self) -> float:
+        """Valor de la recta de tendencia en la última lectura"""
+        if self.n < 2:
+            return self.media
+        b = self.pendiente
+        a = (self.sx - b * self.st) / self.sw
+        return a + b * (self.ultimo_ts - self.origen).total_seconds() / 3600
+
+
+def _umbrales_en_direccion(metrica: str, pendiente: float) -> Dict[str, float]:
+    """Umbrales hacia los que avanza la tendencia (altos si sube, bajos si baja)"""
+    # Tendencia plana: no se proyecta ningún cruce
+    if abs(pendiente) < 1e-9:
+        return {}
+    u = UMBRALES[metrica]
+    sufijo = "alto" if pendiente > 0 else "bajo"
+    return {
+        nivel: u[f"{nivel}_{sufijo}"]
+        for nivel in ("alerta", "critico")
+        if f"{nivel}_{sufijo}" in u
+    }
+
+
+class MotorPrediccion:
+    def __init__(self, alpha: float = settings.prediccion_alpha, ventana: int = settings.prediccion_ventana):
+        self.alpha = alpha
+        self.ventana = ventana
+        self._series: Dict[tuple, Serie] = {}
+        self._lock = asyncio.Lock()
+        self.cargado = False
+
+    def actualizar(self, filas: Iterable[dict]):
+        """Aplica lecturas confirmadas; las anteriores a la última conocida se ignoran"""
+        for fila in filas:
+            ts = fila.get("ts")
+            if ts is None:
+                continue
+            ts = _ts_naive(ts)
+            for metrica in METRICAS:
+                x = fila.get(metrica)
+                if x is None:
+                    continue
+                clave = (fila["maquinaria_id"], metrica)
+                serie = self._series.get(clave)
+                if serie is None:
+                    serie = self._series[clave] = Serie(self.alpha, ts)
+                elif ts < serie.ultimo_ts:
+                    continue
+                serie.actualizar(ts, float(x))
+
+    def olvidar(self, maquinaria_id: str):
+        for metrica in METRICAS:
+            self._series.pop((maquinaria_id, metrica), None)
+
+    async def reconstruir(self, db: AsyncSession):
+        """Reconstruye el estado con las últimas `ventana` lecturas de cada máquina"""
+        rn = func.row_number().over(
+            partition_by=models.Lectura.maquinaria_id,
+            order_by=models.Lectura.ts.desc(),
+        ).label("rn")
+        recientes = select(
+            models.Lectura.maquinaria_id, models.Lectura.ts,
+            *(getattr(models.Lectura, m) for m in METRICAS), rn
+        ).subquery()
+        result = await db.stream(
+            select(recientes)
+            .where(recientes.c.rn <= self.ventana)
+            .order_by(recientes.c.maquinaria_id, recientes.c.ts)
+        )
+        self._series = {}
+        async for particion in result.mappings().partitions(5000):
+            self.actualizar(particion)
+        self.cargado = True
+
+    async def asegurar(self, db: AsyncSession):
+        if self.cargado:
+            return
+        async with self._lock:
+            if not self.cargado:
+                await self.reconstruir(db)
+
+    def pronostico(self, maquinaria_id: str, metrica: str) -> Optional[dict]:
+        serie = self._series.get((maquinaria_id, metrica))
+        if serie is None:
+            return None
+        pendiente = serie.pendiente
+        nivel = serie.nivel()
+
+        umbrales = {}
+        for nombre, valor in _umbrales_en_direccion(metrica, pendiente).items():
+            # Negativo si la tendencia ya está más allá del umbral
+            horas = max(0.0, (valor - nivel) / pendiente)
+            umbrales[nombre] = {
+                "valor": valor,
+                "horas": round(horas, 2),
+                "ts": serie.ultimo_ts + timedelta(hours=horas),
+            }
+
+        return {
+            "maquinaria_id": maquinaria_id,
+            "metric": metrica,
+            "n": serie.n,
+            "ultimo_ts": serie.ultimo_ts,
+            "ultimo_valor": serie.ultimo,
+            "ewma": round(serie.media, 4),
+            "desviacion": round(math.sqrt(serie.varianza), 4),
+            "pendiente_por_hora": round(pendiente, 6),
+            "nivel": round(nivel, 4),
+            "zscore": round(serie.zscore, 3),
+            "anomalia": abs(serie.zscore) >= 3,
+            "umbrales": umbrales,
+        }
+
+
+# Instancia única del proceso
+motor = MotorPrediccion()
@@ -0,0 +1,58 @@
+# be/gateway/presentacion.py
+"""
+Lecturas guardadas (models.LECTURA_COLUMNAS) a los campos de schemas.LecturaDB.
+
+El número de serie sale del catálogo de máquinas y el texto de motivo se arma
+con la máscara y los valores de la fila, igual que lo generaba la ingesta.
+"""
+from typing import Dict, Iterable, Mapping, Sequence
+
+from .catalogo import catalogo
+from .estado import texto_motivo
+from .models import LECTURA_CAMPOS
+
+
+def tupla_api(fila: Sequence) -> tuple:
+    """Tupla en orden de LECTURA_COLUMNAS -> tupla en orden de LECTURA_CAMPOS"""
+    id_, maquinaria_id, t, v, p, ts, estado, bits = fila
+    maquina = catalogo.obtener(maquinaria_id)
+    return (
+        id_, maquinaria_id, maquina["numero_serie"] if maquina else None, t, v, p, ts, estado,
+        texto_motivo(bits, t or 0, v or 0, p or 0) if bits else None,
+    )
+
+
+def lectura_api(fila: Mapping) -> dict:
+    return dict(zip(LECTURA_CAMPOS, tupla_api((
+        fila["id"], fila["maquinaria_id"], fila["temperatura"], fila["vibracion"],
+        fila["presion_aceite"], fila["ts"], fila["estado"], fila["motivo_bits"],
+    ))))
+
+
+# Columnas de schemas.SerieMaquina (la máquina y su serie van una vez)
+COLUMNAS_SERIE = ("id", "ts", "temperatura", "vibracion", "presion_aceite", "estado", "motivo")
+
+
+def series_por_maquina(ids: Iterable[str], filas: Iterable[Sequence]) -> Dict[str, dict]:
+    """
+    schemas.SerieMaquina por máquina a partir de tuplas en orden de
+    LECTURA_COLUMNAS; las máquinas sin filas quedan con listas vacías.
+    """
+    series = {}
+    for maquinaria_id in ids:
+        maquina = catalogo.obtener(maquinaria_id)
+        series[maquinaria_id] = {
+            "numero_serie": maquina["numero_serie"] if maquina else None,
+            **{c: [] for c in COLUMNAS_SERIE},
+        }
+    for fila in filas:
+        id_, maquinaria_id, t, v, p, ts, estado, bits = fila
+        serie = series[maquinaria_id]
+        serie["id"].append(id_)
+        serie["ts"].append(ts)
+        serie["temperatura"].append(t)
+        serie["vibracion"].append(v)
+        serie["presion_aceite"].append(p)
+        serie["estado"].append(estado)
+        serie["motivo"].append(texto_motivo(bits, t or 0, v or 0, p or 0) if bits else None)
+    return series
@@ -0,0 +1,179 @@
+# be/gateway/purga.py
+"""
+Baja de máquinas con historiales grandes.
+
+DELETE /maquinaria/{id} borra la fila y la BD elimina en cascada sus lecturas
+y agregados (ON DELETE CASCADE) en una sola sentencia; las tablas de archivo
+(lecturas_archivo_YYYYMM) no tienen FK y se borran en la misma transacción.
+Con ?asincrono=true la máquina desaparece de la API enseguida y un trabajo
+en segundo plano borra sus lecturas, vivas y archivadas, en lotes de
+PURGA_LOTE, cada uno en su transacción, antes de borrar la fila de la
+máquina; el avance se consulta por id de trabajo. El estado del trabajo se
+publica en la tabla tareas (fila purga:<id>) para que lo responda cualquier
+worker.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import Table, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .catalogo import catalogo
+from .config import settings
+from .respuestas import dumps
+from .retencion import retencion
+from .sincronizacion import sincronizador
+
+logger = logging.getLogger(__name__)
+
+# Trabajos terminados que se conservan para consultar su resultado
+MAX_TERMINADAS = 100
+# Filas purga:<id> de la tabla tareas
+PREFIJO_TAREA = "purga:"
+# Segundos entre publicaciones del avance; días que se conserva una terminada
+PUBLICAR_SEGUNDOS = 1.0
+CONSERVAR_DIAS = 1
+
+
+async def borrar_maquina(db: AsyncSession, maquinaria_id: str) -> bool:
+    """Borra la máquina y sus lecturas archivadas sin cargarlas; la BD borra en cascada el resto"""
+    M = models.Maquinaria
+    for tabla in await retencion.todas(db):
+        await db.execute(delete(tabla).where(tabla.c.maquinaria_id == maquinaria_id))
+    result = await db.execute(delete(M.__table__).where(M.id == maquinaria_id))
+    if result.rowcount == 0:
+        await db.rollback()
+        return False
+    await db.commit()
+    return True
+
+
+async def borrar_lote(db: AsyncSession, maquinaria_id: str, lote: int, tabla: Optional[Table] = None) -> int:
+    """Borra hasta `lote` lecturas de la máquina (de lecturas o de una tabla de archivo) y confirma"""
+    tabla = tabla if tabla is not None else models.Lectura.__table__
+    ids = select(tabla.c.id).where(tabla.c.maquinaria_id == maquinaria_id).limit(lote).scalar_subquery()
+    result = await db.execute(delete(tabla).where(tabla.c.id.in_(ids)))
+    await db.commit()
+    return result.rowcount
+
+
+class Purgas:
+    """Trabajos de purga del proceso, por id"""
+
+    def __init__(self):
+        self.trabajos: Dict[str, dict] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def iniciar(self, maquinaria_id: str) -> dict:
+        """Oculta la máquina del catálogo y lanza su purga (una por máquina)"""
+        for trabajo in self.trabajos.values():
+            if trabajo["maquinaria_id"] == maquinaria_id and trabajo["estado"] == "en_curso":
+                return trabajo
+        trabajo = {
+            "id": uuid.uuid4().hex, "maquinaria_id": maquinaria_id, "estado": "en_curso",
+            "total": None, "borradas": 0, "segundos": 0.0, "error": None,
+        }
+        self.trabajos[trabajo["id"]] = trabajo
+        catalogo.ocultar(maquinaria_id)
+        self._tasks[trabajo["id"]] = asyncio.create_task(self._correr(trabajo))
+        self._recortar()
+        return trabajo
+
+    async def obtener(self, db: AsyncSession, trabajo_id: str) -> Optional[dict]:
+        """El trabajo de este worker o el último estado publicado por otro"""
+        trabajo = self.trabajos.get(trabajo_id)
+        if trabajo is not None:
+            return trabajo
+        T = models.Tarea
+        estado = (await db.execute(select(T.estado).where(T.nombre == PREFIJO_TAREA + trabajo_id))).scalar()
+        return json.loads(estado) if estado else None
+
+    async def publicar(self, db: AsyncSession, trabajo: dict):
+        """Guarda el estado en tareas; si falla la purga sigue"""
+        T = models.Tarea
+        nombre = PREFIJO_TAREA + trabajo["id"]
+        ahora = datetime.utcnow()
+        valores = {"estado": dumps(trabajo).decode(), "actualizado": ahora}
+        actualizar = update(T.__table__).where(T.nombre == nombre).values(**valores)
+        try:
+            if (await db.execute(actualizar)).rowcount == 0:
+                # Al empezar, de paso se borran las terminadas hace tiempo
+                await db.execute(delete(T.__table__).where(
+                    T.nombre.like(PREFIJO_TAREA + "%"), T.actualizado < ahora - timedelta(days=CONSERVAR_DIAS)))
+                await db.execute(insert(T.__table__).values(nombre=nombre, **valores))
+            await db.commit()
+        except IntegrityError:
+            # La fila la creó a la vez la ruta o el propio trabajo
+            await db.rollback()
+            await db.execute(actualizar)
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            logger.warning("No se pudo publicar el estado de la purga %s", trabajo["id"], exc_info=True)
+
+    async def _correr(self, trabajo: dict):
+        from .db import async_session
+        maquinaria_id = trabajo["maquinaria_id"]
+        t0 = publicado = time.perf_counter()
+        try:
+            async with async_session() as db:
+                # Primero las vivas: lo que se archive mientras tanto se borra después
+                tablas = [models.Lectura.__table__, *await retencion.todas(db)]
+                trabajo["total"] = 0
+                for tabla in tablas:
+                    trabajo["total"] += (await db.execute(
+                        select(func.count()).select_from(tabla).where(tabla.c.maquinaria_id == maquinaria_id)
+                    )).scalar()
+                for tabla in tablas:
+                    while True:
+                        n = await borrar_lote(db, maquinaria_id, settings.purga_lote, tabla)
+                        trabajo["borradas"] += n
+                        trabajo["segundos"] = round(time.perf_counter() - t0, 3)
+                        if time.perf_counter() - publicado >= PUBLICAR_SEGUNDOS:
+                            await self.publicar(db, trabajo)
+                            publicado = time.perf_counter()
+                        if n < settings.purga_lote:
+                            break
+                        await asyncio.sleep(settings.purga_pausa_segundos)
+                # Lo que quede (agregados, lecturas llegadas o archivadas durante la purga) se borra con la máquina
+                await borrar_maquina(db, maquinaria_id)
+                await sincronizador.catalogo_cambiado(db)
+            trabajo["estado"] = "completada"
+            logger.info("Purga de %s: %d lecturas en %.1f s", maquinaria_id, trabajo["borradas"],
+                        time.perf_counter() - t0)
+        except asyncio.CancelledError:
+            trabajo["estado"] = "cancelada"
+            raise
+        except Exception as e:
+            trabajo["estado"] = "error"
+            trabajo["error"] = f"{type(e).__name__}: {e}"
+            logger.exception("Error purgando la máquina %s", maquinaria_id)
+        finally:
+            trabajo["segundos"] = round(time.perf_counter() - t0, 3)
+            catalogo.mostrar(maquinaria_id)
+            self._tasks.pop(trabajo["id"], None)
+            async with async_session() as db:
+                await self.publicar(db, trabajo)
+
+    def _recortar(self):
+        terminadas = [k for k, t in self.trabajos.items() if t["estado"] != "en_curso"]
+        for k in terminadas[:max(0, len(terminadas) - MAX_TERMINADAS)]:
+            del self.trabajos[k]
+
+    async def detener(self):
+        """Cancela las purgas en curso; las lecturas ya borradas quedan borradas"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Instancia única del proceso
+purgas = Purgas()
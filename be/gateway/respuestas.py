@@ -0,0 +1,38 @@
+# be/gateway/respuestas.py
+"""
+Serialización JSON rápida para rutas de lectura con respuestas grandes.
+
+Las rutas que ya arman dicts con los campos del esquema retornan JSONRapida:
+FastAPI no vuelve a validar cada elemento contra response_model y el cuerpo
+se codifica con orjson (o json de la biblioteca estándar si no está).
+"""
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(o).__name__}")
+
+
+def dumps(contenido: Any) -> bytes:
+    """JSON compacto en UTF-8; fechas en ISO 8601 como las serializa Pydantic"""
+    if orjson is not None:
+        return orjson.dumps(contenido, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(contenido, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+class JSONRapida(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
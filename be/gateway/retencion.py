@@ -0,0 +1,202 @@
+# be/gateway/retencion.py
+"""
+Retención de lecturas crudas.
+
+Las lecturas con más de RETENCION_DIAS se mueven por lotes a tablas de archivo
+mensuales (lecturas_archivo_YYYYMM, mismas columnas) y se borran de lecturas.
+Cada lote es una transacción corta, así la ingesta no queda bloqueada.
+/lecturas/history consulta las tablas de archivo que cubren el rango pedido.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import (
+    Column, DateTime, Float, Index, Integer, MetaData, SmallInteger, String, Table,
+    delete, insert, inspect, select,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import settings
+from .coordinacion import Trabajo, coordinador
+from .rollups import compactador
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = "lecturas_archivo_"
+# Filas por INSERT y ids por DELETE ... IN dentro de un lote
+CHUNK_SIZE = 500
+
+# Las tablas de archivo se crean a demanda, fuera de Base.metadata
+archivo_metadata = MetaData()
+
+
+def _mes(ts: datetime) -> str:
+    return ts.strftime("%Y%m")
+
+
+def _inicio_mes(mes: str) -> datetime:
+    return datetime(int(mes[:4]), int(mes[4:]), 1)
+
+
+def _fin_mes(mes: str) -> datetime:
+    inicio = _inicio_mes(mes)
+    return (inicio + timedelta(days=32)).replace(day=1)
+
+
+def tabla_archivo(mes: str) -> Table:
+    """Tabla de archivo del mes YYYYMM (sin FK: sobrevive a la máquina)"""
+    nombre = PREFIJO + mes
+    tabla = archivo_metadata.tables.get(nombre)
+    if tabla is None:
+        tabla = Table(
+            nombre, archivo_metadata,
+            Column("id", Integer, primary_key=True, autoincrement=False),
+            Column("maquinaria_id", String, nullable=False),
+            Column("temperatura", Float, nullable=True),
+            Column("vibracion", Float, nullable=True),
+            Column("presion_aceite", Float, nullable=True),
+            Column("ts", DateTime),
+            Column("estado", models.CodigoEstado, nullable=True),
+            Column("motivo_bits", SmallInteger, nullable=False, default=0),
+            Index(f"ix_{nombre}_maquinaria_ts", "maquinaria_id", "ts"),
+        )
+    return tabla
+
+
+class Retencion(Trabajo):
+    """Archivado periódico (en el worker líder) y catálogo de las tablas de archivo existentes"""
+
+    nombre = "retencion"
+
+    def __init__(self):
+        self.meses: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self.archivadas = 0
+        self.ultima: Optional[dict] = None
+
+    async def _meses_en_bd(self, db: AsyncSession) -> set:
+        nombres = await db.run_sync(lambda s: inspect(s.connection()).get_table_names())
+        return {n[len(PREFIJO):] for n in nombres if n.startswith(PREFIJO)}
+
+    async def cargar(self, db: AsyncSession):
+        """Descubre las tablas de archivo ya creadas"""
+        self.meses = await self._meses_en_bd(db)
+
+    async def todas(self, db: AsyncSession) -> List[Table]:
+        """Todas las tablas de archivo, incluidas las que otro worker creó hace poco"""
+        self.meses.update(await self._meses_en_bd(db))
+        return [tabla_archivo(mes) for mes in sorted(self.meses)]
+
+    def tablas_en_rango(self, desde: Optional[datetime], hasta: Optional[datetime]) -> List[Table]:
+        """Tablas de archivo con meses que se solapan con [desde, hasta)"""
+        return [
+            tabla_archivo(mes) for mes in sorted(self.meses)
+            if (hasta is None or _inicio_mes(mes) < hasta) and (desde is None or _fin_mes(mes) > desde)
+        ]
+
+    def corte(self) -> Optional[datetime]:
+        """Lecturas anteriores a esto se archivan; None si no hay nada que archivar"""
+        if settings.retencion_dias <= 0:
+            return None
+        corte = datetime.utcnow() - timedelta(days=settings.retencion_dias)
+        if settings.rollup_habilitado:
+            # No archivar lo que los agregados aún no incluyen
+            if compactador.compactado_hasta is None:
+                return None
+            corte = min(corte, compactador.compactado_hasta)
+        return corte
+
+    async def _asegurar_tabla(self, db: AsyncSession, mes: str) -> Table:
+        """Crea la tabla del mes en la transacción en curso; se agrega a meses al confirmar"""
+        tabla = tabla_archivo(mes)
+        if mes not in self.meses:
+            await db.run_sync(lambda s: tabla.create(s.connection(), checkfirst=True))
+        return tabla
+
+    async def archivar_lote(self, db: AsyncSession, corte: datetime, lote: int) -> int:
+        """Mueve hasta `lote` lecturas anteriores a corte a su tabla mensual y confirma"""
+        L = models.Lectura
+        filas = (await db.execute(
+            select(*models.lectura_columnas()).where(L.ts < corte).order_by(L.ts).limit(lote)
+        )).mappings().all()
+        if not filas:
+            return 0
+
+        por_mes: Dict[str, List[dict]] = defaultdict(list)
+        for f in filas:
+            por_mes[_mes(f["ts"])].append(dict(f))
+        for mes, fs in por_mes.items():
+            tabla = await self._asegurar_tabla(db, mes)
+            for i in range(0, len(fs), CHUNK_SIZE):
+                await db.execute(insert(tabla), fs[i:i + CHUNK_SIZE])
+
+        ids = [f["id"] for f in filas]
+        for i in range(0, len(ids), CHUNK_SIZE):
+            await db.execute(delete(L.__table__).where(L.id.in_(ids[i:i + CHUNK_SIZE])))
+        await db.commit()
+        # Recién ahora /lecturas/history puede incluir las tablas nuevas
+        self.meses.update(por_mes)
+        return len(filas)
+
+    async def archivar(self, db: AsyncSession, corte: Optional[datetime] = None) -> int:
+        """Archiva por lotes todo lo anterior al corte, cediendo entre lotes"""
+        corte = corte or self.corte()
+        if corte is None:
+            return 0
+        total = 0
+        t0 = time.perf_counter()
+        while True:
+            n = await self.archivar_lote(db, corte, settings.retencion_lote)
+            total += n
+            self.archivadas += n
+            if n < settings.retencion_lote:
+                break
+            await asyncio.sleep(settings.retencion_pausa_segundos)
+        self.ultima = {"corte": corte, "archivadas": total, "segundos": round(time.perf_counter() - t0, 3)}
+        if total:
+            logger.info("Archivadas %d lecturas anteriores a %s", total, corte)
+        return total
+
+    async def _loop(self):
+        from .db import async_session
+        while True:
+            try:
+                async with async_session() as session:
+                    await self.archivar(session)
+            except Exception:
+                logger.exception("Error archivando lecturas")
+            await asyncio.sleep(settings.retencion_intervalo_segundos)
+
+    def iniciar(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def detener(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def aplicar(self, deseado: Optional[dict]):
+        if settings.retencion_dias > 0:
+            self.iniciar()
+
+    def estado(self) -> dict:
+        return {"meses": sorted(self.meses), "archivadas": self.archivadas, "ultima": self.ultima}
+
+    def observar(self, estado: dict):
+        # Tablas de archivo creadas por el líder después del arranque
+        self.meses.update(estado.get("meses", []))
+
+
+# Instancia única del proceso
+retencion = Retencion()
+coordinador.registrar(retencion)
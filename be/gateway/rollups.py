@@ -0,0 +1,300 @@
+# be/gateway/rollups.py
+"""
+Agregados por hora y por día de las lecturas (lecturas_hora, lecturas_dia).
+
+Un compactador en segundo plano recalcula periódicamente las horas desde la
+última compactada hasta la hora en curso y los días que las contienen. El
+recálculo de un rango es idempotente (borra e inserta), de modo que las
+lecturas que llegan tarde solo requieren marcar el rango de nuevo.
+
+Backfill de datos existentes (desde be/):
+
+    python -m gateway.rollups --desde 2025-01-01
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, insert, delete, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import settings
+from .coordinacion import Trabajo, coordinador
+from .expresiones import epoch, desde_epoch
+
+logger = logging.getLogger(__name__)
+
+METRICAS = ("temperatura", "vibracion", "presion_aceite")
+HORA = 3600
+DIA = 86400
+# Filas por INSERT al escribir agregados
+CHUNK_SIZE = 1000
+# Al detener se espera a que la pasada en curso termine el día; después se cancela
+DETENER_SEGUNDOS = 5.0
+
+
+def _ts_naive(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=None) if ts.tzinfo is not None else ts
+
+
+def piso(ts: datetime, paso: int) -> datetime:
+    """Inicio del bucket de `paso` segundos que contiene ts"""
+    segundos = int((ts - datetime(1970, 1, 1)).total_seconds())
+    return desde_epoch(segundos - segundos % paso)
+
+
+async def _reemplazar(db: AsyncSession, tabla, desde: datetime, hasta: datetime, filas: list):
+    await db.execute(delete(tabla).where(tabla.ts >= desde, tabla.ts < hasta))
+    for i in range(0, len(filas), CHUNK_SIZE):
+        await db.execute(insert(tabla.__table__), filas[i:i + CHUNK_SIZE])
+
+
+async def compactar_horas(db: AsyncSession, desde: datetime, hasta: datetime, ahora: Optional[datetime] = None):
+    """Recalcula lecturas_hora en [desde, hasta), alineados a la hora. No hace commit."""
+    L = models.Lectura
+    gap = int(settings.rollup_max_gap_minutos * 60)
+    ahora_s = int(((ahora or datetime.utcnow()) - datetime(1970, 1, 1)).total_seconds())
+
+    # Segundos hasta la siguiente lectura de la misma máquina; se leen `gap`
+    # segundos de más para conocer la siguiente de las últimas del rango
+    siguiente = func.lead(L.ts).over(partition_by=L.maquinaria_id, order_by=L.ts)
+    crudas = (
+        select(L.maquinaria_id, L.ts, L.estado, *(getattr(L, m) for m in METRICAS),
+               (epoch(siguiente) - epoch(L.ts)).label("dur"))
+        .where(L.ts >= desde, L.ts < hasta + timedelta(seconds=gap))
+        .subquery()
+    )
+    c = crudas.c
+    hasta_ahora = ahora_s - epoch(c.ts)
+    dur = case(
+        (c.dur.is_(None), case((hasta_ahora < gap, hasta_ahora), else_=gap)),
+        (c.dur > gap, gap),
+        else_=c.dur,
+    )
+    bucket = (epoch(c.ts) // HORA).label("bucket")
+
+    def minutos(estado: str):
+        return func.coalesce(func.sum(case((c.estado == estado, dur), else_=0)), 0) / 60.0
+
+    columnas = [c.maquinaria_id, bucket, func.count().label("n")]
+    for m in METRICAS:
+        col = getattr(c, m)
+        columnas += [
+            func.count(col).label(f"{m}_n"),
+            func.min(col).label(f"{m}_min"),
+            func.sum(col).label(f"{m}_sum"),
+            func.max(col).label(f"{m}_max"),
+        ]
+    columnas += [
+        minutos("OK").label("minutos_ok"),
+        minutos("ALERTA").label("minutos_alerta"),
+        minutos("CRITICO").label("minutos_critico"),
+    ]
+    result = await db.execute(
+        select(*columnas).where(c.ts < hasta).group_by(c.maquinaria_id, bucket)
+    )
+    filas = []
+    for f in result.mappings():
+        fila = dict(f)
+        fila["ts"] = desde_epoch(fila.pop("bucket") * HORA)
+        filas.append(fila)
+    await _reemplazar(db, models.LecturaHora, desde, hasta, filas)
+    return len(filas)
+
+
+async def compactar_dias(db: AsyncSession, desde: datetime, hasta: datetime):
+    """Recalcula lecturas_dia en [desde, hasta) a partir de lecturas_hora. No hace commit."""
+    H = models.LecturaHora
+    bucket = (epoch(H.ts) // DIA).label("bucket")
+    columnas = [H.maquinaria_id, bucket, func.sum(H.n).label("n")]
+    for m in METRICAS:
+        columnas += [
+            func.sum(getattr(H, f"{m}_n")).label(f"{m}_n"),
+            func.min(getattr(H, f"{m}_min")).label(f"{m}_min"),
+            func.sum(getattr(H, f"{m}_sum")).label(f"{m}_sum"),
+            func.max(getattr(H, f"{m}_max")).label(f"{m}_max"),
+        ]
+    for estado in ("ok", "alerta", "critico"):
+        columnas.append(func.sum(getattr(H, f"minutos_{estado}")).label(f"minutos_{estado}"))
+    result = await db.execute(
+        select(*columnas).where(H.ts >= desde, H.ts < hasta).group_by(H.maquinaria_id, bucket)
+    )
+    filas = []
+    for f in result.mappings():
+        fila = dict(f)
+        fila["ts"] = desde_epoch(fila.pop("bucket") * DIA)
+        filas.append(fila)
+    await _reemplazar(db, models.LecturaDia, desde, hasta, filas)
+    return len(filas)
+
+
+def limite_retencion(ahora: datetime) -> Optional[datetime]:
+    """Las horas anteriores pueden estar archivadas: sus agregados ya no se recalculan"""
+    if settings.retencion_dias <= 0:
+        return None
+    return piso(ahora - timedelta(days=settings.retencion_dias), HORA) + timedelta(hours=1)
+
+
+async def compactar(db: AsyncSession, desde: datetime, hasta: datetime, ahora: Optional[datetime] = None,
+                    parar: Optional[asyncio.Event] = None) -> dict:
+    """
+    Recalcula las horas que cubren [desde, hasta] y los días que las
+    contienen, confirmando por día para acotar memoria y transacciones.
+    Con `parar` activado corta entre días; "hasta" es lo que se alcanzó.
+    """
+    ahora = ahora or datetime.utcnow()
+    inicio, fin = piso(desde, HORA), piso(hasta, HORA) + timedelta(hours=1)
+    limite = limite_retencion(ahora)
+    if limite is not None:
+        inicio = max(inicio, limite)
+    horas = dias = 0
+    t = inicio
+    while t < fin and not (parar is not None and parar.is_set()):
+        dia = piso(t, DIA)
+        corte = min(dia + timedelta(days=1), fin)
+        horas += await compactar_horas(db, t, corte, ahora)
+        dias += await compactar_dias(db, dia, dia + timedelta(days=1))
+        await db.commit()
+        t = corte
+    return {"desde": inicio, "hasta": max(t, inicio), "horas": horas, "dias": dias}
+
+
+class Compactador(Trabajo):
+    """Mantiene los agregados al día en segundo plano (en el worker líder)"""
+
+    nombre = "rollups"
+
+    def __init__(self):
+        self._hasta: Optional[datetime] = None
+        self._pendiente: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._parar = asyncio.Event()
+        self.ultima: Optional[dict] = None
+
+    @property
+    def compactado_hasta(self) -> Optional[datetime]:
+        """Inicio de la hora en curso en la última pasada (lo anterior está agregado)"""
+        return self._hasta if self.ultima is not None else None
+
+    def marcar(self, ts: datetime):
+        """Lecturas con ts anterior a lo ya compactado: recalcular desde ahí"""
+        ts = _ts_naive(ts)
+        if self._hasta is None or ts < self._hasta:
+            if self._pendiente is None or ts < self._pendiente:
+                self._pendiente = ts
+
+    def tomar_marca(self) -> Optional[datetime]:
+        marca, self._pendiente = self._pendiente, None
+        return marca
+
+    async def _inicio(self, db: AsyncSession) -> Optional[datetime]:
+        if self._hasta is None:
+            # La última hora compactada pudo quedar incompleta: se recalcula
+            self._hasta = (await db.execute(select(func.max(models.LecturaHora.ts)))).scalar()
+        if self._hasta is None:
+            self._hasta = (await db.execute(select(func.min(models.Lectura.ts)))).scalar()
+        if self._hasta is None:
+            return None
+        if self._pendiente is not None:
+            return min(self._hasta, self._pendiente)
+        return self._hasta
+
+    async def ejecutar(self, db: AsyncSession) -> Optional[dict]:
+        """Una pasada: desde la última hora compactada (o lo marcado) hasta ahora"""
+        async with self._lock:
+            ahora = datetime.utcnow()
+            desde = await self._inicio(db)
+            if desde is None:
+                return None
+            self._pendiente = None
+            resultado = await compactar(db, desde, ahora, ahora, self._parar)
+            # Si se cortó al detener, lo que falta se hace en la próxima pasada
+            self._hasta = min(piso(ahora, HORA), resultado["hasta"])
+            self.ultima = {**resultado, "ts": ahora}
+            return self.ultima
+
+    async def _loop(self):
+        from .db import async_session
+        while not self._parar.is_set():
+            try:
+                async with async_session() as session:
+                    await self.ejecutar(session)
+            except Exception:
+                logger.exception("Error compactando agregados")
+            try:
+                await asyncio.wait_for(self._parar.wait(), settings.rollup_intervalo_segundos)
+            except asyncio.TimeoutError:
+                pass
+
+    def iniciar(self):
+        if self._task is None or self._task.done():
+            self._parar.clear()
+            self._task = asyncio.create_task(self._loop())
+
+    async def detener(self):
+        """Deja confirmar el día en curso; cancela solo si tarda más de DETENER_SEGUNDOS"""
+        if self._task is None:
+            return
+        self._parar.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), DETENER_SEGUNDOS)
+        except asyncio.TimeoutError:
+            logger.warning("La compactación no terminó en %.0f s; se cancela", DETENER_SEGUNDOS)
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def aplicar(self, deseado: Optional[dict]):
+        if settings.rollup_habilitado:
+            self.iniciar()
+
+    def estado(self) -> dict:
+        return {"ultima": self.ultima}
+
+    def observar(self, estado: dict):
+        """Progreso del líder: /lecturas/history lee agregados solo hasta ahí"""
+        ultima = estado.get("ultima")
+        if ultima:
+            self.ultima = ultima
+            self._hasta = piso(datetime.fromisoformat(ultima["ts"]), HORA)
+
+
+# Instancia única del proceso
+compactador = Compactador()
+coordinador.registrar(compactador)
+
+
+async def backfill(desde: Optional[datetime] = None, hasta: Optional[datetime] = None) -> Optional[dict]:
+    """Compacta todo el histórico (o el rango dado) con las tablas ya creadas"""
+    from .db import engine, async_session, Base
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        async with async_session() as session:
+            rango = (await session.execute(select(func.min(models.Lectura.ts), func.max(models.Lectura.ts)))).one()
+            desde = desde or rango[0]
+            hasta = hasta or rango[1]
+            if desde is None:
+                return None
+            return await compactar(session, desde, hasta)
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de lecturas_hora y lecturas_dia")
+    parser.add_argument("--desde", type=datetime.fromisoformat, default=None, help="Por defecto la lectura más antigua")
+    parser.add_argument("--hasta", type=datetime.fromisoformat, default=None, help="Por defecto la más reciente")
+    args = parser.parse_args()
+    print(asyncio.run(backfill(args.desde, args.hasta)))
+
+
+if __name__ == "__main__":
+    main()
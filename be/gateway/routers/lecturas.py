@@ -1,69 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import base64
+import binascii
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
-from sqlalchemy import select, insert, text, func, and_
-from datetime import datetime, timedelta
-from typing import Optional
-from ..db import get_db
-from .. import models, schemas
+from sqlalchemy.orm import aliased
+from sqlalchemy import select, insert, text, func, and_, or_, union_all
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from ..db import get_db, async_session
+from ..expresiones import epoch, desde_epoch
+from ..config import settings
+from ..rollups import HORA, DIA, compactador, piso
+from ..retencion import retencion
+from ..cola import cola_ingesta, ColaLlena
+from ..estado import ESTADOS, codigo_estado, motivo_bits
+from ..metricas import LECTURAS_RECHAZADAS
+from ..catalogo import catalogo
+from ..respuestas import JSONRapida
+from ..presentacion import lectura_api, series_por_maquina, tupla_api
+from ..exportacion import FORMATOS, FormatoNoDisponible, exportar, verificar_formato
+from ..ingesta import resolver_maquinas, preparar_filas, guardar_lecturas, lecturas_confirmadas
+from ..ultimas import ultimas
+from ..eventos import broker, stream_sse
+from ..prediccion import motor
+from ..sincronizacion import sincronizador
+from .. import importacion, models, schemas
+from .resumen import calcular_resumen
 
 router = APIRouter(prefix="/lecturas", tags=["lecturas"])
 
-def evaluar_estado(temperatura: float, vibracion: float, presion_aceite: float) -> tuple[str, Optional[str]]:
-    """
-    Evalúa el estado de la maquinaria basado en los umbrales definidos.
-  
-    Retorna: (estado, motivo)
-    - estado: 'OK', 'ALERTA', 'CRITICO'
-    - motivo: descripción del problema o None si está OK
-    """
-    alertas = []
-    criticos = []
-  
-    # Evaluar vibración (mm/s RMS)
-    if vibracion > 4.5:
-        criticos.append(f"Vibración crítica ({vibracion} mm/s)")
-    elif vibracion > 2.5:
-        alertas.append(f"Vibración elevada ({vibracion} mm/s)")
-  
-    # Evaluar temperatura del motor (°C)
-    if temperatura > 120:
-        criticos.append(f"Temperatura crítica ({temperatura}°C)")
-    elif temperatura > 100:
-        alertas.append(f"Temperatura elevada ({temperatura}°C)")
-    elif temperatura < 80:
-        alertas.append(f"Temperatura baja ({temperatura}°C)")
-  
-    # Evaluar presión de aceite (bar)
-    if presion_aceite < 1.5:
-        criticos.append(f"Presión de aceite crítica ({presion_aceite} bar)")
-    elif presion_aceite < 2.5:
-        alertas.append(f"Presión de aceite baja ({presion_aceite} bar)")
-    elif presion_aceite > 5.5:
-        alertas.append(f"Presión de aceite alta ({presion_aceite} bar)")
-  
-    # Determinar estado final
-    if criticos:
-        return "CRITICO", "; ".join(criticos)
-    elif alertas:
-        return "ALERTA", "; ".join(alertas)
-    else:
-        return "OK", None
+METRICAS = ("temperatura", "vibracion", "presion_aceite")
+# Máquinas por consulta en /lecturas/maquinas
+MAX_MAQUINAS = 1000
 
-@router.post("", response_model=schemas.LecturaDB)
+@router.post("", response_model=schemas.LecturaDB, responses={202: {}, 429: {}})
 async def create_lectura(payload: schemas.LecturaIn, db: AsyncSession = Depends(get_db)):
-    """Crear una nueva lectura con evaluación automática de estado"""
-  
-    # Verificar que la maquinaria existe
-    result = await db.execute(
-        select(models.Maquinaria).where(models.Maquinaria.id == payload.maquinaria_id)
-    )
-    maquina = result.scalar_one_or_none()
-    if not maquina:
+    """
+    Crear una nueva lectura con evaluación automática de estado.
+
+    Con INGESTA_ASINCRONA la lectura se encola y se responde 202; se escribe
+    en lote en segundo plano (ver /lecturas/cola). Cola llena: 429.
+    """
+    # Verificar que la maquinaria existe (catálogo en memoria)
+    await catalogo.asegurar(db)
+    if not catalogo.obtener(payload.maquinaria_id):
+        LECTURAS_RECHAZADAS.inc("maquina_no_encontrada")
         raise HTTPException(status_code=404, detail="Maquinaria no encontrada")
+
+    if settings.ingesta_asincrona:
+        try:
+            cola_ingesta.encolar(payload)
+        except ColaLlena:
+            LECTURAS_RECHAZADAS.inc("cola_llena")
+            raise HTTPException(status_code=429, detail="Cola de ingesta llena", headers={"Retry-After": "1"})
+        return JSONResponse(status_code=202, content={"ok": True, "encolada": True})
   
     # Evaluar estado basado en los valores
-    estado, motivo = evaluar_estado(
+    bits = motivo_bits(
         temperatura=payload.temperatura or 0,
         vibracion=payload.vibracion or 0,
         presion_aceite=payload.presion_aceite or 0
@@ -72,83 +67,382 @@ async def create_lectura(payload: schemas.LecturaIn, db: AsyncSession = Depends(
     # Crear la lectura
     lectura = models.Lectura(
         maquinaria_id=payload.maquinaria_id,
-        numero_serie=payload.numero_serie or maquina.numero_serie,
         temperatura=payload.temperatura,
         vibracion=payload.vibracion,
         presion_aceite=payload.presion_aceite,
         ts=payload.ts or datetime.utcnow(),
-        estado=estado,
-        motivo=motivo
+        estado=ESTADOS[codigo_estado(bits)],
+        motivo_bits=bits
     )
   
     db.add(lectura)
+    await db.flush()
+    sincronizador.propias([{"id": lectura.id}])
     await db.commit()
     await db.refresh(lectura)
-    return lectura
+    fila = models.lectura_a_dict(lectura)
+    lecturas_confirmadas([fila])
+    return JSONRapida(lectura_api(fila))
 
 @router.post("/batch")
 async def create_lecturas_batch(payload: schemas.LecturaBatchIn, db: AsyncSession = Depends(get_db)):
-    """Crear múltiples lecturas con evaluación automática"""
-    created = []
-  
-    for lectura_in in payload.lecturas:
-        # Verificar que la maquinaria existe
-        result = await db.execute(
-            select(models.Maquinaria).where(models.Maquinaria.id == lectura_in.maquinaria_id)
-        )
-        maquina = result.scalar_one_or_none()
-        if not maquina:
-            continue
-      
-        # Evaluar estado
-        estado, motivo = evaluar_estado(
-            temperatura=lectura_in.temperatura or 0,
-            vibracion=lectura_in.vibracion or 0,
-            presion_aceite=lectura_in.presion_aceite or 0
-        )
-      
-        lectura = models.Lectura(
-            maquinaria_id=lectura_in.maquinaria_id,
-            numero_serie=lectura_in.numero_serie or maquina.numero_serie,
-            temperatura=lectura_in.temperatura,
-            vibracion=lectura_in.vibracion,
-            presion_aceite=lectura_in.presion_aceite,
-            ts=lectura_in.ts or datetime.utcnow(),
-            estado=estado,
-            motivo=motivo
-        )
-        db.add(lectura)
-        created.append(lectura)
-  
-    await db.commit()
-    return {"ok": True, "inserted": len(created)}
+    """
+    Crear múltiples lecturas con evaluación automática.
+
+    Las máquinas se resuelven en una sola consulta y las lecturas se escriben
+    con INSERT multi-fila por bloques. Retorna el resultado de cada elemento.
+    """
+    series = await resolver_maquinas(db, (l.maquinaria_id for l in payload.lecturas))
+    aceptadas = [l.maquinaria_id in series for l in payload.lecturas]
+    validas = [l for l, ok in zip(payload.lecturas, aceptadas) if ok]
+    filas = preparar_filas(validas)
+
+    estados = iter(f["estado"] for f in filas)
+    results = [
+        {"index": i, "ok": True, "estado": next(estados)} if ok
+        else {"index": i, "ok": False, "error": "Maquinaria no encontrada"}
+        for i, ok in enumerate(aceptadas)
+    ]
+
+    await guardar_lecturas(db, filas)
+    if len(results) > len(filas):
+        LECTURAS_RECHAZADAS.inc("maquina_no_encontrada", n=len(results) - len(filas))
+    return {
+        "ok": True,
+        "inserted": len(filas),
+        "rejected": len(results) - len(filas),
+        "results": results,
+    }
+
+@router.post("/batch/stream", openapi_extra={"requestBody": {"content": {
+    "application/x-ndjson": {"schema": {"type": "string", "description": "Un LecturaIn JSON por línea"}},
+    "application/msgpack": {"schema": {"type": "string", "format": "binary"}},
+}}})
+async def create_lecturas_stream(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Ingesta en streaming para cargas grandes: NDJSON o MessagePack según
+    Content-Type. Inserta por bloques mientras llega el cuerpo y retorna los
+    errores por número de línea (o de registro en MessagePack). Un
+    MessagePack corrupto o truncado responde 400 con lo guardado hasta ahí.
+    """
+    formato = importacion.formato_de(request.headers.get("content-type"))
+    if formato is None:
+        raise HTTPException(status_code=415, detail=f"Content-Type soportados: {', '.join(importacion.FORMATOS)}")
+    try:
+        importacion.verificar_formato(formato)
+    except FormatoNoDisponible as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    resultado = await importacion.importar(db, request.stream(), formato)
+    if not resultado["ok"]:
+        return JSONResponse(status_code=400 if resultado.get("cuerpo_invalido") else 500, content=resultado)
+    return resultado
+
+@router.get("/cola")
+async def estado_cola():
+    """Profundidad de la cola de ingesta asíncrona, lotes y latencia de escritura"""
+    return cola_ingesta.estado()
 
 @router.get("/latest", response_model=list[schemas.LecturaDB])
 async def get_latest_lecturas(db: AsyncSession = Depends(get_db)):
-    """Obtener la última lectura de cada máquina"""
-    from sqlalchemy import func
-  
-    # Subconsulta para obtener el timestamp más reciente por máquina
-    subq = (
-        select(
-            models.Lectura.maquinaria_id,
-            func.max(models.Lectura.ts).label("max_ts")
-        )
-        .group_by(models.Lectura.maquinaria_id)
-        .subquery()
+    """Obtener la última lectura de cada máquina (desde memoria)"""
+    await ultimas.asegurar(db)
+    return JSONRapida(ultimas.latest())
+
+def _utc_naive(ts: datetime) -> datetime:
+    """Parámetros con zona se llevan a UTC sin zona, como se guarda ts"""
+    if ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+def _encode_cursor(valores: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        valores = None
+    # Un cursor vacío ({}) no debe leerse como "sin cursor" y volver a la primera página
+    if not isinstance(valores, dict) or not valores:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return valores
+
+@router.get("/history", response_model=schemas.LecturaHistoryPage)
+async def get_history(
+    maquinaria_id: str,
+    desde: Optional[datetime] = Query(None, alias="from"),
+    hasta: Optional[datetime] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    bucket_minutes: Optional[int] = Query(None, ge=1, le=1440, description="Agrupar en buckets de N minutos"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Histórico de una máquina en orden cronológico.
+
+    Pagina por cursor (ts, id) en lugar de offset. Con bucket_minutes devuelve
+    min/avg/max por bucket calculados en la BD en lugar de las filas crudas;
+    si el rango es largo y el bucket es de horas o días completos, se leen
+    los agregados lecturas_hora/lecturas_dia (ver `fuente`).
+    """
+    desde = _utc_naive(desde) if desde else None
+    hasta = _utc_naive(hasta) if hasta else None
+    pos = _decode_cursor(cursor) if cursor else None
+
+    if bucket_minutes:
+        paso = bucket_minutes * 60
+        tabla = _tabla_rollup(desde, hasta, paso)
+        if pos is not None:
+            try:
+                siguiente = desde_epoch((int(pos["bucket"]) + 1) * paso)
+            except (KeyError, TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Cursor inválido")
+            desde = max(desde, siguiente) if desde else siguiente
+        if tabla is not None:
+            return await _history_rollup(db, tabla, maquinaria_id, desde, hasta, limit, paso)
+        filas = await _history_buckets(db, _origen(maquinaria_id, desde, hasta), limit + 1, paso)
+        return _pagina_buckets(filas, limit, paso)
+
+    despues = None
+    if pos is not None:
+        try:
+            ts_c, id_c = datetime.fromisoformat(pos["ts"]), int(pos["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        desde = max(desde, ts_c) if desde else ts_c
+
+        def despues(t):
+            return or_(t.c.ts > ts_c, and_(t.c.ts == ts_c, t.c.id > id_c))
+
+    origen = _origen(maquinaria_id, desde, hasta, despues)
+    result = await db.execute(
+        select(*(origen.c[c] for c in models.LECTURA_COLUMNAS))
+        .order_by(origen.c.ts, origen.c.id)
+        .limit(limit + 1)
     )
-  
-    # Consulta principal
+    filas = result.mappings().all()
+
+    next_cursor = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        next_cursor = _encode_cursor({"ts": filas[-1]["ts"].isoformat(), "id": filas[-1]["id"]})
+    await catalogo.asegurar(db)
+    return {"items": [lectura_api(f) for f in filas], "next_cursor": next_cursor}
+
+def _origen(maquinaria_id, desde: Optional[datetime], hasta: Optional[datetime], extra=None):
+    """
+    Lecturas de la máquina en [desde, hasta) como subconsulta: la tabla viva
+    más las tablas de archivo cuyo mes se solapa con el rango. Los filtros se
+    aplican en cada tabla para que use su índice.
+
+    maquinaria_id: un id, una lista de ids o None (todas las máquinas)
+    """
+    selects = []
+    for t in (models.Lectura.__table__, *retencion.tablas_en_rango(desde, hasta)):
+        conds = []
+        if isinstance(maquinaria_id, str):
+            conds.append(t.c.maquinaria_id == maquinaria_id)
+        elif maquinaria_id is not None:
+            conds.append(t.c.maquinaria_id.in_(maquinaria_id))
+        if desde:
+            conds.append(t.c.ts >= desde)
+        if hasta:
+            conds.append(t.c.ts < hasta)
+        if extra is not None:
+            conds.append(extra(t))
+        selects.append(select(*(t.c[c] for c in models.LECTURA_COLUMNAS)).where(*conds))
+    return (selects[0] if len(selects) == 1 else union_all(*selects)).subquery("lecturas")
+
+async def _history_buckets(db: AsyncSession, origen, limit: int, paso: int) -> list:
+    """min/avg/max por bucket de `paso` segundos agregados en SQL"""
+    bucket = (epoch(origen.c.ts) // paso).label("bucket")
+    columnas = [bucket, func.count().label("n")]
+    for m in METRICAS:
+        col = origen.c[m]
+        columnas += [
+            func.min(col).label(f"{m}_min"),
+            func.avg(col).label(f"{m}_avg"),
+            func.max(col).label(f"{m}_max"),
+        ]
     result = await db.execute(
-        select(models.Lectura)
-        .join(
-            subq,
-            (models.Lectura.maquinaria_id == subq.c.maquinaria_id) &
-            (models.Lectura.ts == subq.c.max_ts)
-        )
+        select(*columnas)
+        .group_by(bucket)
+        .order_by(bucket)
+        .limit(limit)
     )
-  
-    return result.scalars().all()
+    return result.mappings().all()
+
+def _pagina_buckets(filas: list, limit: int, paso: int, fuente: str = "lecturas") -> dict:
+    next_cursor = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        next_cursor = _encode_cursor({"bucket": filas[-1]["bucket"]})
+    buckets = []
+    for f in filas:
+        b = dict(f)
+        b["ts"] = desde_epoch(b.pop("bucket") * paso)
+        buckets.append(b)
+    return {"buckets": buckets, "next_cursor": next_cursor, "fuente": fuente}
+
+def _tabla_rollup(desde: Optional[datetime], hasta: Optional[datetime], paso: int):
+    """Tabla de agregados adecuada al rango y al bucket; None para leer las lecturas"""
+    if not settings.rollup_habilitado:
+        return None
+    if desde is None:
+        horas = float("inf")
+    else:
+        horas = ((hasta or datetime.utcnow()) - desde).total_seconds() / 3600
+    if paso % DIA == 0 and horas >= settings.history_rollup_dias * 24:
+        return models.LecturaDia
+    if paso % HORA == 0 and horas >= settings.history_rollup_horas:
+        return models.LecturaHora
+    return None
+
+async def _history_rollup(
+    db: AsyncSession, tabla, maquinaria_id: str, desde: Optional[datetime], hasta: Optional[datetime],
+    limit: int, paso: int,
+):
+    """
+    Buckets re-agregados desde lecturas_hora/lecturas_dia. Solo los buckets
+    enteros dentro de [desde, hasta) y de lo que ya compactó el compactador
+    salen de los agregados; los buckets parciales de los extremos y los
+    posteriores se agregan de las lecturas, así el resultado es el mismo que
+    sin agregados.
+    """
+    compactado = compactador.compactado_hasta
+    # Buckets enteros: [inicio, fin)
+    inicio = None
+    if desde is not None:
+        inicio = piso(desde, paso)
+        if inicio < desde:
+            inicio += timedelta(seconds=paso)
+    # Nada compactado todavía (o estado desconocido): todo de las lecturas
+    fin = piso(compactado, paso) if compactado is not None else None
+    if fin is not None and hasta is not None:
+        fin = min(fin, piso(hasta, paso))
+    if fin is None or (inicio is not None and inicio >= fin):
+        filas = await _history_buckets(db, _origen(maquinaria_id, desde, hasta), limit + 1, paso)
+        return _pagina_buckets(filas, limit, paso)
+
+    filas = []
+    if desde is not None and desde < inicio:
+        filas += await _history_buckets(db, _origen(maquinaria_id, desde, inicio), limit + 1, paso)
+    crudas = bool(filas)
+    if len(filas) <= limit:
+        filas += await _buckets_rollup(db, tabla, maquinaria_id, inicio, fin, limit + 1 - len(filas), paso)
+    if len(filas) <= limit and (hasta is None or fin < hasta):
+        recientes = await _history_buckets(db, _origen(maquinaria_id, fin, hasta), limit + 1 - len(filas), paso)
+        filas += recientes
+        crudas = crudas or bool(recientes)
+    fuente = tabla.__tablename__ + ("+lecturas" if crudas else "")
+    return _pagina_buckets(filas, limit, paso, fuente)
+
+async def _buckets_rollup(
+    db: AsyncSession, tabla, maquinaria_id: str, desde: Optional[datetime], hasta: datetime, limit: int, paso: int,
+) -> list:
+    """Buckets de `paso` segundos en [desde, hasta), ambos alineados al bucket, desde los agregados"""
+    filtros = [tabla.maquinaria_id == maquinaria_id, tabla.ts < hasta]
+    if desde is not None:
+        filtros.append(tabla.ts >= desde)
+
+    bucket = (epoch(tabla.ts) // paso).label("bucket")
+    # Si el bucket coincide con la granularidad de la tabla cada fila ya es un bucket
+    agrupar = paso != (DIA if tabla is models.LecturaDia else HORA)
+
+    def agg(fn, campo: str):
+        col = getattr(tabla, campo)
+        return fn(col) if agrupar else col
+
+    columnas = [bucket, agg(func.sum, "n").label("n")]
+    for m in METRICAS:
+        columnas += [
+            agg(func.min, f"{m}_min").label(f"{m}_min"),
+            (agg(func.sum, f"{m}_sum") / func.nullif(agg(func.sum, f"{m}_n"), 0)).label(f"{m}_avg"),
+            agg(func.max, f"{m}_max").label(f"{m}_max"),
+        ]
+    for estado in ("ok", "alerta", "critico"):
+        columnas.append(agg(func.sum, f"minutos_{estado}").label(f"minutos_{estado}"))
+    stmt = select(*columnas).where(*filtros)
+    if agrupar:
+        stmt = stmt.group_by(bucket)
+    result = await db.execute(stmt.order_by(bucket).limit(limit))
+    return list(result.mappings().all())
+
+@router.get("/export")
+async def export_lecturas(
+    maquinaria_id: Optional[List[str]] = Query(None, description="Repetible; sin filtro se exportan todas"),
+    tipo: Optional[str] = Query(None, description="Solo máquinas de este tipo"),
+    desde: Optional[datetime] = Query(None, alias="from"),
+    hasta: Optional[datetime] = Query(None, alias="to"),
+    formato: str = Query("csv", description="csv, arrow (IPC stream) o parquet"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Exporta lecturas crudas (incluye las archivadas) ordenadas por ts, en
+    streaming y con memoria constante, para análisis fuera de línea.
+    """
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"formato debe ser uno de {', '.join(FORMATOS)}")
+    try:
+        verificar_formato(formato)
+    except FormatoNoDisponible as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    # El catálogo resuelve el tipo y el número de serie de cada fila
+    await catalogo.asegurar(db)
+    maquinas = maquinaria_id
+    if tipo is not None:
+        del_tipo = catalogo.ids_de_tipo(tipo)
+        maquinas = [m for m in maquinaria_id if m in del_tipo] if maquinaria_id else list(del_tipo)
+    desde = _utc_naive(desde) if desde else None
+    hasta = _utc_naive(hasta) if hasta else None
+    origen = _origen(maquinas, desde, hasta)
+    stmt = select(*(origen.c[c] for c in models.LECTURA_COLUMNAS)).order_by(origen.c.ts, origen.c.id)
+
+    async def contenido():
+        # Sesión propia: vive lo que dure la descarga, no solo el handler
+        async with async_session() as session:
+            async for datos in exportar(session, stmt, formato):
+                if datos:
+                    yield datos
+
+    media_type, extension = FORMATOS[formato]
+    nombre = f"lecturas_{datetime.utcnow():%Y%m%d%H%M%S}.{extension}"
+    return StreamingResponse(
+        contenido(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
+@router.get("/stream")
+async def stream_lecturas(request: Request, maquinaria_id: Optional[List[str]] = Query(None)):
+    """
+    Server-Sent Events con las lecturas nuevas y las transiciones de estado.
+
+    Eventos: `lectura` (nueva última lectura de una máquina), `transicion`
+    (cambio OK/ALERTA/CRITICO) y `perdidos` (eventos descartados porque el
+    cliente no consumía a tiempo). Filtra por máquina con ?maquinaria_id=.
+    """
+    sub = broker.suscribir(maquinaria_id)
+    return StreamingResponse(
+        stream_sse(sub, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/predict", response_model=schemas.PrediccionDTO)
+async def predict(maquinaria_id: str, metric: str = "temperatura", db: AsyncSession = Depends(get_db)):
+    """
+    Tendencia de una métrica y horas estimadas hasta cruzar los umbrales de
+    alerta y crítico, calculadas con el estado incremental en memoria.
+    """
+    if metric not in METRICAS:
+        raise HTTPException(status_code=400, detail=f"metric debe ser una de {', '.join(METRICAS)}")
+    await motor.asegurar(db)
+    pronostico = motor.pronostico(maquinaria_id, metric)
+    if pronostico is None:
+        raise HTTPException(status_code=404, detail="Sin lecturas para la máquina y métrica indicadas")
+    return pronostico
 
 @router.get("/maquina/{maquinaria_id}", response_model=list[schemas.LecturaDB])
 async def get_lecturas_by_maquina(
@@ -158,56 +452,78 @@ async def get_lecturas_by_maquina(
 ):
     """Obtener lecturas de una máquina específica"""
     result = await db.execute(
-        select(models.Lectura)
+        select(*models.lectura_columnas())
         .where(models.Lectura.maquinaria_id == maquinaria_id)
         .order_by(desc(models.Lectura.ts))
         .limit(limit)
     )
-    return result.scalars().all()
+    await catalogo.asegurar(db)
+    return JSONRapida([dict(zip(models.LECTURA_CAMPOS, tupla_api(fila))) for fila in result.tuples()])
 
-@router.get("/resumen", response_model=schemas.ResumenDTO)
-async def get_resumen(db: AsyncSession = Depends(get_db)):
-    """Obtener resumen del estado de todas las máquinas"""
-    from sqlalchemy import func
-  
-    # Obtener última lectura por máquina
-    subq = (
-        select(
-            models.Lectura.maquinaria_id,
-            func.max(models.Lectura.ts).label("max_ts")
-        )
-        .group_by(models.Lectura.maquinaria_id)
+@router.get("/maquinas", response_model=schemas.LecturasPorMaquina)
+async def get_lecturas_maquinas(
+    maquinaria_id: Optional[List[str]] = Query(None, description="Repetible; sin ids ni tipo, todas las máquinas"),
+    tipo: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=5000, description="Últimas N lecturas por máquina"),
+    desde: Optional[datetime] = Query(None, alias="from"),
+    hasta: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Últimas `limit` lecturas de varias máquinas en una sola consulta
+    (ROW_NUMBER por máquina), opcionalmente dentro de [from, to). Cada
+    máquina trae sus columnas como listas en orden cronológico.
+    """
+    await catalogo.asegurar(db)
+    ids = catalogo.ids_de_tipo(tipo)
+    if maquinaria_id:
+        ids &= set(maquinaria_id)
+    if len(ids) > MAX_MAQUINAS:
+        raise HTTPException(status_code=400, detail=f"Como máximo {MAX_MAQUINAS} máquinas por consulta")
+    ids = sorted(ids)
+    if not ids:
+        return JSONRapida({"maquinas": {}})
+
+    L, M = models.Lectura, models.Maquinaria
+    L2 = aliased(L)
+
+    def ventana(t):
+        return [c for c in ((t.ts >= _utc_naive(desde)) if desde else None,
+                            (t.ts < _utc_naive(hasta)) if hasta else None) if c is not None]
+
+    # ts de la lectura N de cada máquina (por el índice maquinaria_id, ts): la
+    # ventana ROW_NUMBER solo recorre esas N filas por máquina y no todo su
+    # historial. Con menos de N lecturas el corte es datetime.min.
+    corte_ts = (
+        select(L2.ts).where(L2.maquinaria_id == M.id, *ventana(L2))
+        .order_by(L2.ts.desc()).limit(1).offset(limit - 1).scalar_subquery()
+    )
+    corte = (
+        select(M.id.label("maquinaria_id"), func.coalesce(corte_ts, datetime.min).label("ts"))
+        .where(M.id.in_(ids)).subquery()
+    )
+    orden = func.row_number().over(partition_by=L.maquinaria_id, order_by=(L.ts.desc(), L.id.desc()))
+    sub = (
+        select(*models.lectura_columnas(), orden.label("n"))
+        .select_from(corte)
+        .join(L, and_(L.maquinaria_id == corte.c.maquinaria_id, L.ts >= corte.c.ts))
+        .where(*ventana(L))
         .subquery()
     )
-  
     result = await db.execute(
-        select(models.Lectura)
-        .join(
-            subq,
-            (models.Lectura.maquinaria_id == subq.c.maquinaria_id) &
-            (models.Lectura.ts == subq.c.max_ts)
-        )
+        select(*(sub.c[c] for c in models.LECTURA_COLUMNAS))
+        .where(sub.c.n <= limit)
+        .order_by(sub.c.maquinaria_id, sub.c.ts, sub.c.id)
     )
-    lecturas = result.scalars().all()
-  
-    # Obtener todas las máquinas
-    maquinas_result = await db.execute(select(models.Maquinaria))
-    maquinas = maquinas_result.scalars().all()
-  
-    # Contar por estado
-    ok = sum(1 for l in lecturas if l.estado == "OK")
-    alerta = sum(1 for l in lecturas if l.estado == "ALERTA")
-    critico = sum(1 for l in lecturas if l.estado == "CRITICO")
-  
-    # Contar por tipo
-    por_tipo = {}
-    for m in maquinas:
-        por_tipo[m.tipo] = por_tipo.get(m.tipo, 0) + 1
-  
-    return schemas.ResumenDTO(
-        total_maquinas=len(maquinas),
-        ok=ok,
-        alerta=alerta,
-        critico=critico,
-        por_tipo=por_tipo
-    )
\ No newline at end of file
+    return JSONRapida({"maquinas": series_por_maquina(ids, result.tuples())})
+
+@router.get("/resumen", response_model=schemas.ResumenDTO)
+async def get_resumen(tipo: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    """
+    Obtener resumen del estado de todas las máquinas. Sin filtro se sirve de
+    los contadores en memoria; con `tipo` se calcula en la BD (ver /resumen).
+    """
+    if tipo:
+        return await calcular_resumen(db, tipo)
+    await ultimas.asegurar(db)
+    return ultimas.resumen()
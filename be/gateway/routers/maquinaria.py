@@ -1,15 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ..db import get_db
 from .. import models, schemas
+from ..ultimas import ultimas
+from ..prediccion import motor
+from ..catalogo import catalogo, CursorInvalido, etag_de, coincide_etag
+from ..respuestas import dumps
+from ..purga import purgas, borrar_maquina
+from ..sincronizacion import sincronizador
 
 router = APIRouter(prefix="/maquinaria", tags=["maquinaria"])
 
-@router.get("", response_model=list[schemas.MaquinaOut])
-async def list_maquinaria(db: AsyncSession = Depends(get_db)):
-    res = await db.execute(select(models.Maquinaria))
-    return res.scalars().all()
+# Los clientes pueden guardar la respuesta pero deben revalidarla (If-None-Match)
+CACHE_CONTROL = "no-cache"
+
+
+def _respuesta(cuerpo: bytes, etag: str, if_none_match: Optional[str], headers: Optional[dict] = None) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, **(headers or {})}
+    if coincide_etag(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
+
+
+@router.get("", response_model=list[schemas.MaquinaOut], responses={304: {}})
+async def list_maquinaria(
+    tipo: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Sin limit se retorna todo"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Máquinas ordenadas por nombre, desde el catálogo en memoria. Con `limit`
+    el cursor de la página siguiente va en el header X-Next-Cursor (el cuerpo
+    sigue siendo una lista). Responde 304 si If-None-Match coincide con el ETag.
+    """
+    await catalogo.asegurar(db)
+    try:
+        cuerpo, etag, siguiente = catalogo.pagina(tipo, cursor, limit)
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _respuesta(cuerpo, etag, if_none_match, {"X-Next-Cursor": siguiente} if siguiente else None)
 
 @router.post("", response_model=schemas.MaquinaOut)
 async def create_maquina(payload: schemas.MaquinaCreate, db: AsyncSession = Depends(get_db)):
@@ -20,18 +55,24 @@ async def create_maquina(payload: schemas.MaquinaCreate, db: AsyncSession = Depe
     db.add(m)
     await db.commit()
     await db.refresh(m)
+    ultimas.alta_maquina(m.id, m.tipo)
+    catalogo.alta(m)
+    await sincronizador.catalogo_cambiado(db)
     return m
 
-@router.get("/{maquinaria_id}", response_model=schemas.MaquinaOut)
-async def get_maquina(maquinaria_id: str, db: AsyncSession = Depends(get_db)):
-    """Obtener una máquina por su ID"""
-    result = await db.execute(
-        select(models.Maquinaria).where(models.Maquinaria.id == maquinaria_id)
-    )
-    maquina = result.scalar_one_or_none()
+@router.get("/{maquinaria_id}", response_model=schemas.MaquinaOut, responses={304: {}})
+async def get_maquina(
+    maquinaria_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """Obtener una máquina por su ID (catálogo en memoria, con ETag)"""
+    await catalogo.asegurar(db)
+    maquina = catalogo.obtener(maquinaria_id)
     if not maquina:
         raise HTTPException(status_code=404, detail="Maquinaria no encontrada")
-    return maquina
+    cuerpo = dumps(maquina)
+    return _respuesta(cuerpo, etag_de(cuerpo), if_none_match)
 
 @router.put("/{maquinaria_id}", response_model=schemas.MaquinaOut)
 async def update_maquina(
@@ -55,19 +96,44 @@ async def update_maquina(
   
     await db.commit()
     await db.refresh(maquina)
+    ultimas.alta_maquina(maquina.id, maquina.tipo)
+    catalogo.alta(maquina)
+    await sincronizador.catalogo_cambiado(db)
     return maquina
 
-@router.delete("/{maquinaria_id}")
-async def delete_maquina(maquinaria_id: str, db: AsyncSession = Depends(get_db)):
-    """Eliminar una máquina por su ID"""
-    result = await db.execute(
-        select(models.Maquinaria).where(models.Maquinaria.id == maquinaria_id)
-    )
-    maquina = result.scalar_one_or_none()
-  
-    if not maquina:
+@router.delete("/{maquinaria_id}", responses={202: {"description": "Purga iniciada (asincrono=true)"}})
+async def delete_maquina(
+    maquinaria_id: str,
+    asincrono: bool = Query(False, description="Borrar las lecturas en lotes en segundo plano"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Eliminar una máquina por su ID. La BD borra sus lecturas en cascada sin
+    cargarlas; con asincrono=true responde 202 con el trabajo de purga
+    (ver GET /maquinaria/purgas/{id}).
+    """
+    if asincrono:
+        existe = await db.execute(select(models.Maquinaria.id).where(models.Maquinaria.id == maquinaria_id))
+        if existe.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Maquinaria no encontrada")
+        trabajo = purgas.iniciar(maquinaria_id)
+        await purgas.publicar(db, trabajo)
+    elif not await borrar_maquina(db, maquinaria_id):
         raise HTTPException(status_code=404, detail="Maquinaria no encontrada")
-  
-    await db.delete(maquina)
-    await db.commit()
-    return {"ok": True, "message": "Maquinaria eliminada correctamente"}
\ No newline at end of file
+    else:
+        await sincronizador.catalogo_cambiado(db)
+
+    ultimas.baja_maquina(maquinaria_id)
+    catalogo.baja(maquinaria_id)
+    motor.olvidar(maquinaria_id)
+    if asincrono:
+        return JSONResponse(status_code=202, content=trabajo)
+    return {"ok": True, "message": "Maquinaria eliminada correctamente"}
+
+@router.get("/purgas/{trabajo_id}")
+async def get_purga(trabajo_id: str, db: AsyncSession = Depends(get_db)):
+    """Avance de una purga asíncrona: total y borradas de lecturas, estado (de cualquier worker)"""
+    trabajo = await purgas.obtener(db, trabajo_id)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Purga no encontrada")
+    return trabajo
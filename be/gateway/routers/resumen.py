@@ -1,38 +1,52 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, text
+from sqlalchemy import select, func, case
 from ..db import get_db
 from .. import models, schemas
+
 router = APIRouter(prefix="/resumen", tags=["resumen"])
+
+def _estado_actual():
+    """
+    Estado de la última lectura de cada máquina. Subconsulta correlacionada
+    que resuelve ix_lecturas_maquinaria_ts con un solo acceso por máquina,
+    sin recorrer el histórico.
+    """
+    return (
+        select(models.Lectura.estado)
+        .where(models.Lectura.maquinaria_id == models.Maquinaria.id)
+        .order_by(models.Lectura.ts.desc())
+        .limit(1)
+        .correlate(models.Maquinaria)
+        .scalar_subquery()
+    )
+
+async def calcular_resumen(db: AsyncSession, tipo: Optional[str] = None) -> schemas.ResumenDTO:
+    """Conteos por estado y por tipo en una sola consulta (SQLite y PostgreSQL)"""
+    por_maquina = select(models.Maquinaria.tipo, _estado_actual().label("estado"))
+    if tipo:
+        por_maquina = por_maquina.where(models.Maquinaria.tipo == tipo)
+    pm = por_maquina.subquery()
+
+    def contar(estado: str):
+        return func.sum(case((pm.c.estado == estado, 1), else_=0))
+
+    result = await db.execute(
+        select(pm.c.tipo, func.count(), contar("OK"), contar("ALERTA"), contar("CRITICO"))
+        .group_by(pm.c.tipo)
+    )
+    filas = result.all()
+
+    return schemas.ResumenDTO(
+        total_maquinas=sum(f[1] for f in filas),
+        ok=sum(int(f[2] or 0) for f in filas),
+        alerta=sum(int(f[3] or 0) for f in filas),
+        critico=sum(int(f[4] or 0) for f in filas),
+        por_tipo={f[0]: f[1] for f in filas},
+    )
+
 @router.get("", response_model=schemas.ResumenDTO)
-async def resumen(db: AsyncSession = Depends(get_db)):
-# total maquinaria
-total_q = await db.execute(select(func.count(models.Maquinaria.id)))
-total_maquinas = total_q.scalar() or 0
-# última lectura por maquinaria para contar por estado
-q = text("""
-WITH latest AS (
-SELECT DISTINCT ON (maquinaria_id) maquinaria_id, estado
-FROM lecturas
-ORDER BY maquinaria_id, ts DESC
-)
-SELECT
-COALESCE(SUM(CASE WHEN estado = 'OK' THEN 1 ELSE 0 END),0) AS ok,
-COALESCE(SUM(CASE WHEN estado = 'ALERTA' THEN 1 ELSE 0 END),0) AS alerta,
-COALESCE(SUM(CASE WHEN estado = 'CRITICO' THEN 1 ELSE 0 END),0) AS critico
-FROM latest
-""")
-res = await db.execute(q)
-ok, alerta, critico =
-res.first() or (0, 0, 0)
-# por tipo
-pt = await db.execute(select(models.Maquinaria.tipo,
-func.count()).group_by(models.Maquinaria.tipo))
-por_tipo = {t: c for t, c in pt.all()}
-return schemas.ResumenDTO(
-total_maquinas=int(total_maquinas),
-ok=int(ok or 0),
-alerta=int(alerta or 0),
-critico=int(critico or 0),
-por_tipo=por_tipo
-)
\ No newline at end of file
+async def resumen(tipo: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    return await calcular_resumen(db, tipo)
@@ -1,50 +1,81 @@
 from datetime import datetime, timedelta, timezone
-import random
+import time
+import uuid
 
+import numpy as np
 from fastapi import APIRouter, HTTPException, Query, Path
-from sqlalchemy import select
+from sqlalchemy import select, insert
 
 from ..db import async_session
-from ..models import Maquinaria, Lectura
+from ..models import Maquinaria, gen_uuid
+from ..ingesta import insertar_lecturas, CHUNK_SIZE
+from ..estado import ESTADOS, evaluar_lote
+from ..ultimas import ultimas
+from ..catalogo import catalogo
+from ..prediccion import motor
+from ..rollups import compactador
+from ..sincronizacion import sincronizador
 
 router = APIRouter(prefix="/seed", tags=["Seed"])
 
-def clamp(val: float, lo: float, hi: float) -> float:
-    return max(lo, min(hi, val))
-
-def evaluar_estado(temperatura: float, vibracion: float, presion_aceite: float) -> tuple[str, str]:
-    """Evalúa el estado basado en umbrales"""
-    alertas = []
-    criticos = []
-    
-    # Vibración
-    if vibracion > 4.5:
-        criticos.append(f"Vibración crítica ({vibracion} mm/s)")
-    elif vibracion > 2.5:
-        alertas.append(f"Vibración elevada ({vibracion} mm/s)")
-    
-    # Temperatura
-    if temperatura > 120:
-        criticos.append(f"Temperatura crítica ({temperatura}°C)")
-    elif temperatura > 100:
-        alertas.append(f"Temperatura elevada ({temperatura}°C)")
-    elif temperatura < 80:
-        alertas.append(f"Temperatura baja ({temperatura}°C)")
-    
-    # Presión
-    if presion_aceite < 1.5:
-        criticos.append(f"Presión crítica ({presion_aceite} bar)")
-    elif presion_aceite < 2.5:
-        alertas.append(f"Presión baja ({presion_aceite} bar)")
-    elif presion_aceite > 5.5:
-        alertas.append(f"Presión alta ({presion_aceite} bar)")
-    
-    if criticos:
-        return "CRITICO", "; ".join(criticos)
-    elif alertas:
-        return "ALERTA", "; ".join(alertas)
-    else:
-        return "OK", None
+# Filas generadas, evaluadas e insertadas por bloque (memoria constante)
+SEED_CHUNK_ROWS = 20000
+
+async def _sembrar(
+    session,
+    maquinas: list,
+    start: datetime,
+    end: datetime,
+    every_minutes: int,
+    base_temp: float,
+    base_vib: float,
+    base_pres: float,
+    temp_noise: float,
+    vib_noise: float,
+    pres_noise: float,
+    chunk_rows: int = SEED_CHUNK_ROWS,
+) -> int:
+    """
+    Genera el histórico en bloques de pasos de tiempo × máquinas con NumPy,
+    evalúa el estado del bloque completo y lo inserta con INSERT multi-fila,
+    confirmando cada bloque. La memoria no depende del tamaño del histórico.
+
+    maquinas: lista de ids
+    """
+    paso = timedelta(minutes=every_minutes)
+    n_pasos = int((end - start) / paso) + 1
+    ids = list(maquinas)
+    n_maq = len(maquinas)
+    pasos_por_bloque = max(1, chunk_rows // n_maq)
+    rng = np.random.default_rng()
+
+    total = 0
+    for i0 in range(0, n_pasos, pasos_por_bloque):
+        forma = (min(pasos_por_bloque, n_pasos - i0), n_maq)
+        temp = np.round(np.clip(base_temp + rng.uniform(-temp_noise, temp_noise, forma), 60, 140), 1).ravel()
+        vib = np.round(np.clip(base_vib + rng.uniform(-vib_noise, vib_noise, forma), 0.2, 8.0), 1).ravel()
+        pres = np.round(np.clip(base_pres + rng.uniform(-pres_noise, pres_noise, forma), 0.5, 7.0), 1).ravel()
+
+        codigos, bits = evaluar_lote(temp, vib, pres)
+        tl, vl, pl = temp.tolist(), vib.tolist(), pres.tolist()
+        tss = [start + (i0 + k) * paso for k in range(forma[0])]
+
+        filas = [
+            {
+                "maquinaria_id": ids[j % n_maq],
+                "temperatura": tl[j],
+                "vibracion": vl[j],
+                "presion_aceite": pl[j],
+                "ts": tss[j // n_maq],
+                "estado": ESTADOS[codigo],
+                "motivo_bits": b,
+            }
+            for j, (codigo, b) in enumerate(zip(codigos.tolist(), bits.tolist()))
+        ]
+        await insertar_lecturas(session, filas, retornar=False)
+        await session.commit()
+        total += len(filas)
+    return total
 
 @router.post("/historico")
 async def seed_historico(
@@ -63,36 +94,21 @@ async def seed_historico(
     start = datetime.now(timezone.utc) - timedelta(days=days)
     end = datetime.now(timezone.utc)
 
-    total_inserted = 0
     async with async_session() as session:
-        maquinas = (await session.execute(select(Maquinaria))).scalars().all()
+        maquinas = (await session.execute(select(Maquinaria.id))).scalars().all()
         if not maquinas:
             raise HTTPException(status_code=400, detail="No hay maquinaria. Crea máquinas primero.")
 
-        t = start
-        while t <= end:
-            for m in maquinas:
-                temp = clamp(base_temp + random.uniform(-temp_noise, temp_noise), 60, 140)
-                vib = clamp(base_vib + random.uniform(-vib_noise, vib_noise), 0.2, 8.0)
-                pres = clamp(base_pres + random.uniform(-pres_noise, pres_noise), 0.5, 7.0)
-                
-                # Evaluar estado
-                estado, motivo = evaluar_estado(temp, vib, pres)
-
-                session.add(Lectura(
-                    maquinaria_id=m.id,
-                    numero_serie=m.numero_serie,
-                    temperatura=round(temp, 1),
-                    vibracion=round(vib, 1),
-                    presion_aceite=round(pres, 1),
-                    ts=t,
-                    estado=estado,
-                    motivo=motivo
-                ))
-                total_inserted += 1
-            t += timedelta(minutes=every_minutes)
-
-        await session.commit()
+        t0 = time.perf_counter()
+        total_inserted = await _sembrar(
+            session, maquinas, start, end, every_minutes,
+            base_temp, base_vib, base_pres, temp_noise, vib_noise, pres_noise,
+        )
+        seconds = time.perf_counter() - t0
+        # La última lectura de cada máquina es ahora la del último paso
+        await ultimas.cargar(session)
+        await motor.reconstruir(session)
+        compactador.marcar(start)
 
     return {
         "ok": True,
@@ -100,6 +116,8 @@ async def seed_historico(
         "machines": len(maquinas),
         "range": {"from": start.isoformat(), "to": end.isoformat()},
         "step_minutes": every_minutes,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(total_inserted / seconds) if seconds else None,
     }
 
 @router.post("/historico/maquina/{maquinaria_id}")
@@ -119,47 +137,25 @@ async def seed_historico_maquina(
     """
     start = datetime.now(timezone.utc) - timedelta(days=days)
     end = datetime.now(timezone.utc)
-    total_inserted = 0
 
     async with async_session() as session:
         # obtener la máquina
-        result = await session.execute(select(Maquinaria).where(Maquinaria.id == maquinaria_id))
+        result = await session.execute(
+            select(Maquinaria.id).where(Maquinaria.id == maquinaria_id)
+        )
         maquina = result.scalar_one_or_none()
         if not maquina:
             raise HTTPException(status_code=404, detail="Maquinaria no encontrada")
 
-        t = start
-        # Commit periódicos para no consumir demasiada memoria si hay muchas filas
-        batch = 0
-        while t <= end:
-            temp = clamp(base_temp + random.uniform(-temp_noise, temp_noise), 60, 140)
-            vib = clamp(base_vib + random.uniform(-vib_noise, vib_noise), 0.2, 8.0)
-            pres = clamp(base_pres + random.uniform(-pres_noise, pres_noise), 0.5, 7.0)
-
-            estado, motivo = evaluar_estado(temp, vib, pres)
-
-            session.add(Lectura(
-                maquinaria_id=maquina.id,
-                numero_serie=maquina.numero_serie,
-                temperatura=round(temp, 1),
-                vibracion=round(vib, 1),
-                presion_aceite=round(pres, 1),
-                ts=t,
-                estado=estado,
-                motivo=motivo
-            ))
-            total_inserted += 1
-            batch += 1
-
-            t += timedelta(minutes=every_minutes)
-
-            # Hacemos commit cada 200 inserciones para evitar uso excesivo de memoria
-            if batch >= 200:
-                await session.commit()
-                batch = 0
-
-        # commit final
-        await session.commit()
+        t0 = time.perf_counter()
+        total_inserted = await _sembrar(
+            session, [maquina], start, end, every_minutes,
+            base_temp, base_vib, base_pres, temp_noise, vib_noise, pres_noise,
+        )
+        seconds = time.perf_counter() - t0
+        await ultimas.cargar(session)
+        await motor.reconstruir(session)
+        compactador.marcar(start)
 
     return {
         "ok": True,
@@ -167,4 +163,36 @@ async def seed_historico_maquina(
         "machine_id": maquinaria_id,
         "range": {"from": start.isoformat(), "to": end.isoformat()},
         "step_minutes": every_minutes,
-    }
\ No newline at end of file
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(total_inserted / seconds) if seconds else None,
+    }
+
+@router.post("/maquinaria")
+async def seed_maquinaria(
+    cantidad: int = Query(100, ge=1, le=100000, description="Máquinas virtuales a crear"),
+    tipo: str = Query("SIM", description="Tipo asignado a las máquinas creadas"),
+):
+    """
+    Crea máquinas virtuales en bloque, p. ej. para pruebas de carga con el simulador.
+    """
+    filas = [
+        {
+            "id": gen_uuid(),
+            "nombre": f"{tipo} {i + 1}",
+            "tipo": tipo,
+            "numero_serie": f"{tipo}-{uuid.uuid4().hex[:12].upper()}",
+        }
+        for i in range(cantidad)
+    ]
+    t0 = time.perf_counter()
+    async with async_session() as session:
+        for i in range(0, len(filas), CHUNK_SIZE):
+            await session.execute(insert(Maquinaria.__table__), filas[i:i + CHUNK_SIZE])
+        await session.commit()
+        # Una recarga en lugar de un alta por máquina (cada alta reordena el catálogo)
+        await catalogo.cargar(session)
+        await sincronizador.catalogo_cambiado(session)
+    for f in filas:
+        ultimas.alta_maquina(f["id"], tipo)
+
+    return {"ok": True, "inserted": cantidad, "tipo": tipo, "seconds": round(time.perf_counter() - t0, 3)}
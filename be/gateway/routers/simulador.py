@@ -1,108 +1,306 @@
 import asyncio
-import random
-from datetime import datetime, timezone
-from typing import Optional
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
 from sqlalchemy import select
 
 from ..db import async_session
-from ..models import Maquinaria, Lectura
+from ..coordinacion import Trabajo, coordinador
+from ..models import Maquinaria
+from ..ingesta import guardar_lecturas
+from ..estado import ESTADOS, UMBRALES, evaluar_lote
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/sim", tags=["Simulador"])
 
-_task: Optional[asyncio.Task] = None
-_interval_seconds: int = 10
-
-def evaluar_estado(temperatura: float, vibracion: float, presion_aceite: float) -> tuple[str, str]:
-    alertas = []
-    criticos = []
-    
-    if vibracion > 4.5:
-        criticos.append(f"Vibración crítica ({vibracion} mm/s)")
-    elif vibracion > 2.5:
-        alertas.append(f"Vibración elevada ({vibracion} mm/s)")
-    
-    if temperatura > 120:
-        criticos.append(f"Temperatura crítica ({temperatura}°C)")
-    elif temperatura > 100:
-        alertas.append(f"Temperatura elevada ({temperatura}°C)")
-    elif temperatura < 80:
-        alertas.append(f"Temperatura baja ({temperatura}°C)")
-    
-    if presion_aceite < 150:
-        criticos.append(f"Presión crítica ({presion_aceite} bar)")
-    elif presion_aceite < 200:
-        alertas.append(f"Presión baja ({presion_aceite} bar)")
-    elif presion_aceite > 350:
-        alertas.append(f"Presión alta ({presion_aceite} bar)")
-    
-    if criticos:
-        return "CRITICO", "; ".join(criticos)
-    elif alertas:
-        return "ALERTA", "; ".join(alertas)
-    else:
-        return "OK", None
-
-async def _tick_once():
-    async with async_session() as session:
-        maquinas = (await session.execute(select(Maquinaria))).scalars().all()
-        if not maquinas:
-            return
+# Cada intervalo se reparte en slots de aprox. esta duración; cada máquina
+# escribe en un solo slot, así la carga se distribuye en lugar de en ráfagas
+SLOT_SEGUNDOS = 0.2
+# Cada cuánto se vuelve a leer la lista de máquinas
+REFRESCO_SEGUNDOS = 30.0
+# Ventana para calcular filas/s y percentiles de retraso
+VENTANA_SEGUNDOS = 10.0
+
+PERFILES = ("aleatorio", "deriva", "fallas")
+
+# Valores de operación normal (OK) de los perfiles deriva y fallas
+NOMINAL = np.array([90.0, 1.5, 3.5])
+RUIDO = np.array([2.0, 0.15, 0.1])
+# Desplazamiento por lectura de la deriva (máximo por máquina) y durante una falla
+DERIVA_MAX = np.array([0.3, 0.03, -0.015])
+FALLA = np.array([35.0, 3.5, -2.3])
+LIMITES = (np.array([20.0, 0.0, 0.0]), np.array([150.0, 10.0, 8.0]))
+
+
+class Generador:
+    """
+    Valores de temperatura, vibración y presión por perfil. El estado de cada
+    máquina vive en arrays NumPy alineados con la lista de ids.
+
+    - aleatorio: uniforme en rangos amplios (comportamiento original)
+    - deriva: desgaste gradual hasta el umbral crítico y vuelta a nominal
+    - fallas: operación normal con episodios de falla de una métrica
+    """
+
+    def __init__(self, perfil: str, prob_falla: float, rng: np.random.Generator):
+        self.perfil = perfil
+        self.prob_falla = prob_falla
+        self.rng = rng
+        self.ids: List[str] = []
+        self.valor = np.empty((0, 3))
+        self.deriva = np.empty((0, 3))
+        self.falla_restante = np.empty(0, dtype=np.int32)
+        self.falla_metrica = np.empty(0, dtype=np.int32)
+
+    def redimensionar(self, ids: List[str]):
+        """Conserva el estado de las máquinas que siguen y crea el de las nuevas"""
+        previo = {m: i for i, m in enumerate(self.ids)}
+        n = len(ids)
+        valor = NOMINAL + self.rng.normal(0, 1, (n, 3)) * RUIDO
+        deriva = self.rng.uniform(0, 1, (n, 3)) * DERIVA_MAX
+        falla_restante = np.zeros(n, dtype=np.int32)
+        falla_metrica = np.zeros(n, dtype=np.int32)
+        for j, m in enumerate(ids):
+            i = previo.get(m)
+            if i is not None:
+                valor[j], deriva[j] = self.valor[i], self.deriva[i]
+                falla_restante[j], falla_metrica[j] = self.falla_restante[i], self.falla_metrica[i]
+        self.ids = list(ids)
+        self.valor, self.deriva = valor, deriva
+        self.falla_restante, self.falla_metrica = falla_restante, falla_metrica
 
-        now = datetime.now(timezone.utc)
-        for m in maquinas:
-            temperatura = round(random.uniform(70, 110), 1)
-            vibracion = round(random.uniform(1.0, 5.0), 1)
-            presion_aceite = round(random.uniform(200, 350), 1)
-            
-            estado, motivo = evaluar_estado(temperatura, vibracion, presion_aceite)
-
-            lectura = Lectura(
-                maquinaria_id=m.id,
-                numero_serie=m.numero_serie,
-                temperatura=temperatura,
-                vibracion=vibracion,
-                presion_aceite=presion_aceite,
-                ts=now,
-                estado=estado,
-                motivo=motivo
+    def generar(self, idx: np.ndarray) -> np.ndarray:
+        """Siguiente lectura (len(idx) × 3) de las máquinas idx"""
+        k = len(idx)
+        if self.perfil == "aleatorio":
+            return np.round(self.rng.uniform((70.0, 1.0, 1.5), (110.0, 5.0, 6.0), (k, 3)), 1)
+
+        ruido = self.rng.normal(0, 1, (k, 3)) * RUIDO
+        if self.perfil == "deriva":
+            v = self.valor[idx] + self.deriva[idx] + ruido * 0.5
+            # Tras una lectura crítica se simula el mantenimiento: vuelve a nominal
+            critico = (
+                (v[:, 0] > UMBRALES["temperatura"]["critico_alto"])
+                | (v[:, 1] > UMBRALES["vibracion"]["critico_alto"])
+                | (v[:, 2] < UMBRALES["presion_aceite"]["critico_bajo"])
             )
-            session.add(lectura)
-        await session.commit()
+            self.valor[idx] = np.where(critico[:, None], NOMINAL, v)
+            return np.round(np.clip(v, *LIMITES), 1)
+
+        # fallas
+        restante = self.falla_restante[idx]
+        nuevas = (restante == 0) & (self.rng.random(k) < self.prob_falla)
+        restante[nuevas] = self.rng.integers(3, 20, nuevas.sum())
+        self.falla_metrica[idx[nuevas]] = self.rng.integers(0, 3, nuevas.sum())
+        v = NOMINAL + ruido
+        en_falla = restante > 0
+        afectadas = np.nonzero(en_falla)[0]
+        metrica = self.falla_metrica[idx[afectadas]]
+        v[afectadas, metrica] += FALLA[metrica]
+        restante[en_falla] -= 1
+        self.falla_restante[idx] = restante
+        return np.round(np.clip(v, *LIMITES), 1)
+
+
+class Simulador(Trabajo):
+    """Corre en el worker líder; /sim/start y /sim/stop lo piden por coordinacion"""
+
+    nombre = "simulador"
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.interval_seconds = 10.0
+        self.perfil = "aleatorio"
+        self.prob_falla = 0.01
+        self._reiniciar_metricas()
+
+    def _reiniciar_metricas(self):
+        self.maquinas = 0
+        self.slots = 0
+        self.filas = 0
+        self.errores = 0
+        self.ultimo_error: Optional[str] = None
+        self.slots_saltados = 0
+        self.lag_max = 0.0
+        self.iniciado: Optional[float] = None
+        self._escrituras: deque = deque()  # (monotonic, filas)
+        self._lags: deque = deque(maxlen=2000)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _cargar_maquinas(self):
+        async with async_session() as session:
+            return (await session.execute(select(Maquinaria.id))).scalars().all()
 
-async def _runner():
-    global _interval_seconds
-    while True:
+    async def _escribir(self, gen: Generador, idx: np.ndarray):
+        valores = gen.generar(idx)
+        t, v, p = valores[:, 0], valores[:, 1], valores[:, 2]
+        codigos, bits = evaluar_lote(t, v, p)
+        tl, vl, pl = t.tolist(), v.tolist(), p.tolist()
+        ahora = datetime.utcnow()
+        filas = [
+            {
+                "maquinaria_id": gen.ids[i],
+                "temperatura": tl[j],
+                "vibracion": vl[j],
+                "presion_aceite": pl[j],
+                "ts": ahora,
+                "estado": ESTADOS[codigo],
+                "motivo_bits": b,
+            }
+            for j, (i, codigo, b) in enumerate(zip(idx.tolist(), codigos.tolist(), bits.tolist()))
+        ]
+        async with async_session() as session:
+            await guardar_lecturas(session, filas)
+        self.filas += len(filas)
+        self._escrituras.append((time.monotonic(), len(filas)))
+
+    async def _runner(self):
+        loop = asyncio.get_running_loop()
+        rng = np.random.default_rng()
+        gen = Generador(self.perfil, self.prob_falla, rng)
+        shards: List[np.ndarray] = []
+        paso = self.interval_seconds
+        inicio = loop.time()
+        k = 0
+        refrescado = None
+
+        while True:
+            # Al cerrar cada ciclo se relee la lista de máquinas si corresponde
+            if k % max(1, len(shards)) == 0 and (
+                refrescado is None or not self.maquinas or loop.time() - refrescado > REFRESCO_SEGUNDOS
+            ):
+                try:
+                    maquinas = await self._cargar_maquinas()
+                except Exception as e:
+                    self._error(e)
+                    maquinas = list(gen.ids)
+                refrescado = loop.time()
+                gen.redimensionar(maquinas)
+                n = len(maquinas)
+                self.maquinas = n
+                self.slots = max(1, min(n, round(self.interval_seconds / SLOT_SEGUNDOS))) if n else 1
+                # Asignación aleatoria de máquinas a slots (jitter entre máquinas)
+                shards = np.array_split(rng.permutation(n), self.slots) if n else [np.empty(0, dtype=int)]
+                inicio, k = inicio + k * paso, 0
+                paso = self.interval_seconds / self.slots
+
+            programado = inicio + k * paso
+            espera = programado - loop.time()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            lag = loop.time() - programado
+            self._lags.append(lag)
+            self.lag_max = max(self.lag_max, lag)
+            if lag > self.interval_seconds:
+                # Atrasado más de un ciclo: se descartan los slots perdidos
+                saltar = int(lag // paso)
+                self.slots_saltados += saltar
+                k += saltar
+                continue
+
+            idx = shards[k % len(shards)]
+            if len(idx):
+                try:
+                    await self._escribir(gen, idx)
+                except Exception as e:
+                    self._error(e)
+            k += 1
+
+    def _error(self, e: Exception):
+        self.errores += 1
+        self.ultimo_error = f"{type(e).__name__}: {e}"
+        logger.exception("Error en el simulador")
+
+    def iniciar(self, interval_seconds: float, perfil: str, prob_falla: float):
+        self.interval_seconds = interval_seconds
+        self.perfil = perfil
+        self.prob_falla = prob_falla
+        self._reiniciar_metricas()
+        self.iniciado = time.monotonic()
+        self._task = asyncio.create_task(self._runner())
+
+    async def detener(self) -> bool:
+        if not self.running:
+            return False
+        self._task.cancel()
         try:
-            await _tick_once()
-        except Exception as e:
-            print(f"[sim] error: {e}")
-        await asyncio.sleep(_interval_seconds)
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        return True
+
+    async def aplicar(self, deseado: Optional[dict]):
+        pedido = deseado or {}
+        if not pedido.get("running"):
+            await self.detener()
+            return
+        config = (pedido["interval_seconds"], pedido["perfil"], pedido["prob_falla"])
+        if self.running and config == (self.interval_seconds, self.perfil, self.prob_falla):
+            return
+        await self.detener()
+        self.iniciar(*config)
+
+    def estado(self) -> dict:
+        ahora = time.monotonic()
+        while self._escrituras and self._escrituras[0][0] < ahora - VENTANA_SEGUNDOS:
+            self._escrituras.popleft()
+        ventana = min(VENTANA_SEGUNDOS, ahora - self.iniciado) if self.iniciado else 0
+        lags = sorted(self._lags)
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval_seconds,
+            "perfil": self.perfil,
+            "maquinas": self.maquinas,
+            "slots": self.slots,
+            "filas": self.filas,
+            "rows_per_sec": round(sum(n for _, n in self._escrituras) / ventana, 1) if ventana else 0.0,
+            "lag_ms": {
+                "p50": round(lags[len(lags) // 2] * 1000, 2) if lags else None,
+                "p95": round(lags[int(len(lags) * 0.95)] * 1000, 2) if lags else None,
+                "max": round(self.lag_max * 1000, 2),
+            },
+            "slots_saltados": self.slots_saltados,
+            "errores": self.errores,
+            "ultimo_error": self.ultimo_error,
+        }
+
+
+_simulador = Simulador()
+coordinador.registrar(_simulador)
 
 @router.post("/start")
-async def start_sim(interval_seconds: int = 10):
-    global _task, _interval_seconds
-    if _task and not _task.done():
+async def start_sim(
+    interval_seconds: float = Query(10, ge=0.1, le=3600, description="Segundos entre lecturas de cada máquina"),
+    perfil: str = Query("aleatorio", description="aleatorio, deriva o fallas"),
+    prob_falla: float = Query(0.01, ge=0, le=1, description="Probabilidad por lectura de iniciar una falla (perfil fallas)"),
+):
+    """Lo arranca el worker líder (enseguida si es este, si no en su próximo latido)"""
+    if ((await coordinador.deseado(_simulador.nombre)) or {}).get("running"):
         raise HTTPException(status_code=400, detail="Simulador ya está en ejecución")
-    _interval_seconds = max(2, interval_seconds)
-    _task = asyncio.create_task(_runner())
-    return {"ok": True, "interval_seconds": _interval_seconds}
+    if perfil not in PERFILES:
+        raise HTTPException(status_code=400, detail=f"perfil debe ser uno de {', '.join(PERFILES)}")
+    await coordinador.pedir(_simulador.nombre, {
+        "running": True, "interval_seconds": interval_seconds, "perfil": perfil, "prob_falla": prob_falla,
+    })
+    return {"ok": True, "interval_seconds": interval_seconds, "perfil": perfil}
 
 @router.post("/stop")
 async def stop_sim():
-    global _task
-    if _task and not _task.done():
-        _task.cancel()
-        try:
-            await _task
-        except asyncio.CancelledError:
-            pass
-        _task = None
-        return {"ok": True, "stopped": True}
-    return {"ok": True, "stopped": False}
+    pedido = (await coordinador.deseado(_simulador.nombre)) or {}
+    await coordinador.pedir(_simulador.nombre, {**pedido, "running": False})
+    return {"ok": True, "stopped": bool(pedido.get("running"))}
 
 @router.get("/status")
 async def status_sim():
-    running = _task is not None and not _task.done()
-    return {"running": running, "interval_seconds": _interval_seconds}
\ No newline at end of file
+    """Estado del simulador en el líder; `worker` indica qué proceso lo corre"""
+    return await coordinador.estado(_simulador.nombre)
@@ -28,6 +28,7 @@ class MaquinaOut(BaseModel):
 
 class LecturaIn(BaseModel):
     maquinaria_id: str
+    # Aceptado por compatibilidad; la serie se toma siempre de la máquina
     numero_serie: Optional[str] = None
     temperatura: Optional[float] = None
     vibracion: Optional[float] = None
@@ -49,6 +50,43 @@ class LecturaDB(LecturaOut):
     class Config:
         from_attributes = True
 
+class LecturaBucket(BaseModel):
+    ts: datetime
+    n: int
+    temperatura_min: Optional[float] = None
+    temperatura_avg: Optional[float] = None
+    temperatura_max: Optional[float] = None
+    vibracion_min: Optional[float] = None
+    vibracion_avg: Optional[float] = None
+    vibracion_max: Optional[float] = None
+    presion_aceite_min: Optional[float] = None
+    presion_aceite_avg: Optional[float] = None
+    presion_aceite_max: Optional[float] = None
+    # Solo cuando se leen los agregados
+    minutos_ok: Optional[float] = None
+    minutos_alerta: Optional[float] = None
+    minutos_critico: Optional[float] = None
+
+class LecturaHistoryPage(BaseModel):
+    items: List[LecturaDB] = []
+    buckets: List[LecturaBucket] = []
+    next_cursor: Optional[str] = None
+    fuente: str = "lecturas"
+
+class SerieMaquina(BaseModel):
+    """Lecturas de una máquina en columnas (listas alineadas), en orden cronológico"""
+    numero_serie: Optional[str] = None
+    id: List[int] = []
+    ts: List[datetime] = []
+    temperatura: List[Optional[float]] = []
+    vibracion: List[Optional[float]] = []
+    presion_aceite: List[Optional[float]] = []
+    estado: List[Optional[str]] = []
+    motivo: List[Optional[str]] = []
+
+class LecturasPorMaquina(BaseModel):
+    maquinas: Dict[str, SerieMaquina] = {}
+
 class LecturaBatchIn(BaseModel):
     lecturas: List[LecturaIn]
 
@@ -57,4 +95,22 @@ class ResumenDTO(BaseModel):
     ok: int
     alerta: int
     critico: int
-    por_tipo: Dict[str, int]
\ No newline at end of file
+    por_tipo: Dict[str, int]
+class UmbralPronostico(BaseModel):
+    valor: float
+    horas: Optional[float] = None
+    ts: Optional[datetime] = None
+
+class PrediccionDTO(BaseModel):
+    maquinaria_id: str
+    metric: str
+    n: int
+    ultimo_ts: datetime
+    ultimo_valor: float
+    ewma: float
+    desviacion: float
+    pendiente_por_hora: float
+    nivel: float
+    zscore: float
+    anomalia: bool
+    umbrales: Dict[str, UmbralPronostico]
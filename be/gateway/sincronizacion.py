@@ -0,0 +1,191 @@
+# be/gateway/sincronizacion.py
+"""
+Estados en memoria con varios workers (SINCRONIZAR_WORKERS=true).
+
+Cada worker tiene su copia de la última lectura por máquina (ultimas), del
+motor de predicción y de los suscriptores SSE, y las rutas de escritura solo
+actualizan la del worker que recibió la request. Con la sincronización
+activa, cada worker lee cada SINCRONIZACION_SEGUNDOS las lecturas
+confirmadas por los demás (id mayor que la última vista) y las aplica como
+las propias: /lecturas/latest y /predict ven lo que escribe cualquier
+worker, incluido el simulador del líder. Los eventos de /lecturas/stream
+salen solo de aquí, para todas las lecturas en orden de id, de modo que
+todos los workers emiten la misma secuencia (con hasta
+SINCRONIZACION_SEGUNDOS de demora).
+
+Los ids se asignan al insertar pero se ven al confirmar, así que pueden
+aparecer fuera de orden (PostgreSQL): los ids salteados se vuelven a buscar
+durante HUECO_SEGUNDOS. Las altas, ediciones y bajas de máquinas se avisan
+en la fila "catalogo" de la tabla tareas y cada worker recarga su catálogo
+al verlo cambiar.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .catalogo import catalogo
+from .config import settings
+from .eventos import broker
+from .prediccion import motor
+from .ultimas import UltimasLecturas, ultimas
+
+logger = logging.getLogger(__name__)
+
+# Lecturas por consulta; se repite mientras haya más
+LOTE = 5000
+# Segundos que se espera a un id salteado (transacción más lenta o revertida)
+HUECO_SEGUNDOS = 30.0
+# Saltos más grandes no se siguen uno a uno (p. ej. una carga masiva revertida)
+MAX_HUECOS = 10000
+# Fila de tareas cuyo `actualizado` cambia con cada alta, edición o baja de máquinas
+CATALOGO = "catalogo"
+
+
+class Sincronizador:
+    def __init__(self):
+        self._hasta: Optional[int] = None
+        # id -> vencimiento (time.monotonic) de los ids salteados
+        self._huecos: Dict[int, float] = {}
+        # Ids que este worker ya aplicó y todavía no leyó de la BD
+        self._propias: set = set()
+        # Última lectura publicada por máquina (para los eventos SSE)
+        self._publicadas = UltimasLecturas()
+        self._version_catalogo: Optional[int] = None
+        self._aviso_catalogo: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self.aplicadas = 0
+
+    @property
+    def activo(self) -> bool:
+        return self._task is not None
+
+    async def preparar(self, db: AsyncSession):
+        """Punto de partida; antes de cargar ultimas, el catálogo y el motor para no perder cambios"""
+        self._hasta = (await db.execute(select(func.max(models.Lectura.id)))).scalar() or 0
+        self._huecos = {}
+        self._propias = set()
+        self._aviso_catalogo = await self._leer_aviso(db)
+
+    async def _leer_aviso(self, db: AsyncSession) -> Optional[datetime]:
+        T = models.Tarea
+        return (await db.execute(select(T.actualizado).where(T.nombre == CATALOGO))).scalar()
+
+    async def catalogo_cambiado(self, db: AsyncSession):
+        """Después del commit de un alta, edición o baja: los demás workers recargan su catálogo"""
+        if not self.activo:
+            return
+        T = models.Tarea
+        actualizar = update(T.__table__).where(T.nombre == CATALOGO).values(actualizado=datetime.utcnow())
+        try:
+            if (await db.execute(actualizar)).rowcount == 0:
+                await db.execute(insert(T.__table__).values(nombre=CATALOGO, actualizado=datetime.utcnow()))
+            await db.commit()
+        except IntegrityError:
+            # Otro worker creó la fila a la vez
+            await db.rollback()
+            await db.execute(actualizar)
+            await db.commit()
+
+    def propias(self, filas: Iterable[dict]):
+        """Lecturas que este worker ya aplicó a sus estados"""
+        if self.activo:
+            self._propias.update(f["id"] for f in filas)
+
+    def _anotar_huecos(self, desde: int, hasta: int, vence: float):
+        if hasta - desde <= MAX_HUECOS:
+            for i in range(desde, hasta):
+                self._huecos.setdefault(i, vence)
+
+    async def ciclo(self, db: AsyncSession) -> int:
+        """Lee y aplica las lecturas nuevas de otros workers; retorna cuántas"""
+        if self._hasta is None:
+            await self.preparar(db)
+        await self._sincronizar_maquinas(db)
+        L = models.Lectura
+        total = 0
+        while True:
+            ahora = time.monotonic()
+            self._huecos = {i: v for i, v in self._huecos.items() if v > ahora}
+            condicion = L.id > self._hasta
+            if self._huecos:
+                condicion = or_(condicion, L.id.in_(list(self._huecos)))
+            filas = (await db.execute(
+                select(*models.lectura_columnas()).where(condicion).order_by(L.id).limit(LOTE)
+            )).mappings().all()
+
+            filas = [dict(f) for f in filas]
+            ajenas: List[dict] = []
+            for f in filas:
+                i = f["id"]
+                if i > self._hasta:
+                    self._anotar_huecos(self._hasta + 1, i, ahora + HUECO_SEGUNDOS)
+                    self._hasta = i
+                else:
+                    self._huecos.pop(i, None)
+                if i in self._propias:
+                    self._propias.discard(i)
+                else:
+                    ajenas.append(f)
+            if ajenas:
+                motor.actualizar(ajenas)
+                ultimas.registrar(ajenas)
+                total += len(ajenas)
+            broker.publicar_lecturas(self._publicadas.registrar(filas))
+            if len(filas) < LOTE:
+                break
+        # Las propias ya vistas o salteadas del todo no van a volver
+        self._propias = {i for i in self._propias if i > self._hasta or i in self._huecos}
+        self.aplicadas += total
+        return total
+
+    async def _sincronizar_maquinas(self, db: AsyncSession):
+        """Recarga el catálogo si otro worker avisó cambios y ajusta las máquinas de ultimas"""
+        aviso = await self._leer_aviso(db)
+        if aviso != self._aviso_catalogo:
+            self._aviso_catalogo = aviso
+            await catalogo.cargar(db)
+        else:
+            await catalogo.asegurar(db)
+        if catalogo.version == self._version_catalogo:
+            return
+        self._version_catalogo = catalogo.version
+        for maquinaria_id in ultimas.sincronizar_maquinas(catalogo.tipos()):
+            motor.olvidar(maquinaria_id)
+            self._publicadas.baja_maquina(maquinaria_id)
+
+    async def _loop(self):
+        from .db import async_session
+        while True:
+            await asyncio.sleep(settings.sincronizacion_segundos)
+            try:
+                async with async_session() as db:
+                    await self.ciclo(db)
+            except Exception:
+                logger.exception("Error sincronizando lecturas de otros workers")
+
+    def iniciar(self):
+        """Después de preparar() y de cargar ultimas"""
+        if self._task is None or self._task.done():
+            self._publicadas = UltimasLecturas()
+            self._publicadas.registrar(ultimas.latest(), presentadas=True)
+            self._task = asyncio.create_task(self._loop())
+
+    async def detener(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Instancia única del proceso
+sincronizador = Sincronizador()
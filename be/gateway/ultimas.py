@@ -0,0 +1,153 @@
+# be/gateway/ultimas.py
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .catalogo import catalogo
+from .presentacion import lectura_api
+
+
+def _ts_naive(ts: Optional[datetime]) -> Optional[datetime]:
+    # La columna ts es DateTime sin zona: se guarda igual que la devolvería la BD
+    if ts is not None and ts.tzinfo is not None:
+        return ts.replace(tzinfo=None)
+    return ts
+
+
+class UltimasLecturas:
+    """
+    Última lectura por máquina mantenida en memoria del proceso.
+
+    Se carga una vez desde la BD y luego la actualizan las rutas de escritura
+    (después de su commit). Los conteos de ResumenDTO se llevan como contadores.
+    """
+
+    def __init__(self):
+        self._por_maquina: Dict[str, dict] = {}
+        self._tipos: Dict[str, str] = {}
+        self._por_estado: Counter = Counter()
+        self._por_tipo: Counter = Counter()
+        self._lock = asyncio.Lock()
+        self.cargado = False
+
+    async def cargar(self, db: AsyncSession):
+        """Carga máquinas y última lectura por máquina desde la BD"""
+        subq = (
+            select(
+                models.Lectura.maquinaria_id,
+                func.max(models.Lectura.ts).label("max_ts")
+            )
+            .group_by(models.Lectura.maquinaria_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(*models.lectura_columnas())
+            .join(
+                subq,
+                (models.Lectura.maquinaria_id == subq.c.maquinaria_id) &
+                (models.Lectura.ts == subq.c.max_ts)
+            )
+        )
+        filas = [dict(r) for r in result.mappings()]
+        # El número de serie de cada lectura sale del catálogo
+        await catalogo.asegurar(db)
+        maquinas = (await db.execute(
+            select(models.Maquinaria.id, models.Maquinaria.tipo)
+        )).tuples().all()
+
+        self._tipos = {}
+        self._por_tipo = Counter()
+        for maquinaria_id, tipo in maquinas:
+            self.alta_maquina(maquinaria_id, tipo)
+        # Conserva lecturas registradas mientras se cargaba si son más nuevas
+        previas = [l for l in self._por_maquina.values() if l["maquinaria_id"] in self._tipos]
+        self._por_maquina = {}
+        self._por_estado = Counter()
+        self.registrar(filas)
+        self.registrar(previas, presentadas=True)
+        self.cargado = True
+
+    async def asegurar(self, db: AsyncSession):
+        """Carga perezosa para procesos que no pasaron por el startup"""
+        if self.cargado:
+            return
+        async with self._lock:
+            if not self.cargado:
+                await self.cargar(db)
+
+    def registrar(self, filas: Iterable[dict], presentadas: bool = False) -> List[tuple]:
+        """
+        Aplica lecturas ya confirmadas en la BD (columnas de
+        models.LECTURA_COLUMNAS, con id); con presentadas=True ya tienen los
+        campos de LecturaDB.
+
+        Retorna (previa, nueva) por cada lectura que pasó a ser la última de
+        su máquina; previa es None si la máquina no tenía lecturas.
+        """
+        cambios = []
+        for fila in filas:
+            maquinaria_id = fila["maquinaria_id"]
+            ts = _ts_naive(fila.get("ts"))
+            previa = self._por_maquina.get(maquinaria_id)
+            if previa is not None and previa["ts"] is not None and (ts is None or ts < previa["ts"]):
+                continue
+            nueva = dict(fila) if presentadas else lectura_api(fila)
+            nueva["ts"] = ts
+            if previa is not None:
+                self._por_estado[previa["estado"]] -= 1
+            self._por_estado[nueva["estado"]] += 1
+            self._por_maquina[maquinaria_id] = nueva
+            cambios.append((previa, nueva))
+        return cambios
+
+    def alta_maquina(self, maquinaria_id: str, tipo: str):
+        """Registra una máquina nueva o un cambio de tipo"""
+        anterior = self._tipos.get(maquinaria_id)
+        if anterior is not None:
+            self._por_tipo[anterior] -= 1
+            if not self._por_tipo[anterior]:
+                del self._por_tipo[anterior]
+        self._tipos[maquinaria_id] = tipo
+        self._por_tipo[tipo] += 1
+
+    def baja_maquina(self, maquinaria_id: str):
+        """Quita una máquina eliminada junto con su última lectura"""
+        tipo = self._tipos.pop(maquinaria_id, None)
+        if tipo is not None:
+            self._por_tipo[tipo] -= 1
+            if not self._por_tipo[tipo]:
+                del self._por_tipo[tipo]
+        previa = self._por_maquina.pop(maquinaria_id, None)
+        if previa is not None:
+            self._por_estado[previa["estado"]] -= 1
+
+    def sincronizar_maquinas(self, tipos: Dict[str, str]) -> List[str]:
+        """Ajusta las máquinas a {maquinaria_id: tipo}; retorna las dadas de baja"""
+        bajas = [m for m in self._tipos if m not in tipos]
+        for maquinaria_id in bajas:
+            self.baja_maquina(maquinaria_id)
+        for maquinaria_id, tipo in tipos.items():
+            if self._tipos.get(maquinaria_id) != tipo:
+                self.alta_maquina(maquinaria_id, tipo)
+        return bajas
+
+    def latest(self) -> List[dict]:
+        return list(self._por_maquina.values())
+
+    def resumen(self) -> dict:
+        return {
+            "total_maquinas": len(self._tipos),
+            "ok": self._por_estado["OK"],
+            "alerta": self._por_estado["ALERTA"],
+            "critico": self._por_estado["CRITICO"],
+            "por_tipo": dict(self._por_tipo),
+        }
+
+
+# Instancia única del proceso
+ultimas = UltimasLecturas()
@@ -0,0 +1,67 @@
+# be/tests/conftest.py
+"""
+Fixtures de las pruebas (ejecutar desde be/ con `python -m pytest`).
+
+Cada prueba usa una base SQLite nueva y un cliente httpx sobre la app ASGI,
+sin los eventos de arranque: las tareas de fondo no corren salvo que la
+prueba las llame.
+"""
+import uuid
+
+import httpx
+import pytest
+
+from gateway.catalogo import catalogo
+from gateway.config import settings
+from gateway.db import Base, async_session, crear_engine
+from gateway.main import app
+from gateway.retencion import retencion
+from gateway.rollups import compactador
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    cfg = settings.model_copy(update={"database_url": f"sqlite+aiosqlite:///{tmp_path / 'test.db'}"})
+    engine = crear_engine(cfg)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async_session.configure(bind=engine)
+    # Estado en memoria del proceso que dejan otras pruebas
+    catalogo.cargado_en = None
+    retencion.meses = set()
+    compactador.__init__()
+    try:
+        yield engine
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture
+async def cliente(engine):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http
+
+
+async def crear_maquina(cliente: httpx.AsyncClient) -> str:
+    r = await cliente.post("/maquinaria", json={
+        "nombre": "Prueba", "tipo": "PRUEBA", "numero_serie": f"T-{uuid.uuid4().hex[:12]}",
+    })
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+async def cargar_lecturas(cliente: httpx.AsyncClient, maquinaria_id: str, tss) -> int:
+    lecturas = [
+        {"maquinaria_id": maquinaria_id, "temperatura": 80.0, "vibracion": 1.0, "presion_aceite": 3.5,
+         "ts": ts.isoformat()}
+        for ts in tss
+    ]
+    r = await cliente.post("/lecturas/batch", json={"lecturas": lecturas})
+    assert r.status_code == 200, r.text
+    return r.json()["inserted"]
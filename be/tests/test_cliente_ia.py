@@ -0,0 +1,66 @@
+# be/tests/test_cliente_ia.py
+import asyncio
+
+import httpx
+import pytest
+
+from gateway.cliente_ia import CircuitoAbierto, ClienteIA
+from gateway.config import settings
+
+pytestmark = pytest.mark.anyio
+
+
+def _cliente(handler) -> ClienteIA:
+    """Circuito que se abre con un fallo y pasa a semiabierto enseguida"""
+    cfg = settings.model_copy(update={"ai_breaker_failures": 1, "ai_breaker_reset_seconds": 0.0})
+    cliente = ClienteIA(cfg)
+    cliente._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://ia")
+    return cliente
+
+
+def _abrir(cliente: ClienteIA):
+    cliente.circuito.fallo()
+    assert cliente.circuito.estado == "semiabierto"
+
+
+async def test_prueba_cancelada_libera_el_circuito():
+    bloquear = asyncio.Event()
+
+    async def handler(request):
+        if not bloquear.is_set():
+            await asyncio.sleep(10)
+        return httpx.Response(200, json={"ok": True})
+
+    cliente = _cliente(handler)
+    _abrir(cliente)
+    prueba = asyncio.create_task(cliente.predecir({"n": 1}))
+    await asyncio.sleep(0.01)
+    # Mientras la prueba está en curso se rechaza el resto
+    with pytest.raises(CircuitoAbierto):
+        await cliente.predecir({"n": 2})
+    prueba.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await prueba
+
+    bloquear.set()
+    assert await cliente.predecir({"n": 3}) == {"ok": True}
+    assert cliente.circuito.estado == "cerrado"
+
+
+async def test_prueba_con_error_inesperado_cuenta_como_fallo():
+    fallar = [True]
+
+    async def handler(request):
+        if fallar[0]:
+            raise RuntimeError("inesperado")
+        return httpx.Response(200, json={"ok": True})
+
+    cliente = _cliente(handler)
+    _abrir(cliente)
+    with pytest.raises(RuntimeError):
+        await cliente.predecir({"n": 1})
+    assert cliente.circuito.fallos == 2
+
+    fallar[0] = False
+    assert await cliente.predecir({"n": 2}) == {"ok": True}
+    assert cliente.circuito.estado == "cerrado"
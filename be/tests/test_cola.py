@@ -0,0 +1,30 @@
+# be/tests/test_cola.py
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from gateway import cola, models, schemas
+from gateway.db import async_session
+from .conftest import crear_maquina
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_error_despues_del_commit_no_duplica_el_lote(cliente, monkeypatch):
+    m = await crear_maquina(cliente)
+
+    def falla(filas):
+        raise RuntimeError("notificación fallida")
+    monkeypatch.setattr(cola, "lecturas_confirmadas", falla)
+
+    ingesta = cola.ColaIngesta()
+    lote = [
+        schemas.LecturaIn(maquinaria_id=m, temperatura=90.0, vibracion=1.0, presion_aceite=3.5, ts=datetime.utcnow())
+        for _ in range(5)
+    ]
+    await ingesta._escribir(lote)
+
+    async with async_session() as db:
+        assert (await db.execute(select(func.count()).select_from(models.Lectura))).scalar() == 5
+    assert ingesta.escritas == 5 and ingesta.descartadas == 0 and ingesta.errores == 1
@@ -0,0 +1,45 @@
+# be/tests/test_coordinacion.py
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from gateway.coordinacion import Coordinador, Trabajo
+from gateway.db import async_session
+
+pytestmark = pytest.mark.anyio
+
+
+class Registro(Trabajo):
+    nombre = "prueba"
+
+    def __init__(self):
+        self.detenido = 0
+
+    async def detener(self):
+        self.detenido += 1
+
+
+async def test_deja_las_tareas_si_no_puede_renovar_el_lease(engine, monkeypatch):
+    coordinador = Coordinador()
+    trabajo = Registro()
+    coordinador.registrar(trabajo)
+    async with async_session() as db:
+        await coordinador._asegurar_filas(db)
+    await coordinador.ciclo()
+    assert coordinador.lider
+
+    async def bloqueada(db):
+        raise OperationalError("UPDATE tareas", {}, Exception("database is locked"))
+    monkeypatch.setattr(coordinador, "_tomar_lease", bloqueada)
+
+    # El lease recién renovado no vence antes del próximo latido: sigue de líder
+    with pytest.raises(OperationalError):
+        await coordinador.ciclo()
+    assert coordinador.lider and trabajo.detenido == 0
+
+    # Ya puede vencer: deja las tareas antes de que otro worker lo tome
+    coordinador._vence = datetime.utcnow() + timedelta(seconds=1)
+    with pytest.raises(OperationalError):
+        await coordinador.ciclo()
+    assert not coordinador.lider and trabajo.detenido == 1
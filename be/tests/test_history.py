@@ -0,0 +1,112 @@
+# be/tests/test_history.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from gateway.db import async_session
+from gateway.rollups import compactador
+from .conftest import cargar_lecturas, crear_maquina
+
+pytestmark = pytest.mark.anyio
+
+
+def _horas(n: int):
+    """Una lectura cada 10 minutos durante las últimas n horas"""
+    ahora = datetime.utcnow()
+    return [ahora - timedelta(minutes=10 * i) for i in range(n * 6)]
+
+
+async def test_buckets_sin_compactar_salen_de_las_lecturas(cliente):
+    m = await crear_maquina(cliente)
+    n = await cargar_lecturas(cliente, m, _horas(100))
+
+    r = await cliente.get("/lecturas/history", params={"maquinaria_id": m, "bucket_minutes": 60})
+    assert r.status_code == 200
+    page = r.json()
+    assert page["fuente"] == "lecturas"
+    assert sum(b["n"] for b in page["buckets"]) == n
+
+
+async def test_buckets_combinan_agregados_y_lecturas_recientes(cliente):
+    m = await crear_maquina(cliente)
+    n = await cargar_lecturas(cliente, m, _horas(100))
+    async with async_session() as db:
+        await compactador.ejecutar(db)
+    # Llegan después de la pasada del compactador
+    n += await cargar_lecturas(cliente, m, [datetime.utcnow() + timedelta(seconds=1)])
+
+    r = await cliente.get("/lecturas/history", params={"maquinaria_id": m, "bucket_minutes": 60})
+    page = r.json()
+    assert page["fuente"] == "lecturas_hora+lecturas"
+    assert sum(b["n"] for b in page["buckets"]) == n
+    tss = [b["ts"] for b in page["buckets"]]
+    assert tss == sorted(set(tss))
+
+
+async def test_buckets_paginados_no_repiten_ni_saltan(cliente):
+    m = await crear_maquina(cliente)
+    n = await cargar_lecturas(cliente, m, _horas(100))
+    async with async_session() as db:
+        await compactador.ejecutar(db)
+
+    total, vistos, cursor = 0, [], None
+    while True:
+        params = {"maquinaria_id": m, "bucket_minutes": 60, "limit": 7, **({"cursor": cursor} if cursor else {})}
+        page = (await cliente.get("/lecturas/history", params=params)).json()
+        total += sum(b["n"] for b in page["buckets"])
+        vistos += [b["ts"] for b in page["buckets"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert total == n
+    assert vistos == sorted(set(vistos))
+
+
+@pytest.mark.parametrize("cursor", ["e30=", "W10=", "eyJ0cyI6ICIyMDI2LTAxLTAxVDAwOjAwOjAwIn0=", "no-es-base64!"])
+async def test_cursor_incompleto_es_400(cliente, cursor):
+    m = await crear_maquina(cliente)
+    for extra in ({}, {"bucket_minutes": 60}):
+        r = await cliente.get("/lecturas/history", params={"maquinaria_id": m, "cursor": cursor, **extra})
+        assert r.status_code == 400, (cursor, extra, r.text)
+
+
+def test_epoch_postgres_trunca():
+    from sqlalchemy import column, DateTime, select
+    from sqlalchemy.dialects import postgresql
+    from gateway.expresiones import epoch
+
+    sql = str(select(epoch(column("ts", DateTime))).compile(dialect=postgresql.dialect()))
+    assert "FLOOR(EXTRACT(EPOCH FROM ts))" in sql
+
+
+@pytest.mark.parametrize("bucket_minutes", [60, 180])
+async def test_rango_no_alineado_da_lo_mismo_con_y_sin_agregados(cliente, bucket_minutes):
+    m = await crear_maquina(cliente)
+    await cargar_lecturas(cliente, m, _horas(100))
+    ahora = datetime.utcnow()
+    rangos = [
+        (ahora - timedelta(hours=90, minutes=17), ahora - timedelta(hours=5, minutes=23)),
+        (ahora - timedelta(hours=80, minutes=41), None),
+    ]
+
+    async def pedir():
+        paginas = []
+        for desde, hasta in rangos:
+            params = {"maquinaria_id": m, "bucket_minutes": bucket_minutes, "limit": 10000,
+                      "from": desde.isoformat(), **({"to": hasta.isoformat()} if hasta else {})}
+            paginas.append((await cliente.get("/lecturas/history", params=params)).json())
+        return paginas
+
+    antes = await pedir()
+    async with async_session() as db:
+        await compactador.ejecutar(db)
+    despues = await pedir()
+
+    for crudo, agregado in zip(antes, despues):
+        assert crudo["fuente"] == "lecturas"
+        assert agregado["fuente"] == "lecturas_hora+lecturas"
+        assert [b["ts"] for b in agregado["buckets"]] == [b["ts"] for b in crudo["buckets"]]
+        for a, c in zip(agregado["buckets"], crudo["buckets"]):
+            assert a["n"] == c["n"]
+            for campo in ("temperatura_min", "temperatura_max", "temperatura_avg"):
+                assert a[campo] == pytest.approx(c[campo])
@@ -0,0 +1,67 @@
+# be/tests/test_importacion.py
+import pytest
+
+from gateway import importacion
+from .conftest import crear_maquina
+
+msgpack = pytest.importorskip("msgpack")
+pytestmark = pytest.mark.anyio
+
+TIPO = {"content-type": "application/msgpack"}
+
+
+def _registros(maquinaria_id: str, n: int) -> bytes:
+    empaquetar = msgpack.Packer().pack
+    return b"".join(
+        empaquetar({"maquinaria_id": maquinaria_id, "temperatura": 80.0, "vibracion": 1.0, "presion_aceite": 3.5})
+        for _ in range(n)
+    )
+
+
+async def _lineas(cliente, m: str) -> int:
+    r = await cliente.get("/lecturas/history", params={"maquinaria_id": m, "limit": 10000})
+    return len(r.json()["items"])
+
+
+async def test_msgpack_truncado(cliente):
+    m = await crear_maquina(cliente)
+    cuerpo = _registros(m, 10)
+    r = await cliente.post("/lecturas/batch/stream", content=cuerpo[:-5], headers=TIPO)
+    assert r.status_code == 400
+    d = r.json()
+    assert d["inserted"] == 9
+    assert d["errors"][-1]["line"] == 10
+    assert await _lineas(cliente, m) == 9
+
+
+async def test_msgpack_basura_tras_registros_validos(cliente):
+    m = await crear_maquina(cliente)
+    # 0xc1 es un byte reservado, nunca válido en MessagePack
+    cuerpo = _registros(m, 3) + b"\xc1" + _registros(m, 3)
+    r = await cliente.post("/lecturas/batch/stream", content=cuerpo, headers=TIPO)
+    assert r.status_code == 400
+    d = r.json()
+    assert d["inserted"] == 3
+    assert d["errors"] == [{"line": 4, "error": d["error"]}]
+    assert await _lineas(cliente, m) == 3
+
+
+async def test_msgpack_parte_mayor_que_el_buffer(cliente):
+    m = await crear_maquina(cliente)
+    cuerpo = _registros(m, 20000)
+    assert len(cuerpo) > importacion.MAX_LINEA * 16
+
+    async def una_parte():
+        yield cuerpo
+
+    r = await cliente.post("/lecturas/batch/stream", content=una_parte(), headers=TIPO)
+    assert r.status_code == 200, r.text
+    assert r.json()["inserted"] == 20000
+
+
+async def test_msgpack_registro_demasiado_grande(cliente):
+    m = await crear_maquina(cliente)
+    enorme = msgpack.packb({"maquinaria_id": m, "relleno": "x" * importacion.MAX_LINEA * 32})
+    r = await cliente.post("/lecturas/batch/stream", content=_registros(m, 2) + enorme, headers=TIPO)
+    assert r.status_code == 400
+    assert r.json()["inserted"] == 2
@@ -0,0 +1,17 @@
+# be/tests/test_metricas.py
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_sentencia_fallida_no_deja_inicio_pendiente(engine):
+    async with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            await conn.execute(text("SELECT * FROM no_existe"))
+        await conn.rollback()
+        info = conn.sync_connection.info
+        assert not info.get("_metricas_t0")
+        await conn.execute(text("SELECT 1"))
+        assert not info.get("_metricas_t0")
@@ -0,0 +1,56 @@
+# be/tests/test_migraciones.py
+from sqlalchemy import create_engine, select
+
+from gateway import models
+from gateway.estado import ESTADOS, TEMP_BAJA, VIB_CRITICA, VIB_ELEVADA, codigo_estado, motivo_bits
+from gateway.migraciones import migrar, pendientes
+
+ANTERIOR = """
+CREATE TABLE maquinaria (id VARCHAR PRIMARY KEY, nombre VARCHAR NOT NULL, tipo VARCHAR NOT NULL,
+    descripcion TEXT, numero_serie VARCHAR NOT NULL UNIQUE, motor VARCHAR);
+CREATE TABLE lecturas (id INTEGER PRIMARY KEY,
+    maquinaria_id VARCHAR NOT NULL REFERENCES maquinaria(id) ON DELETE CASCADE, numero_serie VARCHAR,
+    temperatura FLOAT, vibracion FLOAT, presion_aceite FLOAT, ts DATETIME, estado VARCHAR, motivo TEXT);
+CREATE INDEX ix_lecturas_maquinaria_ts ON lecturas (maquinaria_id, ts);
+"""
+
+
+def test_conserva_estado_y_motivo_guardados(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'anterior.db'}")
+    filas = [
+        # (temperatura, vibracion, presion_aceite, estado, motivo guardados, bits esperados)
+        (90.0, 4.6, 3.5, "CRITICO", "Vibración crítica (4.6 mm/s)", VIB_CRITICA),
+        # Evaluadas antes de redondear: con los valores guardados darían OK o ALERTA
+        (80.0, 1.0, 3.5, "ALERTA", "Temperatura baja (79.96°C)", TEMP_BAJA),
+        (90.0, 2.5, 3.5, "ALERTA", "Vibración elevada (2.52 mm/s)", VIB_ELEVADA),
+        (79.0, 1.0, 3.5, "OK", None, 0),
+        # Motivo con otro formato: la máscara sale de los valores
+        (90.0, 3.0, 3.5, "ALERTA", "Vibración ALERTA (3.0)", VIB_ELEVADA),
+        # Sin estado guardado: se evalúa
+        (130.0, 1.0, 3.5, None, None, None),
+    ]
+    with engine.begin() as conn:
+        for sentencia in ANTERIOR.split(";"):
+            if sentencia.strip():
+                conn.exec_driver_sql(sentencia)
+        conn.exec_driver_sql("INSERT INTO maquinaria VALUES ('m1', 'M1', 'A', NULL, 'S1', NULL)")
+        for i, (t, v, p, e, motivo, _) in enumerate(filas, start=1):
+            conn.exec_driver_sql(
+                "INSERT INTO lecturas VALUES (?, 'm1', 'S1', ?, ?, ?, '2026-10-01 00:00:00', ?, ?)",
+                (i, t, v, p, e, motivo))
+        assert pendientes(conn) == ["lecturas"]
+        assert migrar(conn) == len(filas)
+        assert pendientes(conn) == []
+
+    with engine.connect() as conn:
+        migradas = conn.execute(
+            select(models.Lectura.__table__).order_by(models.Lectura.id)
+        ).mappings().all()
+    engine.dispose()
+    assert len(migradas) == len(filas)
+    for f, (t, v, p, estado, _, bits) in zip(migradas, filas):
+        if estado is None:
+            bits = motivo_bits(t, v, p)
+            estado = ESTADOS[codigo_estado(bits)]
+        assert f["estado"] == estado
+        assert f["motivo_bits"] == bits
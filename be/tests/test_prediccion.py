@@ -0,0 +1,32 @@
+# be/tests/test_prediccion.py
+from datetime import datetime, timedelta
+
+from gateway.prediccion import MotorPrediccion
+
+
+def _lecturas(inicio: datetime, pasos, temperaturas):
+    return [
+        {"maquinaria_id": "m1", "ts": inicio + timedelta(seconds=s), "temperatura": t}
+        for s, t in zip(pasos, temperaturas)
+    ]
+
+
+def test_lecturas_casi_simultaneas_no_dan_pendiente():
+    motor = MotorPrediccion(alpha=0.05)
+    inicio = datetime(2026, 10, 1)
+    motor.actualizar(_lecturas(inicio, [0, 0.005, 0.01], [90.0, 99.0, 92.0]))
+    p = motor.pronostico("m1", "temperatura")
+    assert p["pendiente_por_hora"] == 0
+    assert p["umbrales"] == {}
+
+
+def test_tendencia_sostenida_proyecta_el_cruce():
+    motor = MotorPrediccion(alpha=0.05)
+    inicio = datetime(2026, 10, 1)
+    # Cada 10 s durante 10 min, subiendo 6 °C por hora
+    pasos = [10 * i for i in range(60)]
+    motor.actualizar(_lecturas(inicio, pasos, [90.0 + 6 * s / 3600 for s in pasos]))
+    p = motor.pronostico("m1", "temperatura")
+    assert abs(p["pendiente_por_hora"] - 6) < 1e-6
+    # Faltan 9 °C para la alerta (100 °C) desde 91 °C
+    assert abs(p["umbrales"]["alerta"]["horas"] - 1.5) < 0.05
@@ -0,0 +1,69 @@
+# be/tests/test_purga.py
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from gateway.db import async_session
+from gateway.retencion import retencion
+from .conftest import cargar_lecturas, crear_maquina
+
+pytestmark = pytest.mark.anyio
+
+
+async def _archivadas(maquinaria_id: str) -> int:
+    async with async_session() as db:
+        total = 0
+        for tabla in await retencion.todas(db):
+            total += (await db.execute(
+                select(func.count()).select_from(tabla).where(tabla.c.maquinaria_id == maquinaria_id)
+            )).scalar()
+        return total
+
+
+async def _con_archivo(cliente) -> str:
+    """Máquina con 40 días de lecturas cada 6 h, archivadas las de más de 10 días"""
+    m = await crear_maquina(cliente)
+    ahora = datetime.utcnow()
+    await cargar_lecturas(cliente, m, [ahora - timedelta(hours=6 * i) for i in reversed(range(160))])
+    async with async_session() as db:
+        await retencion.archivar(db, corte=ahora - timedelta(days=10))
+    assert await _archivadas(m) > 0
+    return m
+
+
+async def _historial(cliente, m: str) -> int:
+    r = await cliente.get("/lecturas/history", params={"maquinaria_id": m, "limit": 10000})
+    return len(r.json()["items"])
+
+
+async def test_baja_borra_lecturas_archivadas(cliente):
+    m = await _con_archivo(cliente)
+    r = await cliente.delete(f"/maquinaria/{m}")
+    assert r.status_code == 200
+    assert await _archivadas(m) == 0
+    assert await _historial(cliente, m) == 0
+
+
+async def test_purga_por_lotes_borra_lecturas_archivadas(cliente):
+    m = await _con_archivo(cliente)
+    r = await cliente.delete(f"/maquinaria/{m}", params={"asincrono": "true"})
+    assert r.status_code == 202
+    trabajo_id = r.json()["id"]
+    for _ in range(200):
+        trabajo = (await cliente.get(f"/maquinaria/purgas/{trabajo_id}")).json()
+        if trabajo["estado"] != "en_curso":
+            break
+        await asyncio.sleep(0.01)
+    assert trabajo["estado"] == "completada"
+    assert trabajo["borradas"] == trabajo["total"] == 160
+    assert await _archivadas(m) == 0
+    assert await _historial(cliente, m) == 0
+
+
+async def test_baja_no_toca_archivo_de_otras_maquinas(cliente):
+    m = await _con_archivo(cliente)
+    otra = await _con_archivo(cliente)
+    await cliente.delete(f"/maquinaria/{m}")
+    assert await _historial(cliente, otra) == 160
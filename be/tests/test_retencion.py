@@ -0,0 +1,34 @@
+# be/tests/test_retencion.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from gateway.db import async_session
+from gateway.retencion import retencion
+from .conftest import cargar_lecturas, crear_maquina
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_mes_archivado_solo_despues_del_commit(cliente, monkeypatch):
+    m = await crear_maquina(cliente)
+    ahora = datetime.utcnow()
+    await cargar_lecturas(cliente, m, [ahora - timedelta(days=40 - i) for i in range(40)])
+
+    async with async_session() as db:
+        async def falla():
+            raise RuntimeError("commit fallido")
+        monkeypatch.setattr(db, "commit", falla)
+        with pytest.raises(RuntimeError):
+            await retencion.archivar_lote(db, ahora - timedelta(days=10), 1000)
+        await db.rollback()
+    assert retencion.meses == set()
+
+    # history no debe unir tablas de archivo que no llegaron a existir
+    r = await cliente.get("/lecturas/history", params={"maquinaria_id": m, "limit": 1000})
+    assert r.status_code == 200
+    assert len(r.json()["items"]) == 40
+
+    async with async_session() as db:
+        assert await retencion.archivar_lote(db, ahora - timedelta(days=10), 1000) == 30
+    assert retencion.meses
@@ -0,0 +1,72 @@
+# be/tests/test_sincronizacion.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from gateway import schemas
+from gateway.config import settings
+from gateway.db import async_session
+from gateway.eventos import broker
+from gateway.ingesta import guardar_lecturas, insertar_lecturas, preparar_filas
+from gateway.sincronizacion import sincronizador
+from gateway.ultimas import ultimas
+from .conftest import crear_maquina
+
+pytestmark = pytest.mark.anyio
+
+
+def _filas(maquinaria_id: str, n: int, temperatura: float = 80.0):
+    ahora = datetime.utcnow()
+    return preparar_filas([
+        schemas.LecturaIn(maquinaria_id=maquinaria_id, temperatura=temperatura, vibracion=1.0, presion_aceite=3.5,
+                          ts=ahora + timedelta(seconds=i))
+        for i in range(n)
+    ])
+
+
+@pytest.fixture
+async def sincronizando(engine, monkeypatch):
+    # Los ciclos se corren a mano
+    monkeypatch.setattr(settings, "sincronizacion_segundos", 3600.0)
+    async with async_session() as db:
+        await sincronizador.preparar(db)
+        await ultimas.cargar(db)
+    sincronizador.iniciar()
+    try:
+        yield sincronizador
+    finally:
+        await sincronizador.detener()
+
+
+def _eventos(sub) -> int:
+    bloques = []
+    while not sub.cola.empty():
+        bloques.append(sub.cola.get_nowait()[1])
+    return "".join(bloques).count("event: lectura")
+
+
+async def test_aplica_lecturas_de_otros_workers(cliente, sincronizando):
+    m = await crear_maquina(cliente)
+    sub = broker.suscribir([m])
+    async with async_session() as db:
+        # Como otro worker: en la BD sin pasar por los estados de este
+        await insertar_lecturas(db, _filas(m, 5, temperatura=130.0))
+        await db.commit()
+        assert await sincronizando.ciclo(db) == 5
+        assert await sincronizando.ciclo(db) == 0
+    ultima = next(l for l in ultimas.latest() if l["maquinaria_id"] == m)
+    assert ultima["temperatura"] == 130.0
+    assert _eventos(sub) == 5
+    broker.cancelar(sub)
+
+
+async def test_no_repite_las_propias(cliente, sincronizando):
+    m = await crear_maquina(cliente)
+    sub = broker.suscribir([m])
+    async with async_session() as db:
+        await guardar_lecturas(db, _filas(m, 3))
+        # Los eventos salen del ciclo, una vez por lectura
+        assert _eventos(sub) == 0
+        assert await sincronizando.ciclo(db) == 0
+    assert _eventos(sub) == 3
+    broker.cancelar(sub)
@@ -25,11 +25,18 @@ export async function getHistory(
   end?: string,
 ): Promise<Lectura[]> {
   const params = new URLSearchParams({ maquinaria_id });
-  if (start) params.set('start', start);
-  if (end) params.set('end', end);
-  const res = await fetch(`${API_BASE}/lecturas/history?${params.toString()}`);
-  if (!res.ok) throw new Error('Error history');
-  return res.json();
+  if (start) params.set('from', start);
+  if (end) params.set('to', end);
+  // El backend pagina por cursor: se piden páginas hasta que no haya next_cursor
+  const items: Lectura[] = [];
+  for (;;) {
+    const res = await fetch(`${API_BASE}/lecturas/history?${params.toString()}`);
+    if (!res.ok) throw new Error('Error history');
+    const page = await res.json();
+    items.push(...page.items);
+    if (!page.next_cursor) return items;
+    params.set('cursor', page.next_cursor);
+  }
 }
 
 export async function getPredict(